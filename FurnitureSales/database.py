@@ -0,0 +1,56 @@
+"""
+Cấu hình SQLite cho chạy thật (nhiều request ghi cùng lúc: giỏ hàng, session, outbox).
+
+- PRAGMAS chạy mỗi khi mở connection (OPTIONS init_command):
+  synchronous=NORMAL (an toàn với WAL, ít fsync hơn), busy_timeout để chờ lock
+  thay vì báo "database is locked" ngay, mmap + cache lớn hơn.
+- WAL (đọc không chặn ghi) lưu luôn trong header file DB nên chỉ cần bật 1 lần:
+  `manage.py enable_wal` khi deploy. Không đặt trong init_command, nếu không mọi lệnh
+  manage.py (check, test, ...) đều ghi lại header của db.sqlite3.
+- CONN_MAX_AGE giữ connection giữa các request (không mở lại + chạy lại pragma mỗi lần).
+- Đường ghi giỏ hàng dùng app.db.write_transaction() -> BEGIN IMMEDIATE.
+- Replica (read-only, app/routers.py): cùng pragma nhưng query_only.
+"""
+import os
+
+BUSY_TIMEOUT_MS = 5000
+
+JOURNAL_MODE = "wal"
+
+PRAGMAS = {
+    "synchronous": "NORMAL",
+    "busy_timeout": BUSY_TIMEOUT_MS,
+    "mmap_size": 128 * 1024 * 1024,
+    "cache_size": -20000,  # số âm = KiB -> ~20MB
+    "temp_store": "MEMORY",
+}
+
+
+REPLICA_PRAGMAS = {
+    **PRAGMAS,
+    "query_only": "ON",
+}
+
+
+def pragma_statements(pragmas=None):
+    return [f"PRAGMA {name}={value}" for name, value in (pragmas or PRAGMAS).items()]
+
+
+def sqlite_database(name, conn_max_age=None, replica=False):
+    """Entry cho DATABASES['default'] (hoặc 'replica') với pragma + persistent connection."""
+    if conn_max_age is None:
+        conn_max_age = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+    database = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": conn_max_age > 0,
+        "OPTIONS": {
+            "init_command": ";".join(pragma_statements(REPLICA_PRAGMAS if replica else PRAGMAS)),
+            "timeout": BUSY_TIMEOUT_MS / 1000,
+        },
+    }
+    if replica:
+        # test dùng chung DB với default thay vì tạo test DB riêng
+        database["TEST"] = {"MIRROR": "default"}
+    return database
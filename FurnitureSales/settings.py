@@ -1,6 +1,12 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 
+from .database import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,11 +36,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,7 +52,8 @@ ROOT_URLCONF = 'FurnitureSales.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + đo thời gian render cho /metrics/ (app/metrics.py)
+        'BACKEND': 'app.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,11 +73,69 @@ WSGI_APPLICATION = 'FurnitureSales.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# pragma + persistent connection (FurnitureSales/database.py),
+# WAL bật 1 lần khi deploy: `manage.py enable_wal`
 DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
+}
+
+# Read replica cho catalog (app/routers.py): file SQLite thứ 2, sync bằng
+# `manage.py snapshot_replica`. Không đặt DB_REPLICA_PATH thì chỉ dùng default.
+if os.environ.get('DB_REPLICA_PATH'):
+    DATABASES['replica'] = sqlite_database(os.environ['DB_REPLICA_PATH'], replica=True)
+DATABASE_ROUTERS = ['app.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 30  # đọc primary bao lâu sau khi session ghi catalog
+
+# Số query tối đa mỗi view (app/query_budget.py): "warn" | "raise" | "off"
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'warn')
+
+# Metrics theo view (app/metrics.py): /metrics/ cho staff hoặc Bearer METRICS_TOKEN,
+# METRICS_FLUSH_PATH để ghi snapshot JSON ra file mỗi METRICS_FLUSH_INTERVAL giây
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_FLUSH_PATH = os.environ.get('METRICS_FLUSH_PATH', '')
+METRICS_FLUSH_INTERVAL = 60
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# "catalog" dùng cho app/catalog_cache.py. CATALOG_CACHE_BACKEND = "file" (mặc định) hoặc "locmem".
+# file: mọi worker + lệnh manage.py (import_catalog, snapshot_replica, ...) dùng chung 1 thư mục
+# nên invalidate ở đâu cũng có tác dụng. locmem nhanh hơn nhưng chỉ đúng khi chạy 1 process
+# (`manage.py check` cảnh báo app.W001).
+
+CATALOG_CACHE_BACKEND = os.environ.get('CATALOG_CACHE_BACKEND', 'file')
+CATALOG_CACHE_TIMEOUT = 3600  # seconds; signals xoá cache khi Product / Article thay đổi
+CATALOG_CACHE_DIR = os.environ.get('CATALOG_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'furnituresales_catalog'))
+if sys.argv[1:2] == ['test'] and 'CATALOG_CACHE_DIR' not in os.environ:
+    # manage.py test: thư mục riêng mỗi lần chạy, không lẫn entry của DB thật (pk trùng nhau)
+    CATALOG_CACHE_DIR = tempfile.mkdtemp(prefix='furnituresales_catalog_test-')
+    atexit.register(shutil.rmtree, CATALOG_CACHE_DIR, ignore_errors=True)
+
+# Keyset pagination (app/pagination.py): page size mặc định và tối đa cho ?limit=
+CATALOG_PAGE_SIZE = 24
+CATALOG_MAX_PAGE_SIZE = 100
+
+# Autocomplete (app/autocomplete.py): xem change log mỗi N giây, generation đổi thì
+# build lại index trong bộ nhớ ở thread nền (request không phải chờ)
+AUTOCOMPLETE_CHECK_INTERVAL = 2
+AUTOCOMPLETE_BACKGROUND_REBUILD = True
+
+# Coupon (app/coupons.py): rule cache trong bộ nhớ mỗi process, nạp lại sau N giây
+COUPON_CACHE_MAX_AGE = 60
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CATALOG_CACHE_DIR,
+        'TIMEOUT': CATALOG_CACHE_TIMEOUT,
+    } if CATALOG_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': CATALOG_CACHE_TIMEOUT,
+    },
 }
 
 
@@ -118,9 +186,39 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'app/static'),
 ]
 
+# Static build (app/assets.py, manage.py build_static)
+# STATIC_BUILD=1: base.html load bundle đã gộp + minify, tên có hash (ManifestStorage),
+# /static/ serve từ STATIC_ROOT kèm .gz/.br và Cache-Control 1 năm.
+# Chạy runserver với --nostatic để không bị staticfiles handler của dev chặn trước.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATIC_USE_BUNDLES = os.environ.get('STATIC_BUILD') == '1'
+STATIC_BUNDLES = {
+    'base.css': [
+        'app/css/main.css',
+        'app/css/product.css',
+        'app/css/countdown.css',
+        'app/css/footer.css',
+    ],
+    'base.js': [
+        'app/js/addCart.js',
+        'app/js/countdown.js',
+        'app/js/update_profile.js',
+        'app/js/autocomplete.js',
+    ],
+}
+if STATIC_USE_BUNDLES:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'app.assets.ManifestStorage'},
+    }
+
 MEDIA_URL = '/images/'
 MEDIA_ROOT = os.path.join(BASE_DIR,'app/static/images')
 
+# Thumbnail WebP / JPEG (app/thumbnails.py), tên file theo hash nội dung
+THUMBNAIL_ROOT = os.path.join(MEDIA_ROOT, 'thumbs')
+THUMBNAIL_URL = MEDIA_URL + 'thumbs/'
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -129,8 +227,22 @@ EMAIL_HOST_PASSWORD = 'bqvb neyd ogad deev'
 EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
 
-# Session settings (optional)
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Use database-backed sessions
+# Outbox email (app/mail.py, manage.py send_queued_mail)
+MAIL_OUTBOX_MAX_ATTEMPTS = 5
+MAIL_OUTBOX_BACKOFF_SECONDS = 60  # retry sau 60s, 120s, 240s, ...
+
+# Session settings
+# SESSION_MODE: "db" (mặc định), "signed_cookies" (không ghi DB) hoặc "cached_db"
+# (đọc từ cache, chỉ ghi DB khi session thay đổi). cached_db cần CACHES['default'] dùng chung
+# giữa các worker (không phải locmem), `manage.py check` báo lỗi app.E001 nếu không.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_MODE]
 SESSION_COOKIE_NAME = 'sessionid'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
-SESSION_SAVE_EVERY_REQUEST = True
+# Chỉ lưu khi session.modified (apply_discount, payPage, payment_success, signin...)
+# -> xem trang catalog không còn UPDATE django_session mỗi request
+SESSION_SAVE_EVERY_REQUEST = False
@@ -1,10 +1,14 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver 
 from django.conf import settings
-from django.core.mail import send_mail 
 from django.contrib.auth.models import User
 import logging
 
+from app import autocomplete, catalog_cache, coupons, mail, search, thumbnails
+from app.checkout import order_completed
+from app.models import Article, Coupon, Order, OrderItem, Product
+
 logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=User)
@@ -20,15 +24,125 @@ def register_user(sender, instance, created, **kwargs):
         sender = settings.EMAIL_HOST_USER
         receiver = [instance.email]
 
-        try:
-            # send email
-            send_mail(
-                subject,
-                message,
-                sender,
-                receiver,
-                fail_silently=False,
-            )
-            logger.info(f"Email sent to {instance.email}")
-        except Exception as e:
-            logger.error(f"Failed to send email to {instance.email}: {e}")
\ No newline at end of file
+        # đưa vào outbox, `manage.py send_queued_mail` gửi sau (không chờ SMTP trong request signup)
+        if mail.enqueue_mail(subject, message, receiver, sender):
+            logger.info(f"Email queued for {instance.email}")
+
+
+# -----------------------------
+# Denormalized order totals (Order.item_count / subtotal / version)
+# -----------------------------
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_order_totals(sender, instance, **kwargs):
+    # Chạy trong cùng transaction với lần ghi OrderItem (updateItem, admin inline, ...)
+    if instance.order_id:
+        Order.objects.filter(pk=instance.order_id).recalculate_totals()
+
+
+@receiver(post_save, sender=Product)
+def update_open_order_totals(sender, instance, created, **kwargs):
+    # Đổi giá sản phẩm -> subtotal của các giỏ hàng chưa thanh toán phải tính lại
+    if not created:
+        order_ids = OrderItem.objects.filter(product=instance).values("order_id")
+        Order.objects.filter(complete=False, pk__in=order_ids).recalculate_totals()
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_orders(sender, instance, **kwargs):
+    # Sau khi xoá, OrderItem.product bị SET_NULL nên phải nhớ order id từ trước
+    instance._affected_order_ids = list(
+        OrderItem.objects.filter(product=instance).values_list("order_id", flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Product)
+def update_orders_after_product_delete(sender, instance, **kwargs):
+    order_ids = getattr(instance, "_affected_order_ids", None)
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids).recalculate_totals()
+
+
+# -----------------------------
+# Catalog cache invalidation (app/catalog_cache.py)
+# -----------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    # on_commit: tránh request khác nạp lại dữ liệu cũ trước khi transaction commit
+    pk = instance.pk
+    transaction.on_commit(lambda: catalog_cache.invalidate_product(pk))
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_cache(sender, instance, **kwargs):
+    transaction.on_commit(catalog_cache.invalidate_articles)
+
+
+# -----------------------------
+# Full-text search index (app/search.py)
+# -----------------------------
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    search.index_product(instance)
+
+
+@receiver(post_save, sender=Article)
+def index_article(sender, instance, **kwargs):
+    search.index_article(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove(search.PRODUCT, instance.pk)
+
+
+@receiver(post_delete, sender=Article)
+def unindex_article(sender, instance, **kwargs):
+    search.remove(search.ARTICLE, instance.pk)
+
+
+# -----------------------------
+# Autocomplete prefix index (app/autocomplete.py, in-process)
+# -----------------------------
+@receiver(post_save, sender=Product)
+def update_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.product_changed(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.product_removed(pk))
+
+
+# -----------------------------
+# Thumbnails (app/thumbnails.py)
+# -----------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Article)
+def generate_thumbnails(sender, instance, **kwargs):
+    # ProductForm / ArticleForm / admin đều đi qua save(); ảnh không đổi thì chỉ tốn 1 lần hash file
+    if instance.image:
+        thumbnails.ensure_thumbnails(instance)
+
+
+# -----------------------------
+# Coupon rule cache (app/coupons.py, in-process)
+# -----------------------------
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_coupon_rules(sender, instance, **kwargs):
+    transaction.on_commit(coupons.invalidate)
+
+
+# -----------------------------
+# Checkout (app/checkout.py): chạy sau commit
+# -----------------------------
+@receiver(order_completed)
+def log_completed_order(sender, order, **kwargs):
+    logger.info(
+        "Order #%s completed: %s items, total %s VNĐ, coupon %s",
+        order.pk, order.item_count, int(order.total or 0), order.discount_code or "-",
+    )
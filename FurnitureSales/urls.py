@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 # Load images
 from django.conf.urls.static import static
@@ -8,4 +8,10 @@ from django.conf import settings
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('app.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Static đã build (manage.py build_static): serve từ STATIC_ROOT, có .gz/.br + cache lâu
+if settings.STATIC_USE_BUNDLES:
+    from app.assets import serve_static
+
+    urlpatterns.insert(0, re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static))
\ No newline at end of file
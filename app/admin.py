@@ -1,8 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.template.response import TemplateResponse
+from django.utils import timezone
 from django.utils.html import format_html
-from django.db.models import Sum, Count, Min
 
-from .models import Customer, Product, Article, Order, OrderItem, ShippingAddress
+from . import checkout, coupons, order_export, rollups
+from .models import (
+    Customer, Product, Article, Order, OrderItem, ShippingAddress, OutboundEmail, Coupon, DailySales, RollupState,
+)
 
 
 # -----------------------------
@@ -44,34 +48,56 @@ class ShippingAddressInline(admin.StackedInline):
 # -----------------------------
 @admin.action(description="Mark selected orders as COMPLETE")
 def mark_complete(modeladmin, request, queryset):
-    queryset.update(complete=True)
+    # snapshot giá / lines / total như checkout (app/checkout.py); completed_at ->
+    # rollup_sales lần sau tính order này vào doanh thu hôm nay theo giá snapshot
+    for order in queryset.exclude(complete=True):
+        checkout.complete_from_admin(order)
 
 
 @admin.action(description="Mark selected orders as INCOMPLETE")
 def mark_incomplete(modeladmin, request, queryset):
-    queryset.update(complete=False)
-
-
-@admin.action(description="Merge duplicate items in selected orders (same product)")
-def merge_duplicate_items(modeladmin, request, queryset):
-    """
-    Nếu trong 1 order có nhiều OrderItem trùng product (do add nhanh),
-    action này sẽ gộp lại thành 1 dòng: quantity = tổng quantity.
-    """
-    for order in queryset:
-        dup_groups = (
-            OrderItem.objects
-            .filter(order=order)
-            .values("product_id")
-            .annotate(cnt=Count("id"), total_qty=Sum("quantity"), keep_id=Min("id"))
-            .filter(cnt__gt=1)
+    # mỗi customer chỉ được có 1 order mở (unique_open_order_per_customer):
+    # bỏ qua order của customer đang có giỏ hàng mở, thay vì IntegrityError
+    busy = set(
+        Order.objects.filter(complete=False, customer__isnull=False).values_list("customer_id", flat=True)
+    )
+    reopen, skipped = [], 0
+    for order_id, customer_id in queryset.exclude(complete=False).values_list("id", "customer_id"):
+        if customer_id is not None and customer_id in busy:
+            skipped += 1
+            continue
+        reopen.append(order_id)
+        if customer_id is not None:
+            busy.add(customer_id)
+
+    # ngày đã tổng hợp của các order này tính lại ngay (high-water mark không thấy order bị mở lại)
+    completed_dates = list(Order.objects.filter(pk__in=reopen).values_list("completed_at", flat=True))
+    Order.objects.filter(pk__in=reopen).update(complete=False, completed_at=None)
+    rollups.refresh_dates(completed_dates)
+    if skipped:
+        modeladmin.message_user(
+            request, f"Skipped {skipped} order(s): customer already has an open order.", messages.WARNING
         )
-        for g in dup_groups:
-            keep_id = g["keep_id"]
-            total_qty = g["total_qty"] or 0
 
-            OrderItem.objects.filter(id=keep_id).update(quantity=total_qty)
-            OrderItem.objects.filter(order=order, product_id=g["product_id"]).exclude(id=keep_id).delete()
+
+@admin.action(description="Export selected orders to CSV (items + shipping)")
+def export_orders_csv(modeladmin, request, queryset):
+    # "Select all" giữ nguyên filter của changelist (complete, date_order, search)
+    filename = f"orders-{timezone.localdate():%Y%m%d}.csv"
+    return order_export.streaming_response(order_export.order_rows(queryset), filename)
+
+
+@admin.action(description="Export selected order items to CSV")
+def export_order_items_csv(modeladmin, request, queryset):
+    filename = f"order-items-{timezone.localdate():%Y%m%d}.csv"
+    return order_export.streaming_response(order_export.item_rows(queryset), filename)
+
+
+@admin.action(description="Retry selected emails now")
+def retry_emails(modeladmin, request, queryset):
+    queryset.exclude(status=OutboundEmail.SENT).update(
+        status=OutboundEmail.PENDING, attempts=0, next_attempt_at=timezone.now()
+    )
 
 
 # -----------------------------
@@ -81,6 +107,7 @@ def merge_duplicate_items(modeladmin, request, queryset):
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "name", "email", "phone_number", "address")
     search_fields = ("name", "email", "user__username", "phone_number", "address")
+    list_select_related = ("user",)
     list_per_page = 25
 
 
@@ -104,7 +131,7 @@ class ProductAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width:56px;height:56px;object-fit:cover;border-radius:8px;" />',
-                obj.image.url
+                obj.SmallImageURL
             )
         return "-"
 
@@ -121,7 +148,7 @@ class ArticleAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width:56px;height:56px;object-fit:cover;border-radius:8px;" />',
-                obj.image.url
+                obj.SmallImageURL
             )
         return "-"
 
@@ -131,20 +158,21 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "customer", "complete", "date_order", "item_count", "order_total_vnd", "transaction_id")
     list_filter = ("complete", "date_order")
     search_fields = ("id", "customer__name", "customer__email", "customer__user__username", "transaction_id")
+    list_select_related = ("customer",)
     date_hierarchy = "date_order"
     ordering = ("-date_order",)
     inlines = [OrderItemInline, ShippingAddressInline]
-    actions = [mark_complete, mark_incomplete, merge_duplicate_items]
+    actions = [mark_complete, mark_incomplete, export_orders_csv]
     list_per_page = 25
 
-    @admin.display(description="Items")
+    @admin.display(description="Items", ordering="item_count")
     def item_count(self, obj: Order):
         try:
             return obj.get_cart_items
         except Exception:
             return 0
 
-    @admin.display(description="Total (VNĐ)")
+    @admin.display(description="Total (VNĐ)", ordering="subtotal")
     def order_total_vnd(self, obj: Order):
         try:
             return f"{int(obj.get_cart_total):,}"
@@ -156,9 +184,12 @@ class OrderAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ("id", "order", "product", "quantity", "line_total_vnd", "date_added")
     search_fields = ("order__id", "product__name", "product__code")
+    # FK null=True nên changelist không tự select_related -> 2 query mỗi dòng nếu thiếu
+    list_select_related = ("order", "product")
     list_filter = ("date_added",)
     autocomplete_fields = ("order", "product")
     ordering = ("-date_added",)
+    actions = [export_order_items_csv]
     list_per_page = 50
 
     @admin.display(description="Line total (VNĐ)")
@@ -173,7 +204,99 @@ class OrderItemAdmin(admin.ModelAdmin):
 class ShippingAddressAdmin(admin.ModelAdmin):
     list_display = ("id", "order", "customer", "address", "city", "state", "mobile", "date_added")
     search_fields = ("order__id", "customer__name", "address", "city", "state", "mobile")
+    list_select_related = ("order", "customer")
     list_filter = ("date_added",)
     autocomplete_fields = ("order", "customer")
     ordering = ("-date_added",)
     list_per_page = 50
+
+
+@admin.action(description="Activate selected coupons")
+def activate_coupons(modeladmin, request, queryset):
+    queryset.update(active=True)
+    coupons.invalidate()  # update() không bắn post_save
+
+
+@admin.action(description="Deactivate selected coupons")
+def deactivate_coupons(modeladmin, request, queryset):
+    queryset.update(active=False)
+    coupons.invalidate()
+
+
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    list_display = ("code", "kind", "value", "min_subtotal", "active", "starts_at", "ends_at", "usage")
+    list_filter = ("active", "kind")
+    search_fields = ("code",)
+    readonly_fields = ("times_used",)
+    ordering = ("code",)
+    actions = [activate_coupons, deactivate_coupons]
+    list_per_page = 50
+
+    @admin.display(description="Used", ordering="times_used")
+    def usage(self, obj: Coupon):
+        if obj.usage_limit is None:
+            return f"{obj.times_used}"
+        return f"{obj.times_used} / {obj.usage_limit}"
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "subject", "to", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    search_fields = ("subject", "to")
+    list_filter = ("status", "created_at")
+    readonly_fields = ("attempts", "last_error", "created_at", "sent_at")
+    ordering = ("-created_at",)
+    actions = [retry_emails]
+    list_per_page = 50
+
+
+@admin.register(DailySales)
+class SalesDashboardAdmin(admin.ModelAdmin):
+    """Dashboard doanh thu: chỉ đọc bảng rollup (manage.py rollup_sales), không query Order."""
+    change_list_template = "admin/app/sales_dashboard.html"
+    periods = (7, 30, 90)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        try:
+            days = int(request.GET.get("days", 30))
+        except ValueError:
+            days = 30
+        if days not in self.periods:
+            days = 30
+
+        series = rollups.daily_series(days)
+        peak = max(row["revenue"] for row in series) or 1
+        for row in series:
+            row["percent"] = round(row["revenue"] * 100 / peak, 1)
+            row["revenue_vnd"] = f"{int(row['revenue']):,}"
+        products = rollups.top_products(days)
+        top = products[0]["revenue"] if products and products[0]["revenue"] else 1
+        for row in products:
+            row["percent"] = round(row["revenue"] * 100 / top, 1)
+            row["revenue_vnd"] = f"{int(row['revenue']):,}"
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Sales dashboard",
+            "opts": self.model._meta,
+            "days": days,
+            "periods": self.periods,
+            "series": series,
+            "top_products": products,
+            "revenue": f"{int(sum(row['revenue'] for row in series)):,}",
+            "orders": f"{sum(row['orders'] for row in series):,}",
+            "items": f"{sum(row['items'] for row in series):,}",
+            "state": RollupState.objects.filter(name=rollups.STATE_NAME).first(),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, self.change_list_template, context)
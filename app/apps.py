@@ -7,4 +7,5 @@ class AppConfig(AppConfig):
 
     def ready(self):
         from FurnitureSales import signals
+        from . import checks  # đăng ký system check
         # ...existing code...
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""
+Static asset build cho production (`manage.py build_static`).
+
+- Gộp CSS / JS của base.html thành STATIC_BUNDLES (app/bundles/base.css, base.js),
+  minify nhẹ, ghi vào app/static/app/bundles/ rồi collectstatic với ManifestStorage
+  -> tên file có hash nội dung (base.3f2a9c1e7b4d.css) nên cache được 1 năm.
+- Mỗi file trong STATIC_ROOT có thêm bản .gz (và .br nếu cài brotli), serve_static
+  chọn bản nén theo Accept-Encoding, không phải nén lại mỗi request.
+- Chỉ bật khi STATIC_BUILD=1; lúc dev vẫn load từng file như cũ. STATIC_BUILD=1 mà
+  chưa build (manifest chưa có bundle) -> vẫn load từng file nguồn, không lỗi trang.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+try:
+    import brotli
+except ImportError:  # brotli là optional, không có thì chỉ tạo .gz
+    brotli = None
+
+BUNDLE_DIR = os.path.join(settings.BASE_DIR, "app", "static", "app", "bundles")
+BUNDLE_PREFIX = "app/bundles/"
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map")
+MIN_COMPRESS_SIZE = 512  # file nhỏ hơn thì nén không lợi
+
+# tên do ManifestStaticFilesStorage sinh ra: name.<12 hex>.ext
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+DEFAULT_CACHE = "public, max-age=300"
+
+
+class ManifestStorage(ManifestStaticFilesStorage):
+    """
+    Template còn {% static %} trỏ tới file không có trong manifest (ảnh cũ) ->
+    trả tên gốc thay vì ValueError làm hỏng cả trang.
+    """
+
+    manifest_strict = False
+
+
+def bundles_enabled():
+    return getattr(settings, "STATIC_USE_BUNDLES", False)
+
+
+def bundle_sources(name):
+    try:
+        return settings.STATIC_BUNDLES[name]
+    except KeyError:
+        raise KeyError(f"Unknown static bundle: {name}") from None
+
+
+def built_bundle(name):
+    """Path của bundle trong manifest (để {% static %} ra tên có hash), None nếu chưa build."""
+    path = BUNDLE_PREFIX + name
+    hashed_files = getattr(staticfiles_storage, "hashed_files", None)
+    if hashed_files and staticfiles_storage.hash_key(path) in hashed_files:
+        return path
+    return None
+
+
+# -----------------------------
+# Minify
+# -----------------------------
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+CSS_SPACE_RE = re.compile(r"\s+")
+CSS_PUNCT_RE = re.compile(r"\s*([{}:;,>])\s*")
+
+
+def minify_css(text):
+    text = CSS_COMMENT_RE.sub("", text)
+    text = CSS_SPACE_RE.sub(" ", text)
+    text = CSS_PUNCT_RE.sub(r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+# trước "/" là 1 trong các ký tự / từ khoá này -> "/" mở regex literal, không phải phép chia
+JS_REGEX_PREV = set("(,=:[!&|?{};+-*%<>~^")
+JS_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw"}
+JS_BLANK_LINES_RE = re.compile(r"[ \t]*\n\s*")
+
+
+def _js_string_end(text, i, quote):
+    """Vị trí ngay sau string '...' / "..." bắt đầu ở i."""
+    i += 1
+    while i < len(text) and text[i] != quote and text[i] != "\n":
+        i += 2 if text[i] == "\\" else 1
+    return min(i + 1, len(text))
+
+
+def _js_template_end(text, i):
+    """Quét phần chữ của template literal từ i tới ` (trả (vị trí, False)) hoặc ${ (trả (vị trí, True))."""
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+        elif text[i] == "`":
+            return i + 1, False
+        elif text.startswith("${", i):
+            return i + 2, True
+        else:
+            i += 1
+    return len(text), False
+
+
+def _js_regex_end(text, i):
+    in_class = False
+    i += 1
+    while i < len(text) and text[i] != "\n":
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            in_class = True
+        elif ch == "]":
+            in_class = False
+        elif ch == "/" and not in_class:
+            i += 1
+            while i < len(text) and text[i].isalpha():  # flags
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _regex_allowed(code):
+    """code: phần code (không gồm string / comment) ngay trước "/"."""
+    stripped = code.rstrip()
+    if not stripped or stripped[-1] in JS_REGEX_PREV:
+        return True
+    word = re.search(r"[A-Za-z_$]+$", stripped)
+    return bool(word) and word.group() in JS_REGEX_KEYWORDS
+
+
+def minify_js(text):
+    """
+    Minify nhẹ có tách token: bỏ comment, thụt lề và dòng trống ở phần code; string,
+    template literal (kể cả ${...} lồng nhau) và regex literal giữ nguyên từng ký tự.
+    Giữ xuống dòng giữa các câu lệnh nên không phụ thuộc vào dấu ; (ASI).
+    """
+    out = []        # đoạn code đã bỏ comment, xen kẽ với literal (đánh dấu bằng None ở code)
+    code = []       # các đoạn code liên tiếp chưa ghi ra out
+    tail = ""       # vài ký tự code cuối cùng, để phân biệt regex / phép chia
+    templates = []  # số { đang mở trong mỗi ${...} chưa đóng
+    i, start, n = 0, 0, len(text)
+
+    def take_code(end):
+        nonlocal tail
+        code.append(text[start:end])
+        tail = (tail + text[start:end])[-20:]
+
+    def emit_literal(literal):
+        nonlocal tail
+        out.append(JS_BLANK_LINES_RE.sub("\n", "".join(code)))
+        out.append(literal)
+        code.clear()
+        tail = "0"  # sau literal, "/" là phép chia
+
+    while i < n:
+        ch = text[i]
+        if ch in "'\"`" or (ch == "}" and templates and templates[-1] == 0):
+            take_code(i)
+            if ch in "`}":
+                if ch == "}":
+                    templates.pop()
+                end, opened = _js_template_end(text, i + 1)
+                if opened:
+                    templates.append(0)
+            else:
+                end = _js_string_end(text, i, ch)
+            emit_literal(text[i:end])
+        elif text.startswith("//", i):
+            take_code(i)
+            end = text.find("\n", i)
+            end = n if end < 0 else end
+        elif text.startswith("/*", i):
+            take_code(i)
+            end = text.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            code.append("\n" if "\n" in text[i:end] else " ")
+        elif ch == "/" and _regex_allowed(tail + text[start:i]):
+            take_code(i)
+            end = _js_regex_end(text, i)
+            emit_literal(text[i:end])
+        else:
+            if templates and ch == "{":
+                templates[-1] += 1
+            elif templates and ch == "}":
+                templates[-1] -= 1
+            i += 1
+            continue
+        i = start = end
+    take_code(n)
+    out.append(JS_BLANK_LINES_RE.sub("\n", "".join(code)))
+    return "".join(out).strip()
+
+
+def build_bundle(name):
+    """Gộp + minify 1 bundle, trả (nội dung, số byte trước minify)."""
+    parts = []
+    raw_size = 0
+    for source in bundle_sources(name):
+        with open(os.path.join(settings.BASE_DIR, "app", "static", source), encoding="utf-8") as f:
+            text = f.read()
+        raw_size += len(text.encode("utf-8"))
+        if name.endswith(".css"):
+            parts.append(minify_css(text))
+        else:
+            # không bọc try: lỗi ở 1 file phải hiện ra (console / error tracking), file nguồn
+            # tự kiểm tra phần tử trên trang; ";" phòng file trước không kết thúc bằng ;
+            parts.append(f"/* {source} */\n;{minify_js(text)}")
+    return "\n".join(parts) + "\n", raw_size
+
+
+def write_bundles():
+    """Ghi toàn bộ STATIC_BUNDLES vào BUNDLE_DIR, trả {name: {raw, min}}."""
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    sizes = {}
+    for name in settings.STATIC_BUNDLES:
+        content, raw_size = build_bundle(name)
+        data = content.encode("utf-8")
+        with open(os.path.join(BUNDLE_DIR, name), "wb") as f:
+            f.write(data)
+        sizes[BUNDLE_PREFIX + name] = {"raw": raw_size, "min": len(data)}
+    return sizes
+
+
+# -----------------------------
+# Nén trước (.gz / .br)
+# -----------------------------
+def compress_file(path):
+    """Tạo path.gz (+ path.br), trả {"gz": size, "br": size} (bỏ qua nếu không nhỏ hơn)."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    encoded = {"gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(data, quality=11)
+
+    sizes = {}
+    for ext, payload in encoded.items():
+        target = f"{path}.{ext}"
+        if len(payload) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        with open(target, "wb") as f:
+            f.write(payload)
+        sizes[ext] = len(payload)
+    return sizes
+
+
+def compress_static_root(root=None):
+    """Nén mọi file text trong STATIC_ROOT, trả {relative path: sizes}."""
+    root = root or settings.STATIC_ROOT
+    results = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, filename)
+            if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            results[rel] = compress_file(path)
+    return results
+
+
+# -----------------------------
+# Serve từ STATIC_ROOT
+# -----------------------------
+def _accepted_encodings(request):
+    header = request.headers.get("Accept-Encoding", "")
+    return {part.split(";")[0].strip().lower() for part in header.split(",") if part.strip()}
+
+
+@require_GET
+def serve_static(request, path):
+    """
+    Serve file đã build trong STATIC_ROOT (khi không có nginx / CDN phía trước).
+    Tên có hash -> Cache-Control immutable 1 năm, tên thường -> 5 phút.
+    """
+    fullpath = safe_join(settings.STATIC_ROOT, path)  # path ngoài STATIC_ROOT -> 400
+    if not os.path.isfile(fullpath):
+        # chưa chạy build_static: file nguồn (app/static) cho bản không bundle
+        fullpath = finders.find(path)
+        if not fullpath:
+            raise Http404("File not found")
+
+    filename = os.path.basename(fullpath)
+    content_type, _ = mimetypes.guess_type(fullpath)
+    accepted = _accepted_encodings(request)
+    encoding = None
+    for ext, name in (("br", "br"), ("gz", "gzip")):
+        if name in accepted and os.path.isfile(f"{fullpath}.{ext}"):
+            fullpath, encoding = f"{fullpath}.{ext}", name
+            break
+
+    response = FileResponse(
+        open(fullpath, "rb"), content_type=content_type or "application/octet-stream", filename=filename
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Last-Modified"] = http_date(os.path.getmtime(fullpath))
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE if HASHED_NAME_RE.search(path) else DEFAULT_CACHE
+    return response
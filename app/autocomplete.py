@@ -0,0 +1,262 @@
+"""
+Index prefix trong bộ nhớ cho ô search (typeahead) -> mỗi phím gõ không chạm tới SQLite.
+
+- Key = tên / mã product đã bỏ dấu tiếng Việt + lowercase, thêm 1 key cho mỗi vị trí
+  bắt đầu từ trong tên ("ghe sofa go" -> "ghe sofa go", "sofa go", "go")
+  nên gõ "sofa" vẫn ra "Ghế sofa gỗ".
+- List (key, product_id) sắp xếp sẵn, tìm bằng bisect: O(log n) + số kết quả.
+- Cập nhật từng product qua signals: process đã ghi sửa index ngay, đồng thời ghi
+  (id, name, code) vào change log trong cache dùng chung (alias "catalog").
+  Process khác xem log tối đa mỗi AUTOCOMPLETE_CHECK_INTERVAL giây và áp từng thay đổi
+  (đọc cache, không query DB).
+- Build lại toàn bộ chỉ khi autocomplete generation đổi (ghi hàng loạt không qua signal,
+  vd import_catalog -> invalidate()) hoặc log bị thiếu / quá dài. Build trong thread nền,
+  trong lúc đó vẫn trả lời bằng index cũ. Không có request nào phải chờ build lại.
+- Lần đầu (process mới, chưa có index): build trong nền, trả lời tạm bằng
+  search.suggest() (FTS5). AUTOCOMPLETE_BACKGROUND_REBUILD=False -> build ngay trong request.
+"""
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connection
+
+from . import catalog_cache, search
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "autocomplete:generation"
+CHANGE_SEQ_KEY = "autocomplete:changes"
+CHANGE_KEY = "autocomplete:change:{seq}"
+# nhiều thay đổi hơn số này kể từ lần xem trước -> build lại thay vì áp từng cái
+MAX_CHANGES = 200
+
+
+def normalize(text):
+    """Bỏ dấu tiếng Việt (kể cả đ/Đ), lowercase, gộp khoảng trắng."""
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def _keys_for(norm_name, code):
+    keys = set()
+    words = norm_name.split()
+    for i in range(len(words)):
+        keys.add(" ".join(words[i:]))
+    code = normalize(code)
+    if code:
+        keys.add(code)
+    return keys
+
+
+# Số entry khớp prefix được xét tối đa cho mỗi lần suggest (giữ thời gian trả lời < 1ms)
+SCAN_FACTOR = 4
+
+
+# -----------------------------
+# Generation + change log (cache dùng chung giữa các process)
+# -----------------------------
+def _cache():
+    return caches[catalog_cache.CACHE_ALIAS]
+
+
+def _state():
+    """(generation, seq) hiện tại. Key bị evict -> khởi tạo bằng timestamp (ms) như catalog version."""
+    values = _cache().get_many([GENERATION_KEY, CHANGE_SEQ_KEY])
+    for key in (GENERATION_KEY, CHANGE_SEQ_KEY):
+        if key not in values:
+            _cache().add(key, int(time.time() * 1000), None)
+            values[key] = _cache().get(key)
+    return values[GENERATION_KEY], values[CHANGE_SEQ_KEY]
+
+
+def _incr(key):
+    try:
+        return _cache().incr(key)
+    except ValueError:
+        value = int(time.time() * 1000)
+        _cache().set(key, value, None)
+        return value
+
+
+def _record_change(product_id, fields):
+    seq = _incr(CHANGE_SEQ_KEY)
+    _cache().set(CHANGE_KEY.format(seq=seq), (product_id, fields), getattr(settings, "CATALOG_CACHE_TIMEOUT", 3600))
+
+
+def product_changed(product):
+    """Product vừa lưu (on_commit): sửa index của process này + ghi log cho process khác."""
+    index.update(product)
+    _record_change(product.pk, (product.name, product.code))
+
+
+def product_removed(product_id):
+    index.remove(product_id)
+    _record_change(product_id, None)
+
+
+def invalidate():
+    """Ghi hàng loạt không qua signal (import catalog): mọi process build lại index."""
+    _incr(GENERATION_KEY)
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []      # [(key, product_id)] đã sort
+        self._products = {}     # product_id -> (name, code, normalized name, keys)
+        self._built_at = None
+        self._generation = None  # autocomplete generation lúc build
+        self._seq = None         # thay đổi cuối cùng đã áp từ change log
+        self._checked_at = None
+        self._rebuilding = False
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    def _refresh(self):
+        """
+        Áp change log, hoặc build lại (trong nền) khi generation đổi.
+        Trả False nếu chưa có index để dùng.
+        """
+        now = time.monotonic()
+        if self.is_built and self._checked_at is not None and (
+            now - self._checked_at < getattr(settings, "AUTOCOMPLETE_CHECK_INTERVAL", 2)
+        ):
+            return True
+
+        self._checked_at = now
+        if self.is_built:
+            generation, seq = _state()
+            if generation == self._generation and (seq == self._seq or self._apply_changes(seq)):
+                return True
+
+        if not getattr(settings, "AUTOCOMPLETE_BACKGROUND_REBUILD", True):
+            self.rebuild()
+            return True
+        self._start_rebuild()
+        return self.is_built
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name="autocomplete-rebuild", daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Autocomplete index rebuild failed")
+        finally:
+            self._rebuilding = False
+            connection.close()  # connection riêng của thread này
+
+    def _apply_changes(self, seq):
+        """Áp các thay đổi (self._seq, seq] từ change log. False -> phải build lại."""
+        if not 0 < seq - self._seq <= MAX_CHANGES:
+            return False
+        keys = [CHANGE_KEY.format(seq=n) for n in range(self._seq + 1, seq + 1)]
+        changes = _cache().get_many(keys)
+        if len(changes) != len(keys):
+            return False  # entry đã hết hạn / bị evict
+
+        with self._lock:
+            for key in keys:
+                product_id, fields = changes[key]
+                if fields is None:
+                    self._remove_locked(product_id)
+                else:
+                    self._put_locked(product_id, *fields)
+            self._seq = seq
+        return True
+
+    def rebuild(self):
+        # lấy generation + seq trước khi đọc DB: thay đổi trong lúc build sẽ được áp lại lần sau.
+        # Đọc primary: replica có thể chưa có các thay đổi trước seq.
+        generation, seq = _state()
+        rows = Product.objects.db_manager(DEFAULT_DB_ALIAS).values_list("id", "name", "code")
+        products = {}
+        entries = []
+        for product_id, name, code in rows.iterator(chunk_size=2000):
+            norm_name = normalize(name)
+            keys = _keys_for(norm_name, code)
+            products[product_id] = (name, code, norm_name, keys)
+            entries.extend((key, product_id) for key in keys)
+        entries.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._products = products
+            self._built_at = time.monotonic()
+            self._generation = generation
+            self._seq = seq
+
+    def _remove_locked(self, product_id):
+        old = self._products.pop(product_id, None)
+        if old is None:
+            return
+        for key in old[3]:
+            i = bisect.bisect_left(self._entries, (key, product_id))
+            if i < len(self._entries) and self._entries[i] == (key, product_id):
+                del self._entries[i]
+
+    def _put_locked(self, product_id, name, code):
+        self._remove_locked(product_id)
+        norm_name = normalize(name)
+        keys = _keys_for(norm_name, code)
+        self._products[product_id] = (name, code, norm_name, keys)
+        for key in keys:
+            bisect.insort(self._entries, (key, product_id))
+
+    def update(self, product):
+        """Thêm / cập nhật 1 product (gọi từ signal). Chưa build thì bỏ qua."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._put_locked(product.id, product.name, product.code)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def suggest(self, prefix, limit=8):
+        """
+        Product có tên / mã bắt đầu bằng `prefix` (hoặc có từ bắt đầu bằng prefix):
+        [{id, name, code}], ưu tiên tên bắt đầu bằng prefix.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        if not self._refresh():
+            return search.suggest(prefix, limit)
+        with self._lock:
+            start = bisect.bisect_left(self._entries, (prefix,))
+            leading, inner, seen = [], [], set()
+            for i in range(start, len(self._entries)):
+                key, product_id = self._entries[i]
+                if not key.startswith(prefix) or len(seen) >= limit * SCAN_FACTOR:
+                    break
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                name, code, norm_name, _ = self._products[product_id]
+                (leading if norm_name.startswith(prefix) else inner).append(
+                    {"id": product_id, "name": name, "code": code}
+                )
+                if len(leading) >= limit:
+                    break
+        return (leading + inner)[:limit]
+
+
+index = PrefixIndex()
@@ -0,0 +1,4 @@
+"""
+Benchmark in-process cho storefront (chạy qua manage.py bench_*).
+Mọi benchmark chạy trên test database tạm (không đụng db.sqlite3).
+"""
@@ -0,0 +1,74 @@
+"""
+Sinh dữ liệu benchmark qua model thật: customer (user + Customer), product, article,
+order đã thanh toán. Cố định seed -> cùng tham số thì cùng dữ liệu, so sánh được giữa các commit.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from app import search
+from app.models import Article, Customer, Order, OrderItem, Product
+
+PASSWORD = "benchmark-pass"
+
+PRODUCT_KINDS = ["Sofa", "Ghế", "Bàn", "Tủ", "Giường", "Kệ", "Đèn", "Thảm"]
+MATERIALS = ["gỗ sồi", "da", "vải nỉ", "mây", "kim loại", "gỗ óc chó"]
+
+
+def generate(customers=20, products=200, articles=20, orders=100, seed=42):
+    """Tạo dữ liệu, trả về dict số lượng + username của các customer."""
+    rng = random.Random(seed)
+
+    # hash password 1 lần rồi dùng chung (PBKDF2 cho từng user rất chậm)
+    password = make_password(PASSWORD)
+    users = User.objects.bulk_create(
+        User(username=f"bench{i:04d}", email=f"bench{i:04d}@example.com", password=password)
+        for i in range(customers)
+    )
+    customer_rows = Customer.objects.bulk_create(
+        Customer(user=user, name=user.username, email=user.email) for user in users
+    )
+
+    product_rows = Product.objects.bulk_create(
+        Product(
+            name=f"{rng.choice(PRODUCT_KINDS)} {rng.choice(MATERIALS)} {i}",
+            code=f"BN{i:05d}",
+            price=rng.randrange(500, 50000) * 1000,
+        )
+        for i in range(products)
+    )
+    Article.objects.bulk_create(
+        Article(
+            name=f"Cảm hứng nội thất #{i}",
+            date_up=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2026",
+            content=" ".join(rng.choice(MATERIALS) for _ in range(40)),
+        )
+        for i in range(articles)
+    )
+
+    # order đã thanh toán (lịch sử) để các bảng order / orderitem có kích thước thật
+    if customer_rows and product_rows:
+        order_rows = Order.objects.bulk_create(
+            Order(customer=rng.choice(customer_rows), complete=True, transaction_id=f"bench-{i}")
+            for i in range(orders)
+        )
+        items = []
+        for order in order_rows:
+            for product in rng.sample(product_rows, k=min(len(product_rows), rng.randint(1, 5))):
+                items.append(OrderItem(order=order, product=product, quantity=rng.randint(1, 3)))
+        OrderItem.objects.bulk_create(items)
+        Order.objects.filter(complete=True).recalculate_totals()
+
+    # bulk_create không gửi signal -> tự build FTS index
+    if search.is_available():
+        search.rebuild()
+
+    return {
+        "customers": customers,
+        "products": products,
+        "articles": articles,
+        "orders": orders,
+        "seed": seed,
+        "usernames": [user.username for user in users],
+    }
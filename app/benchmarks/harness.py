@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from app.models import Article, Customer, Product
+
+
+@contextmanager
+def test_database(verbosity=0, on_disk=False):
+    """
+    Tạo test database tạm cho benchmark, xoá khi xong.
+    on_disk=True: SQLite dạng file (WAL, nhiều thread / server WSGI dùng chung được)
+    thay vì in-memory.
+    """
+    setup_test_environment()
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    tmpdir = None
+    if on_disk and connection.vendor == "sqlite":
+        tmpdir = tempfile.mkdtemp(prefix="bench-db-")
+        test_settings["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+
+    # catalog cache riêng: cache file dùng chung với server thật có entry của DB thật (pk trùng nhau)
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    catalog = {**settings.CACHES["catalog"], "LOCATION": cache_dir}
+    caches_override = override_settings(CACHES={**settings.CACHES, "catalog": catalog})
+    caches_override.enable()
+
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings["NAME"] = old_test_name
+        caches_override.disable()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        teardown_test_environment()
+
+
+def seed_catalog(products=30, articles=6):
+    Product.objects.bulk_create(
+        Product(name=f"Sofa {i}", code=f"SF{i:05d}", price=1000000 + i * 1000)
+        for i in range(products)
+    )
+    Article.objects.bulk_create(
+        Article(name=f"Article {i}", date_up="01/01/2026", content="...", image="articles/ImgPost1.png")
+        for i in range(articles)
+    )
+
+
+def create_customer(username):
+    user = User.objects.create_user(username, f"{username}@example.com", "benchmark-pass")
+    Customer.objects.create(user=user, name=username, email=user.email)
+    return user
+
+
+def write_report(report, output=None, stdout=None):
+    """Ghi report JSON ra file (nếu có) và stdout, key sort để diff được giữa các commit."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if stdout is not None:
+        stdout.write(text)
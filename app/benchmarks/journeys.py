@@ -0,0 +1,244 @@
+"""
+Kịch bản mua hàng cho benchmark storefront:
+home -> product -> product_detail -> update_item -> cart -> apply_discount -> pay_page -> submit pay_page.
+
+Chạy bằng 2 driver cùng giao diện:
+- ClientDriver: django.test.Client, in-process (không qua socket).
+- HttpDriver: HTTP thật tới server WSGI local (LiveServerThread), có cookie + CSRF như browser.
+
+Latency mỗi bước ghi vào app.metrics.Histogram (micro giây), report JSON sort key,
+làm tròn cố định -> diff được giữa các commit.
+"""
+import http.cookiejar
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.test import Client, override_settings
+from django.test.testcases import LiveServerThread
+
+from app.metrics import QUANTILES, Histogram
+
+from .data import PASSWORD
+
+STEPS = [
+    "home", "product", "product_detail", "update_item", "cart", "apply_discount", "pay_page", "pay_page_submit",
+]
+
+DELIVERY = {"address": "1 Benchmark Street", "city": "Hà Nội", "state": "Hà Nội", "mobile": "0900000000"}
+
+
+# -----------------------------
+# Drivers
+# -----------------------------
+class ClientDriver:
+    """In-process qua django.test.Client (bỏ qua CSRF như test)."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post_form(self, path, data):
+        return self.client.post(path, data).status_code
+
+    def post_json(self, path, data):
+        return self.client.post(path, json.dumps(data), content_type="application/json").status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # giống test Client: không tự đi theo redirect, đo đúng 1 request
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpDriver:
+    """HTTP thật (urllib), giữ cookie session + gửi CSRF token như browser."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ""
+
+    def _open(self, path, data=None, headers=None):
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def get(self, path):
+        return self._open(path)
+
+    def post_form(self, path, data):
+        token = self._csrf_token()
+        body = urllib.parse.urlencode({**data, "csrfmiddlewaretoken": token}).encode()
+        headers = {"Content-Type": "application/x-www-form-urlencoded", "X-CSRFToken": token}
+        return self._open(path, body, headers)
+
+    def post_json(self, path, data):
+        headers = {"Content-Type": "application/json", "X-CSRFToken": self._csrf_token()}
+        return self._open(path, json.dumps(data).encode(), headers)
+
+
+def login(driver, username):
+    driver.get("/signin/")  # lấy csrftoken cookie
+    status = driver.post_form("/signin/", {"username": username, "password": PASSWORD})
+    if status != 302:
+        raise RuntimeError(f"Login failed for {username}: HTTP {status}")
+
+
+@contextmanager
+def live_server():
+    """Server WSGI đa luồng (giống LiveServerTestCase) trên port trống, trả base URL."""
+    hosts = [*settings.ALLOWED_HOSTS, "localhost", "127.0.0.1"]
+    with override_settings(ALLOWED_HOSTS=hosts):
+        thread = LiveServerThread("localhost", StaticFilesHandler)
+        thread.daemon = True
+        thread.start()
+        thread.is_ready.wait()
+        if thread.error:
+            raise thread.error
+        try:
+            yield f"http://localhost:{thread.port}"
+        finally:
+            thread.terminate()
+
+
+# -----------------------------
+# Journey + runner
+# -----------------------------
+def checkout_journey(driver, product_id):
+    """1 lượt mua hàng, trả [(step, status, giây)]."""
+    requests = [
+        ("home", lambda: driver.get("/")),
+        ("product", lambda: driver.get("/product/")),
+        ("product_detail", lambda: driver.get(f"/product/{product_id}/")),
+        ("update_item", lambda: driver.post_json("/update_item/", {"productId": product_id, "action": "add"})),
+        ("cart", lambda: driver.get("/cart/")),
+        ("apply_discount", lambda: driver.post_json("/apply-discount/", {"code": "SAVE10"})),
+        ("pay_page", lambda: driver.get("/pay_page/")),
+        ("pay_page_submit", lambda: driver.post_form("/pay_page/", DELIVERY)),
+    ]
+    results = []
+    for step, send in requests:
+        start = time.perf_counter()
+        try:
+            status = send()
+        except Exception:
+            status = 0
+        results.append((step, status, time.perf_counter() - start))
+    return results
+
+
+def _worker_plan(journeys, concurrency):
+    base, extra = divmod(journeys, concurrency)
+    return [base + (1 if i < extra else 0) for i in range(concurrency)]
+
+
+def run(driver_factory, usernames, product_ids, journeys=50, concurrency=1, warmup=2, seed=42):
+    """
+    Mỗi worker (thread) login 1 customer riêng, chạy warmup lượt (không tính)
+    rồi phần journeys của mình. Trả về dict kết quả.
+    """
+    if len(usernames) < concurrency:
+        raise ValueError("Need at least one customer per concurrent worker.")
+
+    histograms = {step: Histogram() for step in STEPS}
+    overall = Histogram()
+    errors = {step: 0 for step in STEPS}
+    lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+    failures = []
+
+    def worker(index, count):
+        rng = random.Random(seed + index)
+        try:
+            driver = driver_factory()
+            login(driver, usernames[index])
+            for _ in range(warmup):
+                checkout_journey(driver, rng.choice(product_ids))
+        except Exception as exc:
+            failures.append(exc)
+            ready.abort()
+            return
+        ready.wait()
+        for _ in range(count):
+            results = checkout_journey(driver, rng.choice(product_ids))
+            with lock:
+                for step, status, seconds in results:
+                    histograms[step].record(seconds * 1e6)
+                    overall.record(seconds * 1e6)
+                    if not status or status >= 400:
+                        errors[step] += 1
+
+    threads = [
+        threading.Thread(target=worker, args=(index, count))
+        for index, count in enumerate(_worker_plan(journeys, concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        ready.wait()
+    except threading.BrokenBarrierError:
+        pass
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    if failures:
+        raise failures[0]
+
+    requests = overall.count
+    return {
+        "journeys": journeys,
+        "concurrency": concurrency,
+        "warmup": warmup,
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "errors_by_step": errors,
+        "duration_s": round(duration, 3),
+        "requests_per_s": round(requests / duration, 2) if duration else 0.0,
+        "journeys_per_s": round(journeys / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "all": _latency(overall),
+            **{step: _latency(histogram) for step, histogram in histograms.items()},
+        },
+    }
+
+
+def _latency(histogram):
+    return {
+        "count": histogram.count,
+        "mean": round(histogram.total / histogram.count / 1000, 3) if histogram.count else 0.0,
+        "max": round(histogram.max / 1000, 3),
+        **{f"p{int(q * 100)}": round(histogram.percentile(q) / 1000, 3) for q in QUANTILES},
+    }
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "django": django.get_version(),
+        "sqlite": sqlite3.sqlite_version,
+    }
@@ -0,0 +1,91 @@
+"""
+Đếm số lần ghi bảng django_session (INSERT / UPDATE / DELETE) cho cùng 1 kịch bản
+duyệt web, với cấu hình session cũ (db + SESSION_SAVE_EVERY_REQUEST) và các SESSION_MODE mới.
+"""
+import json
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Product
+
+SCENARIOS = {
+    "db+save_every_request": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "SESSION_SAVE_EVERY_REQUEST": True,
+    },
+    "db": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "SESSION_SAVE_EVERY_REQUEST": False,
+    },
+    "cached_db": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "SESSION_SAVE_EVERY_REQUEST": False,
+    },
+    "signed_cookies": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
+        "SESSION_SAVE_EVERY_REQUEST": False,
+    },
+}
+
+SESSION_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+
+def _anonymous_journey(client, product_id):
+    for url in ["/", "/product/", "/article/", f"/product/{product_id}/", "/api/search/suggest/?q=so"]:
+        client.get(url)
+    return 5
+
+
+def _customer_journey(client, product_id):
+    client.get("/")
+    client.get("/product/")
+    client.post(
+        "/update_items/",
+        json.dumps({"items": [{"productId": product_id, "delta": 1}]}),
+        content_type="application/json",
+    )
+    client.get("/cart/")
+    client.get("/checkout/")
+    client.post("/apply-discount/", json.dumps({"code": "SAVE10"}), content_type="application/json")
+    client.get("/checkout/")
+    client.get("/product/")
+    return 8
+
+
+def _session_writes(queries):
+    return sum(
+        1 for q in queries
+        if "django_session" in q["sql"] and q["sql"].lstrip().upper().startswith(SESSION_WRITE_PREFIXES)
+    )
+
+
+def run(user, iterations=5):
+    """Chạy kịch bản cho mỗi cấu hình session, trả về dict kết quả (JSON được)."""
+    product_id = Product.objects.order_by("id").values_list("id", flat=True).first()
+    results = {}
+
+    for name, overrides in SCENARIOS.items():
+        with override_settings(**overrides):
+            anonymous = Client()
+            customer = Client()
+            customer.force_login(user)
+
+            requests = 0
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(iterations):
+                    requests += _anonymous_journey(anonymous, product_id)
+                    requests += _customer_journey(customer, product_id)
+
+        writes = _session_writes(queries.captured_queries)
+        results[name] = {
+            "requests": requests,
+            "session_writes": writes,
+            "writes_per_request": round(writes / requests, 3),
+        }
+
+    baseline = results["db+save_every_request"]["session_writes"]
+    for result in results.values():
+        result["write_reduction"] = round(1 - result["session_writes"] / baseline, 3) if baseline else 0.0
+    return {"benchmark": "sessions", "iterations": iterations, "results": results}
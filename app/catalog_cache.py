@@ -0,0 +1,162 @@
+"""
+Read-through cache cho catalog (Product / Article) dựa trên Django cache framework.
+
+- Cache alias "catalog" (settings.CACHES), backend file (mặc định, dùng chung giữa
+  các worker / lệnh manage.py) hoặc locmem (chỉ 1 process), chọn bằng CATALOG_CACHE_BACKEND.
+- Từng trang product / article (keyset, xem pagination.py) và từng product
+  (product_detail) được cache dưới dạng instance đã pickle. Mọi key đều có
+  catalog version nên không cần xoá từng key khi catalog thay đổi; bản đọc từ
+  replica chưa kịp đồng bộ cũng hết hạn khi snapshot_replica tăng version.
+- Xoá cache khi Product / Article thay đổi (post_save / post_delete,
+  xem FurnitureSales/signals.py) -> addProduct, addArticle, admin đều được tính.
+- Fragment HTML (product grid, top-3 ở home) cache theo catalog version,
+  version tăng mỗi lần invalidate nên fragment cũ tự bị bỏ qua
+  (xem templatetags/catalog_tags.py).
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Article, Product
+from .pagination import keyset_paginate, page_size
+
+CACHE_ALIAS = "catalog"
+
+PRODUCT_PAGE_KEY = "catalog:products:{version}:{after}:{limit}"
+ARTICLE_PAGE_KEY = "catalog:articles:{version}:{after}:{limit}"
+PRODUCT_DETAIL_KEY = "catalog:product:{version}:{pk}"
+VERSION_KEY = "catalog:version"
+FRAGMENT_KEY = "catalog:fragment:{name}:{version}:{vary}"
+
+# hits / misses theo loại: "data" = list / detail, "fragment" = HTML đã render
+_stats_lock = threading.Lock()
+_stats = {"data": [0, 0], "fragment": [0, 0]}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _timeout():
+    return getattr(settings, "CATALOG_CACHE_TIMEOUT", 3600)
+
+
+def _record(kind, hit):
+    with _stats_lock:
+        _stats[kind][0 if hit else 1] += 1
+
+
+def _get_or_load(key, loader, kind="data"):
+    value = _cache().get(key)
+    if value is not None:
+        _record(kind, True)
+        return value
+
+    _record(kind, False)
+    value = loader()
+    if value is not None:
+        _cache().set(key, value, _timeout())
+    return value
+
+
+# -----------------------------
+# Read API
+# -----------------------------
+def get_product_page(after=None, limit=None):
+    """1 trang Product (KeysetPage) sau cursor `after`."""
+    limit = page_size(limit)
+    key = PRODUCT_PAGE_KEY.format(version=catalog_version(), after=after or 0, limit=limit)
+    return _get_or_load(key, lambda: keyset_paginate(Product.objects.all(), after, limit))
+
+
+def get_article_page(after=None, limit=None):
+    """1 trang Article (KeysetPage) sau cursor `after`."""
+    limit = page_size(limit)
+    key = ARTICLE_PAGE_KEY.format(version=catalog_version(), after=after or 0, limit=limit)
+    return _get_or_load(key, lambda: keyset_paginate(Article.objects.all(), after, limit))
+
+
+def get_product(pk):
+    """Product theo id, None nếu không tồn tại (không cache kết quả None)."""
+    return _get_or_load(
+        PRODUCT_DETAIL_KEY.format(version=catalog_version(), pk=pk),
+        lambda: Product.objects.filter(pk=pk).first(),
+    )
+
+
+# -----------------------------
+# Catalog version + fragments
+# -----------------------------
+def catalog_version():
+    """
+    Version hiện tại của catalog. Nếu key bị evict thì khởi tạo bằng timestamp (ms)
+    để không trùng với version cũ còn nằm trong cache.
+    """
+    version = _cache().get(VERSION_KEY)
+    if version is None:
+        _cache().add(VERSION_KEY, int(time.time() * 1000), None)
+        version = _cache().get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        return _cache().incr(VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        _cache().set(VERSION_KEY, version, None)
+        return version
+
+
+def get_fragment(name, vary_on, render):
+    """HTML của fragment `name` ở catalog version hiện tại; render() khi miss."""
+    # json list thay vì nối ":" -> ["1:2", "3"] và ["1", "2:3"] không trùng key
+    vary = hashlib.md5(json.dumps([str(v) for v in vary_on]).encode()).hexdigest()
+    key = FRAGMENT_KEY.format(name=name, version=catalog_version(), vary=vary)
+    return _get_or_load(key, render, kind="fragment")
+
+
+# -----------------------------
+# Invalidation
+# -----------------------------
+def invalidate_product(pk=None):
+    # detail key có version -> tăng version là đủ, entry cũ hết hạn theo TTL
+    bump_version()
+
+
+def invalidate_products(pks):
+    """Như invalidate_product cho nhiều product (import catalog): tăng version 1 lần."""
+    bump_version()
+
+
+def invalidate_articles():
+    bump_version()
+
+
+# -----------------------------
+# Stats
+# -----------------------------
+def stats():
+    """Số lần hit / miss (trong process hiện tại) và hit rate, theo loại data / fragment."""
+    with _stats_lock:
+        snapshot = {kind: tuple(counts) for kind, counts in _stats.items()}
+
+    result = {"version": catalog_version()}
+    for kind, (hits, misses) in snapshot.items():
+        total = hits + misses
+        result[kind] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        for counts in _stats.values():
+            counts[0] = counts[1] = 0
@@ -0,0 +1,359 @@
+"""
+Import / export catalog Product dạng CSV hoặc JSONL
+(`manage.py import_catalog` / `manage.py export_catalog`, cùng 1 định dạng).
+
+- Đọc / ghi từng dòng -> bộ nhớ cố định dù file 100k dòng.
+- Upsert theo `code`, mỗi batch: 1 query tra code đã có, 1 bulk_create cho code mới,
+  1 executemany UPDATE cho dòng có thay đổi (dòng y hệt thì bỏ qua), trong 1 transaction ngắn.
+- bulk_* không bắn signal -> tự làm phần của FurnitureSales/signals.py: FTS index,
+  cache catalog, autocomplete, tổng tiền giỏ hàng đang mở khi đổi giá.
+- Có thư mục ảnh: copy ảnh vào MEDIA_ROOT/products/ và tạo thumbnail ngay (process pool).
+"""
+import csv
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files import File
+from django.db import connections, router
+from PIL import Image, UnidentifiedImageError
+
+from . import autocomplete, catalog_cache, search, thumbnails
+from .db import write_transaction
+from .models import Order, OrderItem, Product
+
+FIELDS = ["code", "name", "price", "digital", "image"]
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "n", "f", ""}
+
+
+class CatalogRowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path!r}, use --format csv|jsonl.")
+    return FORMATS[ext]
+
+
+# -----------------------------
+# Đọc + kiểm tra từng dòng
+# -----------------------------
+def read_rows(stream, fmt):
+    """Yield (số dòng, dict) theo thứ tự file, không đọc hết file vào bộ nhớ."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for raw in reader:
+            yield reader.line_num, raw
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, line  # clean_row báo lỗi
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise CatalogRowError(f"digital: invalid boolean {value!r}")
+
+
+def clean_row(raw):
+    """
+    dict từ file -> {field: giá trị} đã chuẩn hoá. Cột không có trong file thì
+    không có trong kết quả (không ghi đè giá trị đang có).
+    """
+    if not isinstance(raw, dict):
+        raise CatalogRowError("not a JSON object")
+
+    code = str(raw.get("code") or "").strip()
+    if not code:
+        raise CatalogRowError("code is required")
+    if len(code) > Product._meta.get_field("code").max_length:
+        raise CatalogRowError(f"code too long: {code!r}")
+    values = {"code": code}
+
+    if raw.get("name") not in (None, ""):
+        name = str(raw["name"]).strip()
+        if len(name) > Product._meta.get_field("name").max_length:
+            raise CatalogRowError("name too long")
+        values["name"] = name
+
+    if raw.get("price") not in (None, ""):
+        try:
+            price = float(raw["price"])
+        except (TypeError, ValueError):
+            raise CatalogRowError(f"price: invalid number {raw['price']!r}") from None
+        if not math.isfinite(price) or price < 0:
+            raise CatalogRowError(f"price: must be >= 0, got {raw['price']!r}")
+        values["price"] = price
+
+    if "digital" in raw and raw["digital"] is not None:
+        values["digital"] = _bool(raw["digital"])
+
+    if "image" in raw and raw["image"] is not None:
+        values["image"] = str(raw["image"]).strip()
+    return values
+
+
+# -----------------------------
+# Ảnh
+# -----------------------------
+def _generate_one(path):
+    """Chạy được trong process con: (digest, None), hoặc (None, lỗi) nếu ảnh hỏng."""
+    try:
+        return thumbnails.generate_from_path(path), None
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        return None, str(e) or e.__class__.__name__
+
+
+class ImageImporter:
+    """
+    Copy ảnh từ thư mục nguồn vào storage của Product.image (products/<tên file>)
+    rồi tạo thumbnail. workers > 1: tạo thumbnail bằng process pool như generate_thumbnails.
+    """
+
+    def __init__(self, source_dir, workers=1):
+        self.source_dir = os.path.abspath(source_dir)
+        self.workers = workers
+        self.storage = Product._meta.get_field("image").storage
+        self._pool = None
+
+    def _store(self, relative):
+        source = os.path.abspath(os.path.join(self.source_dir, relative))
+        if os.path.commonpath([source, self.source_dir]) != self.source_dir:
+            raise CatalogRowError(f"image outside the image directory: {relative!r}")
+        if not os.path.isfile(source):
+            raise CatalogRowError(f"image not found: {relative!r}")
+
+        name = "products/" + os.path.basename(source)
+        # file cùng tên, cùng nội dung thì dùng lại (import lại không nhân bản ảnh)
+        if self.storage.exists(name):
+            if thumbnails.file_digest(self.storage.path(name)) == thumbnails.file_digest(source):
+                return name
+        with open(source, "rb") as f:
+            return self.storage.save(name, File(f))
+
+    def _generate(self, paths):
+        if self.workers <= 1:
+            return [_generate_one(path) for path in paths]
+        if self._pool is None:
+            # không mang connection DB sang process con
+            connections.close_all()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self._pool.map(_generate_one, paths, chunksize=8))
+
+    def prepare(self, rows):
+        """
+        rows: {code: (line, values)}. Đổi values["image"] sang tên trong storage + image_hash.
+        Ảnh thiếu / hỏng: bỏ dòng đó khỏi rows, trả về [(line, lỗi)], các dòng khác vẫn import.
+        """
+        errors = []
+        names = {}
+        for code, (line_no, values) in list(rows.items()):
+            if not values.get("image"):
+                continue
+            try:
+                names[code] = self._store(values["image"])
+            except (CatalogRowError, OSError) as e:
+                errors.append((line_no, str(e)))
+                del rows[code]
+
+        codes = list(names)
+        results = self._generate([self.storage.path(names[code]) for code in codes])
+        for code, (digest, error) in zip(codes, results):
+            line_no, values = rows[code]
+            if error is not None:
+                errors.append((line_no, f"image {values['image']!r}: {error}"))
+                del rows[code]
+                continue
+            values["image"] = names[code]
+            values["image_hash"] = digest
+        return errors
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+# -----------------------------
+# Upsert
+# -----------------------------
+def _same(field, current, new):
+    if field in ("name", "image"):
+        return (current or "") == (new or "")
+    return current == new
+
+
+def _update_rows(products, fields):
+    """
+    UPDATE từng dòng bằng executemany (1 câu prepared, chạy lại với từng bộ tham số).
+    bulk_update sinh CASE WHEN theo từng id -> chậm dần theo số dòng trên SQLite.
+    """
+    model_fields = [Product._meta.get_field(name) for name in fields]
+    connection = connections[router.db_for_write(Product)]
+    quote = connection.ops.quote_name
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        quote(Product._meta.db_table),
+        ", ".join(f"{quote(field.column)} = %s" for field in model_fields),
+        quote(Product._meta.pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(field.pre_save(product, False), connection) for field in model_fields]
+        + [product.pk]
+        for product in products
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _plan(rows, result):
+    """Chia rows thành product cần tạo / cần sửa (+ các field đổi, id đổi giá)."""
+    # code không unique trong DB -> nhiều dòng cùng code thì cập nhật dòng id nhỏ nhất
+    existing = {}
+    for product in Product.objects.filter(code__in=list(rows)).order_by("-pk"):
+        existing[product.code] = product
+
+    to_create, to_update, fields, price_changed = [], [], set(), []
+    for code, (line_no, values) in rows.items():
+        product = existing.get(code)
+        if product is None:
+            if "name" not in values or "price" not in values:
+                result["errors"].append((line_no, "new product needs name and price"))
+                continue
+            to_create.append(Product(**values))
+            continue
+
+        changed = [
+            field for field, value in values.items()
+            if field != "code" and not _same(field, getattr(product, field), value)
+        ]
+        if not changed:
+            result["unchanged"] += 1
+            continue
+        if "image" in changed and "image_hash" not in values:
+            # ảnh đổi mà không qua ImageImporter -> dùng ảnh gốc cho tới khi chạy generate_thumbnails
+            values["image_hash"] = ""
+            changed.append("image_hash")
+        for field in changed:
+            setattr(product, field, values[field])
+        if "price" in changed:
+            price_changed.append(product.pk)
+        fields.update(changed)
+        to_update.append(product)
+    return to_create, to_update, fields, price_changed
+
+
+def upsert_batch(rows, images=None):
+    """
+    rows: {code: (line, values)} (trùng code trong batch thì dòng sau thắng).
+    Trả {"created", "updated", "unchanged", "errors": [(line, message)]}.
+    """
+    result = {"created": 0, "updated": 0, "unchanged": 0, "errors": []}
+    if images is not None:
+        result["errors"].extend(images.prepare(rows))
+
+    # tra + ghi trong cùng transaction: đọc từ primary (router không chuyển sang replica)
+    # và không có request nào chen vào giữa
+    with write_transaction():
+        to_create, to_update, fields, price_changed = _plan(rows, result)
+        created = Product.objects.bulk_create(to_create)
+        if to_update:
+            _update_rows(to_update, sorted(fields))
+        if price_changed:
+            # như signal update_open_order_totals: giỏ hàng chưa thanh toán tính lại subtotal
+            order_ids = OrderItem.objects.filter(product_id__in=price_changed).values("order_id")
+            Order.objects.filter(complete=False, pk__in=order_ids).recalculate_totals()
+        search.index_products(created + to_update)
+
+    if created or to_update:
+        catalog_cache.invalidate_products([product.pk for product in to_update])
+        autocomplete.invalidate()
+    result["created"] = len(created)
+    result["updated"] = len(to_update)
+    return result
+
+
+def import_rows(rows, batch_size=1000, images=None, on_batch=None):
+    """
+    rows: iterable (line, raw dict) từ read_rows. Gom batch_size dòng rồi upsert_batch.
+    on_batch(totals) được gọi sau mỗi batch (in tiến độ). Trả về tổng.
+    """
+    totals = {"created": 0, "updated": 0, "unchanged": 0, "errors": []}
+    batch = {}
+
+    def flush():
+        result = upsert_batch(batch, images=images)
+        for key in ("created", "updated", "unchanged"):
+            totals[key] += result[key]
+        totals["errors"].extend(result["errors"])
+        batch.clear()
+        if on_batch:
+            on_batch(totals)
+
+    for line_no, raw in rows:
+        try:
+            values = clean_row(raw)
+        except CatalogRowError as e:
+            totals["errors"].append((line_no, str(e)))
+            continue
+        batch.pop(values["code"], None)  # dòng sau thắng, giữ thứ tự dòng sau
+        batch[values["code"]] = (line_no, values)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return totals
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def export_rows(queryset=None, chunk_size=2000):
+    """Yield dict theo FIELDS cho từng product (iterator, không nạp hết vào bộ nhớ)."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    for code, name, price, digital, image in queryset.order_by("pk").values_list(*FIELDS).iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            "code": code or "",
+            "name": name or "",
+            "price": int(price) if float(price).is_integer() else price,
+            "digital": bool(digital),
+            "image": image or "",
+        }
+
+
+def write_rows(stream, fmt, rows):
+    """Ghi rows ra stream (csv / jsonl), trả số dòng."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "digital": int(row["digital"])})
+            count += 1
+        return count
+
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
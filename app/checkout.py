@@ -0,0 +1,170 @@
+"""
+Hoàn tất thanh toán cho payPage trong 1 transaction ngắn.
+
+- Form pay_page có hidden checkout_token (mỗi lần render 1 token). Token được lưu
+  vào Order.checkout_token (unique) khi thanh toán xong -> submit lại cùng token
+  (double click, F5, retry) trả về order cũ, không tạo thêm ShippingAddress / email.
+- Trong 1 write_transaction (BEGIN IMMEDIATE): lưu địa chỉ, snapshot giá từng dòng
+  (OrderItem.unit_price) + tổng / discount vào Order, trừ lượt coupon, đóng order.
+- Order.lines giữ bản chụp gọn từng dòng (tên, mã, đơn giá, số lượng, ảnh) ->
+  hoá đơn (payment_success) và lịch sử order (profileUser) chỉ đọc bảng Order.
+- Email xác nhận vào outbox trong cùng transaction (rollback thì không gửi);
+  signal order_completed gửi sau commit cho analytics / hook khác.
+"""
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import coupons, mail
+from .db import write_transaction
+from .models import Order, OrderItem, Product
+
+# sender=Order, order=<Order>, replayed=False. Chỉ gửi sau khi transaction đã commit.
+order_completed = Signal()
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class CheckoutResult:
+    def __init__(self, order, replayed=False, discount_error=None):
+        self.order = order
+        self.replayed = replayed  # token đã dùng -> order của lần submit trước
+        self.discount_error = discount_error  # coupon không còn áp dụng được
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def _previous(customer, token):
+    if not token:
+        return None
+    return Order.objects.filter(customer=customer, checkout_token=token, complete=True).first()
+
+
+def complete_order(customer, delivery, token=None, discount_code=""):
+    """
+    Thanh toán giỏ hàng đang mở của customer.
+    delivery: ShippingAddress chưa lưu (từ DeliveryForm). Giỏ trống -> EmptyCart.
+    """
+    try:
+        with write_transaction():
+            result = _complete(customer, delivery, token or new_token(), discount_code)
+    except IntegrityError:
+        # 2 request cùng token chạy song song (DB không serialize như SQLite) -> bên sau thua
+        previous = _previous(customer, token)
+        if previous is None:
+            raise
+        return CheckoutResult(previous, replayed=True)
+
+    if not result.replayed:
+        order = result.order
+        transaction.on_commit(lambda: order_completed.send(sender=Order, order=order, replayed=False))
+    return result
+
+
+def order_lines(order):
+    """Bản chụp từng dòng của order (dạng lưu trong Order.lines), 1 query có join Product."""
+    lines = []
+    for item in order.orderitem_set.select_related("product").order_by("id"):
+        product = item.product
+        price = item.unit_price if item.unit_price is not None else (product.price if product else 0)
+        lines.append({
+            "product": item.product_id,
+            "name": product.name if product else "-",
+            "code": product.code if product else "",
+            "price": price,
+            "qty": item.quantity,
+            "total": price * item.quantity,
+            "image": product.SmallImageURL if product else "",
+        })
+    return lines
+
+
+def _complete(customer, delivery, token, discount_code):
+    # kiểm tra token trong transaction (đã giữ lock ghi): request trước cùng token
+    # có thể vừa commit ngay trước đó
+    previous = _previous(customer, token)
+    if previous is not None:
+        return CheckoutResult(previous, replayed=True)
+
+    order = Order.objects.filter(customer=customer, complete=False).first()
+    if order is None or not order.item_count:
+        raise EmptyCart()
+
+    delivery.customer = customer
+    delivery.order = order
+    delivery.save()
+
+    _snapshot_prices(order)
+    subtotal = int(order.subtotal)
+
+    discount, discount_error = 0, None
+    if discount_code:
+        discount, discount_error = coupons.evaluate(discount_code, subtotal)
+        if not discount_error and not coupons.redeem(discount_code):
+            discount_error = coupons.USED_UP
+        if discount_error:
+            discount, discount_code = 0, ""
+
+    order.checkout_token = token
+    _close(order, discount_code, discount)
+
+    _enqueue_confirmation(customer, order)
+    return CheckoutResult(order, discount_error=discount_error)
+
+
+def _snapshot_prices(order):
+    # snapshot giá từng dòng rồi tính tổng từ snapshot (1 UPDATE mỗi bước)
+    price = Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1]
+    OrderItem.objects.filter(order=order).update(unit_price=Subquery(price))
+    order.recalculate_totals()
+
+
+def _close(order, discount_code, discount):
+    subtotal = int(order.subtotal)
+    order.complete = True
+    order.completed_at = timezone.now()
+    order.discount_code = discount_code
+    order.discount_amount = discount
+    order.total = subtotal - discount
+    order.lines = order_lines(order)
+    order.save(update_fields=[
+        "complete", "checkout_token", "completed_at", "discount_code", "discount_amount", "total", "lines",
+    ])
+
+
+def complete_from_admin(order):
+    """
+    Đóng order từ admin (không qua payPage): snapshot giá / lines / total như checkout
+    để rollup và hoá đơn đọc đúng giá lúc đóng. Không gửi email xác nhận, không trừ lượt
+    coupon; discount đã ghi từ lần checkout trước (order bị mở lại) được giữ nguyên.
+    """
+    with write_transaction():
+        _snapshot_prices(order)
+        discount = min(order.discount_amount or 0, int(order.subtotal))
+        _close(order, order.discount_code if discount else "", discount)
+    transaction.on_commit(lambda: order_completed.send(sender=Order, order=order, replayed=False))
+
+
+def _enqueue_confirmation(customer, order):
+    order_details = "\n".join(f"{line['name']}: {line['qty']} x {int(line['price'])} VNĐ" for line in order.lines)
+    message = f"""
+Hi {customer.name}, You have successfully placed an order at HomeClick!
+
+Order Details:
+{order_details}
+
+Subtotal: {int(order.subtotal)} VNĐ
+Discount ({order.discount_code or "N/A"}): -{int(order.discount_amount)} VNĐ
+Total after discount: {int(order.total)} VNĐ
+
+We hope you enjoy our service!
+"""
+    mail.enqueue_mail("Order confirmed successfully.", message, [customer.email], settings.EMAIL_HOST_USER)
@@ -0,0 +1,42 @@
+"""
+System check (`manage.py check`, chạy cả khi runserver / migrate) cho cấu hình
+chỉ đúng khi chạy 1 process.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+CACHED_DB = "django.contrib.sessions.backends.cached_db"
+
+
+def _backend(alias):
+    return settings.CACHES.get(alias, {}).get("BACKEND", "")
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    # cached_db đọc session từ cache: locmem là cache riêng từng process -> worker khác
+    # đọc session cũ (logout, giỏ hàng, discount ghi ở worker này không thấy ở worker kia)
+    alias = getattr(settings, "SESSION_CACHE_ALIAS", "default")
+    if settings.SESSION_ENGINE == CACHED_DB and _backend(alias) == LOCMEM:
+        return [Error(
+            f"SESSION_MODE=cached_db needs a cache shared by all workers, but CACHES[{alias!r}] is LocMemCache.",
+            hint="Use SESSION_MODE=db / signed_cookies, or point CACHES['default'] at a shared backend.",
+            id="app.E001",
+        )]
+    return []
+
+
+@register(Tags.caches)
+def check_catalog_cache(app_configs, **kwargs):
+    # signals / import_catalog / snapshot_replica xoá cache + tăng catalog version:
+    # với locmem chỉ process vừa ghi thấy, worker khác phục vụ catalog cũ tới CATALOG_CACHE_TIMEOUT
+    from .catalog_cache import CACHE_ALIAS
+
+    if _backend(CACHE_ALIAS) == LOCMEM:
+        return [Warning(
+            "The catalog cache is LocMemCache: invalidation only reaches the process that wrote the change.",
+            hint="Fine for a single process (runserver). With several workers use CATALOG_CACHE_BACKEND=file.",
+            id="app.W001",
+        )]
+    return []
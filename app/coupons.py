@@ -0,0 +1,120 @@
+"""
+Mã giảm giá (model Coupon, quản lý trong admin) cho apply_discount / payPage.
+
+- Rule của mọi coupon active được nạp 1 query, "compile" thành CouponRule
+  (kiểu + giá trị + điều kiện) và giữ trong bộ nhớ process -> apply_discount
+  không query bảng coupon mỗi lần.
+- Coupon sửa / xoá -> signal (FurnitureSales/signals.py) gọi invalidate().
+  Mỗi process có cache riêng nên cũng nạp lại sau COUPON_CACHE_MAX_AGE giây
+  để nhận thay đổi từ process khác (giống autocomplete).
+- times_used không nằm trong cache: coupon có usage_limit thì kiểm tra bằng DB,
+  payPage tăng bộ đếm bằng Coupon.objects.redeem() (UPDATE có điều kiện, không race).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Coupon
+
+INVALID = "Invalid discount code."
+NOT_STARTED = "This discount code is not active yet."
+EXPIRED = "This discount code has expired."
+USED_UP = "This discount code has been fully redeemed."
+
+
+class CouponRule:
+    __slots__ = ("code", "kind", "value", "min_subtotal", "starts_at", "ends_at", "limited")
+
+    def __init__(self, code, kind, value, min_subtotal, starts_at, ends_at, usage_limit):
+        self.code = code
+        self.kind = kind
+        self.value = value
+        self.min_subtotal = min_subtotal
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.limited = usage_limit is not None
+
+    def check(self, subtotal, now):
+        """Lỗi (str) nếu không áp dụng được cho subtotal tại thời điểm now, None nếu được."""
+        if self.starts_at and now < self.starts_at:
+            return NOT_STARTED
+        if self.ends_at and now >= self.ends_at:
+            return EXPIRED
+        if subtotal < self.min_subtotal:
+            return f"This code needs an order of at least {self.min_subtotal:,} VNĐ."
+        return None
+
+    def discount(self, subtotal):
+        if self.kind == Coupon.PERCENT:
+            return min(round(subtotal * self.value / 100), subtotal)
+        return min(self.value, subtotal)
+
+
+class RuleCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = None
+        self._loaded_at = None
+
+    def _max_age(self):
+        return getattr(settings, "COUPON_CACHE_MAX_AGE", 60)
+
+    def load(self):
+        rules = {
+            row[0]: CouponRule(*row)
+            for row in Coupon.objects.filter(active=True).values_list(
+                "code", "kind", "value", "min_subtotal", "starts_at", "ends_at", "usage_limit"
+            )
+        }
+        with self._lock:
+            self._rules = rules
+            self._loaded_at = time.monotonic()
+        return rules
+
+    def rules(self):
+        with self._lock:
+            rules, loaded_at = self._rules, self._loaded_at
+        if rules is None or time.monotonic() - loaded_at > self._max_age():
+            rules = self.load()
+        return rules
+
+    def get(self, code):
+        return self.rules().get(normalize(code))
+
+    def invalidate(self):
+        with self._lock:
+            self._rules = None
+
+
+rules = RuleCache()
+
+
+def normalize(code):
+    return (code or "").strip().upper()
+
+
+def invalidate():
+    rules.invalidate()
+
+
+def evaluate(code, subtotal, now=None):
+    """
+    Tính discount của `code` cho giỏ hàng `subtotal` (VNĐ).
+    Trả (discount, lỗi): lỗi là None nếu hợp lệ, discount luôn <= subtotal.
+    """
+    rule = rules.get(code)
+    if rule is None:
+        return 0, INVALID
+    error = rule.check(subtotal, now or timezone.now())
+    if error:
+        return 0, error
+    if rule.limited and not Coupon.objects.available().filter(code=rule.code).exists():
+        return 0, USED_UP
+    return rule.discount(subtotal), None
+
+
+def redeem(code):
+    """Ghi nhận 1 lần dùng khi thanh toán xong. False nếu coupon đã hết lượt / bị tắt."""
+    return Coupon.objects.redeem(normalize(code))
@@ -0,0 +1,36 @@
+"""
+Transaction cho các đường ghi hay tranh chấp (giỏ hàng).
+
+SQLite mặc định BEGIN DEFERRED: transaction đọc trước (get_or_create Order) rồi mới
+xin lock ghi -> 2 request cùng lúc thì 1 bên bị "database is locked" ngay, busy_timeout
+không cứu được (SQLite trả BUSY để tránh deadlock). BEGIN IMMEDIATE lấy lock ghi từ đầu,
+request sau chờ trong busy_timeout rồi chạy tiếp.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+@contextmanager
+def write_transaction(using=None):
+    """
+    transaction.atomic() nhưng mở bằng BEGIN IMMEDIATE trên SQLite.
+    Lồng trong atomic khác (hoặc DB không phải SQLite) thì như atomic() bình thường.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # transaction_mode được đặt lại mỗi lần connect -> connect trước rồi mới đổi
+    connection.ensure_connection()
+    previous = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = previous
+            yield
+    finally:
+        connection.transaction_mode = previous
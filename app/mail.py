@@ -0,0 +1,125 @@
+"""
+Outbox gửi email bất đồng bộ.
+
+- enqueue_mail(): chỉ INSERT vào OutboundEmail (không gọi SMTP trong request).
+  Chạy trong transaction của request nên rollback thì email cũng không được gửi.
+- process_outbox(): dùng bởi `manage.py send_queued_mail`, lấy 1 batch email đến hạn,
+  gửi qua 1 connection SMTP dùng chung; lỗi thì retry với backoff luỹ thừa
+  (MAIL_OUTBOX_BACKOFF_SECONDS * 2^(attempts-1)), quá MAIL_OUTBOX_MAX_ATTEMPTS -> DEAD.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _max_attempts():
+    return getattr(settings, "MAIL_OUTBOX_MAX_ATTEMPTS", 5)
+
+
+def _backoff(attempts):
+    base = getattr(settings, "MAIL_OUTBOX_BACKOFF_SECONDS", 60)
+    return timedelta(seconds=base * 2 ** max(attempts - 1, 0))
+
+
+def enqueue_mail(subject, message, recipients, from_email=None):
+    """Đưa email vào outbox. Trả về OutboundEmail, None nếu không có người nhận."""
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        return None
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        to="\n".join(recipients),
+    )
+
+
+def requeue_stale(older_than=timedelta(minutes=10)):
+    """Email bị kẹt ở SENDING (worker chết giữa chừng) -> PENDING lại."""
+    cutoff = timezone.now() - older_than
+    return OutboundEmail.objects.filter(
+        status=OutboundEmail.SENDING, next_attempt_at__lt=cutoff
+    ).update(status=OutboundEmail.PENDING)
+
+
+def _claim_batch(batch_size):
+    """Đánh dấu SENDING cho tối đa batch_size email đến hạn; trả về các email đã claim."""
+    now = timezone.now()
+    ids = list(
+        OutboundEmail.objects
+        .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    # chỉ claim dòng vẫn còn PENDING (worker khác có thể đã lấy)
+    OutboundEmail.objects.filter(id__in=ids, status=OutboundEmail.PENDING).update(
+        status=OutboundEmail.SENDING, next_attempt_at=now
+    )
+    return list(
+        OutboundEmail.objects.filter(id__in=ids, status=OutboundEmail.SENDING, next_attempt_at=now).order_by("id")
+    )
+
+
+def _mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    if email.attempts >= _max_attempts():
+        email.status = OutboundEmail.DEAD
+        logger.error("Outbox email #%s dead-lettered after %s attempts: %s", email.id, email.attempts, error)
+    else:
+        email.status = OutboundEmail.PENDING
+        email.next_attempt_at = timezone.now() + _backoff(email.attempts)
+        logger.warning("Outbox email #%s failed (attempt %s): %s", email.id, email.attempts, error)
+    email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def process_outbox(batch_size=50, connection=None):
+    """
+    Gửi 1 batch email đến hạn qua 1 connection dùng chung.
+    Trả về (sent, failed).
+    """
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # không mở được SMTP -> cả batch tính là 1 lần thử thất bại
+        for email in batch:
+            _mark_failed(email, e)
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients, connection=connection
+            )
+            try:
+                message.send()
+            except Exception as e:
+                _mark_failed(email, e)
+                failed += 1
+                continue
+
+            email.status = OutboundEmail.SENT
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ""
+            email.save(update_fields=["status", "attempts", "sent_at", "last_error"])
+            sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
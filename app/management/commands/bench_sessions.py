@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.benchmarks import harness, sessions
+
+
+class Command(BaseCommand):
+    help = "Benchmark django_session writes per SESSION_MODE on a throwaway test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        with harness.test_database():
+            harness.seed_catalog()
+            user = harness.create_customer("bench_sessions")
+            report = sessions.run(user, iterations=max(1, options["iterations"]))
+
+        harness.write_report(report, options["output"], self.stdout)
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from app.benchmarks import data, harness, journeys
+from app.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the storefront checkout journey on a seeded throwaway database, "
+        "in-process and/or against a local WSGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=20)
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--articles", type=int, default=20)
+        parser.add_argument("--orders", type=int, default=100)
+        parser.add_argument("--journeys", type=int, default=50, help="Measured journeys per mode.")
+        parser.add_argument("--warmup", type=int, default=2, help="Unmeasured journeys per worker.")
+        parser.add_argument("--concurrency", type=int, default=1, help="Concurrent workers (threads).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--mode", choices=["client", "server", "both"], default="client",
+            help="client: django.test.Client in-process; server: HTTP to a local WSGI server.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        modes = ["client", "server"] if options["mode"] == "both" else [options["mode"]]
+        config = {
+            key: options[key]
+            for key in ("customers", "products", "articles", "orders", "journeys", "warmup", "seed")
+        }
+        config["concurrency"] = concurrency
+        config["customers"] = max(config["customers"], concurrency)
+        config["products"] = max(config["products"], 1)
+
+        # file DB: server WSGI và các thread dùng chung được; DEBUG tắt như production
+        with harness.test_database(on_disk=True), override_settings(DEBUG=False):
+            seeded = data.generate(
+                customers=config["customers"], products=config["products"], articles=config["articles"],
+                orders=config["orders"], seed=config["seed"],
+            )
+            product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+            run_options = {
+                "usernames": seeded["usernames"],
+                "product_ids": product_ids,
+                "journeys": max(1, config["journeys"]),
+                "concurrency": concurrency,
+                "warmup": max(0, config["warmup"]),
+                "seed": config["seed"],
+            }
+
+            results = {}
+            for mode in modes:
+                if mode == "client":
+                    results[mode] = journeys.run(journeys.ClientDriver, **run_options)
+                else:
+                    with journeys.live_server() as base_url:
+                        results[mode] = journeys.run(lambda: journeys.HttpDriver(base_url), **run_options)
+
+        report = {
+            "benchmark": "storefront",
+            "config": config,
+            "environment": journeys.environment(),
+            "results": results,
+        }
+        harness.write_report(report, options["output"], self.stdout)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from app import assets
+from app.benchmarks import harness
+
+
+class Command(BaseCommand):
+    help = "Bundle + minify CSS/JS, collectstatic with hashed names, pre-compress (.gz/.br) STATIC_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Write the JSON size report to this file.")
+        parser.add_argument(
+            "--bundles-only", action="store_true", help="Only write the bundles, skip collectstatic/compress."
+        )
+
+    def handle(self, *args, **options):
+        bundles = assets.write_bundles()
+        report = {"bundles": bundles, "brotli": assets.brotli is not None}
+
+        if not options["bundles_only"]:
+            if not assets.bundles_enabled():
+                raise CommandError("Set STATIC_BUILD=1 so collectstatic uses the hashed manifest storage.")
+            call_command("collectstatic", interactive=False, clear=True, verbosity=0)
+            compressed = assets.compress_static_root()
+            report["compressed_files"] = len(compressed)
+            for name in bundles:
+                hashed = assets.ManifestStorage().stored_name(name)
+                bundles[name]["hashed_name"] = hashed
+                bundles[name].update(compressed.get(hashed, {}))
+            report["static_root"] = str(settings.STATIC_ROOT)
+
+        harness.write_report(report, options["output"], self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Built {len(bundles)} bundle(s)."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Order
+
+
+class Command(BaseCommand):
+    help = "Report orders whose stored item_count / subtotal drifted from their OrderItem rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Max drifted orders to list.")
+
+    def handle(self, *args, **options):
+        drifted = Order.objects.with_totals_drift().order_by("pk")
+        total = drifted.count()
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("All order totals are consistent."))
+            return
+
+        for order in drifted[:options["limit"]]:
+            self.stdout.write(
+                f"Order #{order.pk}: item_count={order.item_count} (actual {order.cart_items}), "
+                f"subtotal={order.subtotal:.0f} (actual {order.cart_total:.0f}), version={order.version}"
+            )
+        raise CommandError(f"{total} order(s) drifted. Run `manage.py rebuild_order_totals --only-drift`.")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from FurnitureSales.database import JOURNAL_MODE
+
+
+class Command(BaseCommand):
+    help = "Switch the SQLite database to WAL journal mode (stored in the database file, run once per deploy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias (default: 'default').")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError("WAL journal mode only applies to SQLite databases.")
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+            mode = cursor.fetchone()[0]
+
+        if mode.lower() != JOURNAL_MODE:
+            # vd DB in-memory hoặc đang có connection khác giữ lock
+            raise CommandError(f"Could not enable WAL, journal mode is still '{mode}'.")
+        self.stdout.write(self.style.SUCCESS(f"Journal mode for '{options['database']}': {mode}."))
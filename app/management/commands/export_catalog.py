@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Stream every product to a CSV or JSONL file in the format import_catalog reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Output .csv / .jsonl file, or - for stdout (needs --format).")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if path == "-" and not options["format"]:
+            raise CommandError("Writing to stdout needs --format csv|jsonl.")
+        try:
+            fmt = catalog_io.detect_format(path, options["format"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if path == "-":
+            catalog_io.write_rows(sys.stdout, fmt, catalog_io.export_rows())
+            return
+
+        with open(path, "w", encoding="utf-8", newline="") as stream:
+            count = catalog_io.write_rows(stream, fmt, catalog_io.export_rows())
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} products to {path}."))
@@ -0,0 +1,48 @@
+import sys
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app import order_export
+from app.models import Order
+
+
+def _start_of(value):
+    """YYYY-MM-DD -> 00:00 của ngày đó theo TIME_ZONE."""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, use YYYY-MM-DD.") from None
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class Command(BaseCommand):
+    help = "Stream orders with their line items and shipping address to a CSV file (one row per item)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Output .csv file, or - for stdout.")
+        parser.add_argument("--status", choices=["all", "complete", "open"], default="all")
+        parser.add_argument("--since", help="Only orders with date_order on or after this day (YYYY-MM-DD).")
+        parser.add_argument("--until", help="Only orders with date_order on or before this day (YYYY-MM-DD).")
+        parser.add_argument("--chunk-size", type=int, default=order_export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        # cùng các filter với changelist Order (complete, date_order)
+        orders = Order.objects.all()
+        if options["status"] != "all":
+            orders = orders.filter(complete=options["status"] == "complete")
+        if options["since"]:
+            orders = orders.filter(date_order__gte=_start_of(options["since"]))
+        if options["until"]:
+            orders = orders.filter(date_order__lt=_start_of(options["until"]) + timedelta(days=1))
+
+        rows = order_export.order_rows(orders, chunk_size=max(1, options["chunk_size"]))
+        path = options["path"]
+        if path == "-":
+            order_export.write_rows(sys.stdout, rows)
+            return
+
+        with open(path, "w", encoding="utf-8-sig", newline="") as stream:
+            count = order_export.write_rows(stream, rows)
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} rows to {path}."))
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from app import catalog_cache, thumbnails
+from app.models import Article, Product
+
+
+def _generate(job):
+    """Chạy trong process con: chỉ xử lý file, trả digest (hoặc lỗi) về process chính."""
+    model_label, pk, path, force = job
+    try:
+        return model_label, pk, thumbnails.generate_from_path(path, force=force), None
+    except Exception as e:
+        return model_label, pk, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Backfill WebP/JPEG thumbnails for every Product and Article image using a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--force", action="store_true", help="Regenerate files that already exist.")
+
+    def handle(self, *args, **options):
+        models = {"product": Product, "article": Article}
+        jobs = []
+        current = {}
+        for label, model in models.items():
+            for pk, name, image_hash in model.objects.exclude(image="").exclude(image=None).values_list(
+                "pk", "image", "image_hash"
+            ):
+                path = model._meta.get_field("image").storage.path(name)
+                if os.path.exists(path):
+                    jobs.append((label, pk, path, options["force"]))
+                    current[(label, pk)] = image_hash
+
+        self.stdout.write(f"Generating thumbnails for {len(jobs)} images...")
+
+        # không mang connection DB sang process con
+        connections.close_all()
+
+        changed = {label: [] for label in models}
+        failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            for label, pk, digest, error in pool.map(_generate, jobs, chunksize=8):
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{label} #{pk}: {error}")
+                elif digest != current[(label, pk)]:
+                    changed[label].append(models[label](pk=pk, image_hash=digest))
+
+        for label, objs in changed.items():
+            models[label].objects.bulk_update(objs, ["image_hash"], batch_size=500)
+        # bulk_update không bắn signal: instance trong catalog cache vẫn còn image_hash cũ
+        if any(changed.values()):
+            catalog_cache.invalidate_products([obj.pk for obj in changed["product"]])
+
+        updated = sum(len(objs) for objs in changed.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {len(jobs) - failed} images processed, {updated} hashes updated, {failed} failed."
+        ))
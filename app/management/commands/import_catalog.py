@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Upsert products by code from a CSV or JSONL file (streamed, bulk writes in batches)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV / JSONL file, or - for stdin (needs --format).")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--images",
+            help="Directory with the files named in the image column; copied into media and thumbnailed.",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Thumbnail processes.")
+        parser.add_argument("--max-errors", type=int, default=20, help="Row errors to print.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if path == "-" and not options["format"]:
+            raise CommandError("Reading from stdin needs --format csv|jsonl.")
+        try:
+            fmt = catalog_io.detect_format(path, options["format"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options["images"] and not os.path.isdir(options["images"]):
+            raise CommandError(f"Image directory not found: {options['images']}")
+
+        images = catalog_io.ImageImporter(options["images"], options["workers"]) if options["images"] else None
+
+        def progress(totals):
+            done = totals["created"] + totals["updated"] + totals["unchanged"]
+            self.stdout.write(f"{done} rows imported...")
+
+        started = time.perf_counter()
+        # utf-8-sig: bỏ BOM của file CSV xuất từ Excel
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        try:
+            totals = catalog_io.import_rows(
+                catalog_io.read_rows(stream, fmt),
+                batch_size=max(1, options["batch_size"]),
+                images=images,
+                on_batch=progress,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if images is not None:
+                images.close()
+
+        errors = sorted(totals["errors"])
+        for line_no, message in errors[:options["max_errors"]]:
+            self.stderr.write(f"line {line_no}: {message}")
+        if len(errors) > options["max_errors"]:
+            self.stderr.write(f"... {len(errors) - options['max_errors']} more errors")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s: {totals['created']} created, {totals['updated']} updated, "
+            f"{totals['unchanged']} unchanged, {len(errors)} skipped."
+        ))
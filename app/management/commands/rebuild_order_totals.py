@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import Order
+
+
+class Command(BaseCommand):
+    help = "Rebuild Order.item_count / subtotal from OrderItem rows, in batches of order ids."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--only-drift",
+            action="store_true",
+            help="Only rewrite orders whose stored totals differ from their items.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+
+        orders = Order.objects.all()
+        if options["only_drift"]:
+            orders = orders.with_totals_drift()
+        order_ids = list(orders.order_by("pk").values_list("pk", flat=True))
+
+        updated = 0
+        for start in range(0, len(order_ids), batch_size):
+            batch = order_ids[start:start + batch_size]
+            # Mỗi batch 1 transaction ngắn để không giữ lock SQLite quá lâu
+            with transaction.atomic():
+                updated += Order.objects.filter(pk__in=batch).recalculate_totals()
+            self.stdout.write(f"Rebuilt {updated}/{len(order_ids)} orders")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} orders rebuilt."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FTS5 search index (app_search_index) from all Products and Articles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search index requires SQLite (FTS5).")
+
+        with transaction.atomic():
+            total = search.rebuild(batch_size=max(1, options["batch_size"]))
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} rows."))
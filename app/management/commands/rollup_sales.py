@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app import rollups
+
+
+class Command(BaseCommand):
+    help = "Update the daily sales rollups (dashboard) from orders completed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the rollups and recompute every day from all completed orders.",
+        )
+
+    def handle(self, *args, **options):
+        result = rollups.refresh(
+            rebuild=options["rebuild"],
+            on_window=lambda first, last: self.stdout.write(f"Rolled up {first} .. {last}"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {result['days']} day(s) with sales, high-water mark {result['high_water_mark']}."
+        ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import mail
+
+
+class Command(BaseCommand):
+    help = "Send queued OutboundEmail rows over one reused SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting when it is empty.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+
+        total_sent = total_failed = 0
+        while True:
+            # mỗi vòng: --loop chạy lâu vẫn lấy lại email kẹt SENDING do worker khác chết giữa chừng
+            requeued = mail.requeue_stale()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale email(s).")
+
+            sent, failed = mail.process_outbox(batch_size=batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Batch: {sent} sent, {failed} failed")
+
+            if sent + failed < batch_size:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_sent} sent, {total_failed} failed."))
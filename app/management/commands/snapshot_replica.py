@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import catalog_cache
+from app.routers import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the read replica (DB_REPLICA_PATH) with the online backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep taking snapshots instead of exiting after the first one.",
+        )
+        parser.add_argument("--interval", type=float, default=30.0, help="Seconds between snapshots with --loop.")
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in settings.DATABASES:
+            raise CommandError("No 'replica' database configured. Set DB_REPLICA_PATH.")
+
+        primary = str(settings.DATABASES["default"]["NAME"])
+        replica = str(settings.DATABASES[REPLICA_ALIAS]["NAME"])
+        if primary == replica:
+            raise CommandError("DB_REPLICA_PATH must point at a different file than the primary database.")
+
+        while True:
+            started = time.perf_counter()
+            pages = self.snapshot(primary, replica)
+            # cache catalog có thể đã nạp dữ liệu cũ từ replica -> đổi version để nạp lại
+            catalog_cache.bump_version()
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(self.style.SUCCESS(f"Snapshot {pages} page(s) -> {replica} in {elapsed:.0f} ms."))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def snapshot(self, primary, replica):
+        """
+        Backup API: đọc 1 snapshot nhất quán của primary (không chặn ghi với WAL)
+        và ghi đè replica trong 1 transaction, connection replica đang mở thấy bản mới ngay.
+        """
+        source = sqlite3.connect(primary)
+        target = sqlite3.connect(replica)
+        try:
+            source.backup(target)
+            return target.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,234 @@
+"""
+Đo hiệu năng theo từng view (view_name của URL), giữ trong bộ nhớ process.
+
+- MetricsMiddleware (app/middleware.py) ghi cho mỗi request: wall time, DB time,
+  số query, thời gian render template (backend TimedDjangoTemplates) và size response.
+- Mỗi số đo là 1 Histogram kiểu HDR: bucket log-linear (sai số tương đối ~3%),
+  bộ nhớ cố định theo dải giá trị chứ không theo số request -> bật được ở production.
+- /metrics/ trả p50 / p95 / p99 dạng Prometheus text (staff hoặc Bearer METRICS_TOKEN),
+  kèm hit / miss của catalog cache.
+- METRICS_FLUSH_PATH: ghi snapshot JSON ra file mỗi METRICS_FLUSH_INTERVAL giây.
+"""
+import contextvars
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, reraise
+from django.template.backends.django import Template as DjangoTemplate
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# tên metric -> (hệ số đổi giá trị lưu trong histogram ra đơn vị Prometheus, help)
+# thời gian lưu bằng micro giây (số nguyên), số query / byte lưu nguyên
+METRICS = {
+    "request_duration_seconds": (1e-6, "Wall time of the request"),
+    "db_duration_seconds": (1e-6, "Time spent in SQL queries"),
+    "db_queries": (1, "SQL queries per request"),
+    "template_render_seconds": (1e-6, "Time spent rendering templates"),
+    "response_size_bytes": (1, "Response body size"),
+}
+PREFIX = "furniture_"
+
+
+# -----------------------------
+# Histogram
+# -----------------------------
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # 32 bucket mỗi lũy thừa của 2 -> sai số <= 1/32
+
+
+def bucket_index(value):
+    if value < SUB_BUCKETS * 2:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift << (SUB_BUCKET_BITS + 1)) + (value >> shift)
+
+
+def bucket_value(index):
+    """Giá trị giữa bucket (đại diện khi tính percentile)."""
+    shift = index >> (SUB_BUCKET_BITS + 1)
+    if shift == 0:
+        return index
+    low = (index - (shift << (SUB_BUCKET_BITS + 1))) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class Histogram:
+    """Đếm số giá trị nguyên (>= 0) theo bucket log-linear, như HdrHistogram."""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            **{f"p{int(q * 100)}": self.percentile(q) for q in QUANTILES},
+        }
+
+
+# -----------------------------
+# Registry theo view
+# -----------------------------
+_lock = threading.Lock()
+_histograms = {}  # (view_name, metric) -> Histogram
+_last_flush = [time.monotonic()]
+
+
+def record(view_name, values):
+    """values: {metric: giá trị} (thời gian bằng micro giây)."""
+    with _lock:
+        for metric, value in values.items():
+            histogram = _histograms.get((view_name, metric))
+            if histogram is None:
+                histogram = _histograms[(view_name, metric)] = Histogram()
+            histogram.record(value)
+    maybe_flush()
+
+
+def snapshot():
+    with _lock:
+        items = sorted(_histograms.items())
+        return {f"{view}:{metric}": histogram.snapshot() for (view, metric), histogram in items}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def maybe_flush(force=False):
+    path = getattr(settings, "METRICS_FLUSH_PATH", None)
+    if not path:
+        return
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _last_flush[0] < getattr(settings, "METRICS_FLUSH_INTERVAL", 60):
+            return
+        _last_flush[0] = now
+    data = json.dumps({"pid": os.getpid(), "time": time.time(), "metrics": snapshot()}, sort_keys=True)
+    # ghi file tạm rồi rename để reader không đọc phải file ghi dở
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# Prometheus text format
+# -----------------------------
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _value(value):
+    """Số nguyên in đủ chữ số (counter, catalog version), số thực in bằng repr (không làm tròn)."""
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def prometheus_text(extra=None):
+    with _lock:
+        rows = {
+            key: (histogram.count, histogram.total, [(q, histogram.percentile(q)) for q in QUANTILES])
+            for key, histogram in _histograms.items()
+        }
+
+    lines = []
+    for metric, (scale, help_text) in METRICS.items():
+        name = PREFIX + metric
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} summary")
+        for (view, row_metric), (count, total, quantiles) in sorted(rows.items()):
+            if row_metric != metric:
+                continue
+            view = _label(view)
+            for q, value in quantiles:
+                lines.append(f'{name}{{view="{view}",quantile="{q}"}} {_value(value * scale)}')
+            lines.append(f'{name}_sum{{view="{view}"}} {_value(total * scale)}')
+            lines.append(f'{name}_count{{view="{view}"}} {count}')
+
+    for name, (metric_type, help_text, samples) in (extra or {}).items():
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{PREFIX}{name}{{{label_text}}} {_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Thời gian render template
+# -----------------------------
+_template_time = contextvars.ContextVar("template_time", default=None)
+
+
+def start_template_timer():
+    """Bắt đầu cộng dồn thời gian render cho request hiện tại, trả token để reset."""
+    return _template_time.set([0.0])
+
+
+def stop_template_timer(token):
+    total = _template_time.get()
+    _template_time.reset(token)
+    return total[0] if total else 0.0
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            total = _template_time.get()
+            if total is not None:
+                total[0] += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, đo thời gian mỗi lần render template gốc (không tính include 2 lần)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
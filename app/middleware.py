@@ -0,0 +1,106 @@
+import time
+
+from django.conf import settings
+
+from . import metrics, query_budget, routers
+
+# key trong session: timestamp hết hạn sticky-after-write
+PRIMARY_UNTIL_KEY = "_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Chọn primary / replica cho các lần đọc catalog của request (app/routers.py).
+
+    - POST/PUT/... : đọc primary (vd updateItem kiểm tra product vừa được thêm).
+    - Session vừa ghi Product/Article: đọc primary thêm REPLICA_STICKY_SECONDS giây.
+    Session chỉ bị ghi khi request có ghi catalog, không phải mọi request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not routers.replica_enabled():
+            return self.get_response(request)
+
+        session = getattr(request, "session", None)
+        sticky = session is not None and session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+        primary_token = routers.use_primary(sticky or request.method not in SAFE_METHODS)
+        write_token = routers.start_request()
+        try:
+            response = self.get_response(request)
+            if routers.catalog_written() and session is not None:
+                session[PRIMARY_UNTIL_KEY] = time.time() + getattr(settings, "REPLICA_STICKY_SECONDS", 30)
+        finally:
+            routers.end_request(write_token)
+            routers.reset_primary(primary_token)
+        return response
+
+
+def _is_admin_action(request, match):
+    return (
+        request.method == "POST"
+        and match.view_name.startswith("admin:")
+        and match.view_name.endswith("_changelist")
+        and "action" in request.POST
+    )
+
+
+class QueryBudgetMiddleware:
+    """
+    Đếm query của mỗi request theo view_name, so với query_budget.BUDGETS.
+    Đặt ngay sau SecurityMiddleware để tính cả query của session / auth.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_budget.count_queries() as counter:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            query_budget.record(match.view_name, counter.count, counter.duration)
+            # admin action (POST changelist) chạy theo số dòng đã chọn, budget chỉ cho trang list
+            if not _is_admin_action(request, match):
+                query_budget.check(match.view_name, counter.count)
+        if settings.DEBUG:
+            response.headers["X-Query-Count"] = str(counter.count)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Ghi wall time, DB time, số query, thời gian render template và size response
+    của mỗi request vào histogram theo view_name (app/metrics.py).
+    Đặt đầu tiên trong MIDDLEWARE để wall time gồm cả các middleware khác.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        template_token = metrics.start_template_timer()
+        try:
+            with query_budget.count_queries() as counter:
+                response = self.get_response(request)
+        finally:
+            template_seconds = metrics.stop_template_timer(template_token)
+        wall_seconds = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        values = {
+            "request_duration_seconds": wall_seconds * 1e6,
+            "db_duration_seconds": counter.duration * 1e6,
+            "db_queries": counter.count,
+            "template_render_seconds": template_seconds * 1e6,
+        }
+        if not response.streaming:
+            values["response_size_bytes"] = len(response.content)
+        metrics.record(match.view_name if match else "<unresolved>", values)
+        return response
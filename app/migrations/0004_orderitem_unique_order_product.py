@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_orderitems(apps, schema_editor):
+    """
+    Gộp các OrderItem trùng (order, product) có sẵn trước khi thêm unique constraint:
+    giữ row có id nhỏ nhất với quantity = tổng quantity, xoá các row còn lại.
+    Tổng quantity không đổi nên item_count / subtotal của order vẫn đúng.
+    """
+    OrderItem = apps.get_model('app', 'OrderItem')
+    dup_groups = (
+        OrderItem.objects
+        .filter(order__isnull=False, product__isnull=False)
+        .values('order_id', 'product_id')
+        .annotate(cnt=Count('id'), total_qty=Sum('quantity'), keep_id=Min('id'))
+        .filter(cnt__gt=1)
+    )
+    for g in dup_groups:
+        OrderItem.objects.filter(id=g['keep_id']).update(quantity=g['total_qty'] or 0)
+        (
+            OrderItem.objects
+            .filter(order_id=g['order_id'], product_id=g['product_id'])
+            .exclude(id=g['keep_id'])
+            .delete()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_order_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_orderitems, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='unique_orderitem_order_product'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS app_search_index USING fts5("
+    "kind UNINDEXED, obj_id UNINDEXED, title, code, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+POPULATE_SQL = [
+    "INSERT INTO app_search_index (rowid, kind, obj_id, title, code, body) "
+    "SELECT id * 2, 'product', id, COALESCE(name, ''), COALESCE(code, ''), '' FROM app_product",
+    "INSERT INTO app_search_index (rowid, kind, obj_id, title, code, body) "
+    "SELECT id * 2 + 1, 'article', id, COALESCE(name, ''), '', COALESCE(content, '') FROM app_article",
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'")
+        return cursor.fetchone() is not None
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 chỉ có trên SQLite (và khi build kèm FTS5); còn lại app.search dùng lại icontains
+    if schema_editor.connection.vendor != 'sqlite' or not has_fts5(schema_editor.connection):
+        return
+    schema_editor.execute(CREATE_SQL)
+    for sql in POPULATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS app_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_orderitem_unique_order_product'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
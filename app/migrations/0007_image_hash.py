@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_open_orders(apps, schema_editor):
+    """
+    Trước khi thêm unique_open_order_per_customer: customer nào có nhiều order mở
+    thì giữ order mới nhất, chuyển item của các order cũ sang (cộng quantity nếu trùng product),
+    xoá order cũ đã rỗng rồi tính lại item_count / subtotal của order giữ lại.
+    """
+    Order = apps.get_model('app', 'Order')
+    OrderItem = apps.get_model('app', 'OrderItem')
+    dup_customers = (
+        Order.objects
+        .filter(complete=False, customer__isnull=False)
+        .values('customer_id')
+        .annotate(cnt=Count('id'))
+        .filter(cnt__gt=1)
+        .values_list('customer_id', flat=True)
+    )
+    for customer_id in list(dup_customers):
+        orders = list(Order.objects.filter(customer_id=customer_id, complete=False).order_by('-date_order', '-id'))
+        keep, old = orders[0], orders[1:]
+        for item in OrderItem.objects.filter(order__in=old):
+            existing = OrderItem.objects.filter(order=keep, product_id=item.product_id).first()
+            if existing is not None and item.product_id is not None:
+                existing.quantity = (existing.quantity or 0) + (item.quantity or 0)
+                existing.save(update_fields=['quantity'])
+                item.delete()
+            else:
+                item.order = keep
+                item.save(update_fields=['order'])
+        Order.objects.filter(pk__in=[o.pk for o in old]).delete()
+
+        totals = OrderItem.objects.filter(order=keep).aggregate(
+            item_count=Coalesce(Sum('quantity'), 0),
+            subtotal=Coalesce(Sum(F('quantity') * F('product__price'), output_field=FloatField()), 0.0),
+        )
+        Order.objects.filter(pk=keep.pk).update(version=F('version') + 1, **totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_image_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_open_orders, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'complete'], name='order_customer_complete_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date_order'], name='order_date_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['date_added'], name='orderitem_date_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['code'], name='product_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shippingaddress',
+            index=models.Index(fields=['date_added'], name='shipping_date_added_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('complete', False)), fields=('customer',), name='unique_open_order_per_customer'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+# Các mã trước đây hard-code trong views.apply_discount
+DEFAULT_COUPONS = [
+    ('SAVE10', 'percent', 10),
+    ('SAVE5', 'percent', 5),
+    ('LESS100K', 'fixed', 100000),
+]
+
+
+def create_default_coupons(apps, schema_editor):
+    Coupon = apps.get_model('app', 'Coupon')
+    for code, kind, value in DEFAULT_COUPONS:
+        Coupon.objects.get_or_create(code=code, defaults={'kind': kind, 'value': value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Coupon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(help_text='Viết hoa, vd SAVE10', max_length=30, unique=True)),
+                ('kind', models.CharField(choices=[('percent', 'Percent of subtotal'), ('fixed', 'Fixed amount (VNĐ)')], default='percent', max_length=10)),
+                ('value', models.PositiveIntegerField(help_text='Phần trăm (1-100) hoặc số tiền VNĐ')),
+                ('min_subtotal', models.PositiveIntegerField(default=0, help_text='Giỏ hàng tối thiểu (VNĐ)')),
+                ('active', models.BooleanField(default=True)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('usage_limit', models.PositiveIntegerField(blank=True, help_text='Để trống = không giới hạn', null=True)),
+                ('times_used', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('kind', 'percent'), _negated=True), ('value__lte', 100), _connector='OR'), name='coupon_percent_lte_100')],
+            },
+        ),
+        migrations.RunPython(create_default_coupons, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def snapshot_completed_orders(apps, schema_editor):
+    """Order đã thanh toán trước migration: lấy giá hiện tại làm giá snapshot (tốt nhất có thể)."""
+    Order = apps.get_model('app', 'Order')
+    OrderItem = apps.get_model('app', 'OrderItem')
+    Product = apps.get_model('app', 'Product')
+    price = Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]
+    OrderItem.objects.filter(order__complete=True, unit_price__isnull=True).update(unit_price=Subquery(price))
+    # tính từ dòng hàng (cột subtotal của dữ liệu cũ có thể chưa được rebuild_order_totals)
+    line_total = (
+        OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        .annotate(value=Sum(F('quantity') * F('unit_price'), output_field=FloatField())).values('value')[:1]
+    )
+    Order.objects.filter(complete=True, total__isnull=True).update(
+        total=Coalesce(Subquery(line_total), Value(0.0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_coupon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='checkout_token',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='discount_amount',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='discount_code',
+            field=models.CharField(blank=True, default='', editable=False, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(snapshot_completed_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+
+def snapshot_order_lines(apps, schema_editor):
+    """Order đã thanh toán trước migration: chụp Order.lines từ OrderItem (unit_price đã có từ 0010)."""
+    Order = apps.get_model('app', 'Order')
+    OrderItem = apps.get_model('app', 'OrderItem')
+
+    def flush(order_id, lines):
+        Order.objects.filter(pk=order_id).update(lines=lines)
+
+    current, lines = None, []
+    items = (
+        OrderItem.objects.filter(order__complete=True).select_related('product')
+        .order_by('order_id', 'id').iterator(chunk_size=2000)
+    )
+    for item in items:
+        if item.order_id != current:
+            if current is not None:
+                flush(current, lines)
+            current, lines = item.order_id, []
+        product = item.product
+        price = item.unit_price if item.unit_price is not None else (product.price if product else 0)
+        lines.append({
+            'product': item.product_id,
+            'name': product.name if product else '-',
+            'code': product.code if product else '',
+            'price': price,
+            'qty': item.quantity,
+            'total': price * item.quantity,
+            'image': product.image.url if product and product.image else '',
+        })
+    if current is not None:
+        flush(current, lines)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_checkout_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='lines',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(snapshot_order_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    """Order thanh toán trước app/checkout.py không có completed_at: lấy date_order (tốt nhất có thể)."""
+    Order = apps.get_model('app', 'Order')
+    Order.objects.filter(complete=True, completed_at__isnull=True).update(completed_at=F('date_order'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_order_lines_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('name', models.CharField(blank=True, default='', max_length=200)),
+                ('code', models.CharField(blank=True, default='', max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.FloatField(default=0)),
+                ('discount', models.FloatField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'sales dashboard',
+                'verbose_name_plural': 'sales dashboard',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('high_water_mark', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['completed_at'], name='order_completed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('day', 'product'), name='unique_daily_product_sales'),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Abs, Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .thumbnails import ThumbnailMixin
 
 # Create your models here.
 class Customer(models.Model):
@@ -11,12 +16,19 @@ class Customer(models.Model):
     def __str__(self):
         return self.name
     
-class Product(models.Model):
+class Product(ThumbnailMixin, models.Model):
     name = models.CharField(max_length=200, null=True)
     price =models.FloatField()
     code = models.CharField(max_length=20, null=True)
     digital = models.BooleanField(default=False, null=True, blank=False)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    image_hash = models.CharField(max_length=40, blank=True, default="", editable=False)  # xem thumbnails.py
+
+    class Meta:
+        indexes = [
+            # tra theo mã sản phẩm (search / import upsert by code)
+            models.Index(fields=["code"], name="product_code_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -29,11 +41,12 @@ class Product(models.Model):
             url = ''
         return url
 
-class Article (models.Model):
+class Article (ThumbnailMixin, models.Model):
     name = models.CharField(max_length=200, null=True)
     date_up = models.CharField(max_length=10, null=True)
     image = models.ImageField(null=True, blank=True)
     content = models.TextField(null=True)
+    image_hash = models.CharField(max_length=40, blank=True, default="", editable=False)  # xem thumbnails.py
 
     def __str__(self):
         return self.name
@@ -46,37 +59,212 @@ class Article (models.Model):
             url = ''
         return url
     
+def _cart_aggregates(prefix=""):
+    """
+    Biểu thức SUM dùng chung cho Order.with_cart_totals() và Order.recalculate_totals().
+    prefix = "orderitem__" khi annotate từ Order, "" khi aggregate trên OrderItem.
+    """
+    return {
+        "cart_items": Coalesce(Sum(f"{prefix}quantity"), Value(0)),
+        "cart_total": Coalesce(
+            # dòng đã thanh toán dùng giá snapshot, giỏ hàng đang mở dùng giá hiện tại
+            Sum(
+                F(f"{prefix}quantity") * Coalesce(F(f"{prefix}unit_price"), F(f"{prefix}product__price")),
+                output_field=FloatField(),
+            ),
+            Value(0.0),
+        ),
+    }
+
+
+def _order_items_subquery(expr):
+    """Subquery tính expr trên các OrderItem của order ở ngoài (OuterRef)."""
+    return Subquery(
+        OrderItem.objects
+        .filter(order=OuterRef("pk"))
+        .order_by()
+        .values("order")
+        .annotate(value=expr)
+        .values("value")[:1]
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_cart_totals(self):
+        """
+        Annotate cart_items + cart_total (tính trực tiếp từ OrderItem) bằng 1 câu SQL.
+        Dùng để đối chiếu với cột item_count / subtotal đã lưu.
+        """
+        return self.annotate(**_cart_aggregates("orderitem__"))
+
+    def recalculate_totals(self):
+        """
+        Ghi lại item_count / subtotal cho các order trong queryset bằng 1 câu UPDATE
+        (subquery SUM), đồng thời tăng version. Trả về số order đã cập nhật.
+        """
+        aggregates = _cart_aggregates()
+        return self.order_by().update(
+            item_count=Coalesce(_order_items_subquery(aggregates["cart_items"]), Value(0)),
+            subtotal=Coalesce(_order_items_subquery(aggregates["cart_total"]), Value(0.0)),
+            version=F("version") + 1,
+        )
+
+    def with_totals_drift(self):
+        """Các order có item_count / subtotal lệch so với OrderItem thực tế."""
+        return (
+            self.with_cart_totals()
+            .annotate(subtotal_drift=Abs(F("subtotal") - F("cart_total")))
+            .filter(~Q(item_count=F("cart_items")) | Q(subtotal_drift__gt=0.5))
+        )
+
+
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL,blank=True, null=True)
     date_order = models.DateTimeField(auto_now_add=True)
     complete = models.BooleanField(default=False, null=True, blank=False)
     transaction_id = models.CharField(max_length=200, null= True)  # Kiểm tra xem có giao dịch nào chưa
 
+    # Tổng đã denormalize, cập nhật mỗi khi OrderItem thay đổi (xem recalculate_totals)
+    item_count = models.IntegerField(default=0, editable=False)
+    subtotal = models.FloatField(default=0, editable=False)
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    # Snapshot lúc thanh toán (app/checkout.py), không đổi theo giá / coupon sau này
+    checkout_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    discount_code = models.CharField(max_length=30, blank=True, default="", editable=False)
+    discount_amount = models.FloatField(default=0, editable=False)
+    total = models.FloatField(null=True, blank=True, editable=False)  # subtotal - discount
+    # [{"name", "code", "price", "qty", "image"}] -> hoá đơn / lịch sử order không cần join Product
+    lines = models.JSONField(default=list, blank=True, editable=False)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # get_or_create(customer=..., complete=False) ở mọi trang có giỏ hàng
+            models.Index(fields=["customer", "complete"], name="order_customer_complete_idx"),
+            # admin: ordering = -date_order, date_hierarchy
+            models.Index(fields=["date_order"], name="order_date_order_idx"),
+            # rollup_sales: order thanh toán sau high-water mark
+            models.Index(fields=["completed_at"], name="order_completed_at_idx"),
+        ]
+        constraints = [
+            # ✅ mỗi customer chỉ có 1 giỏ hàng đang mở (get_or_create không còn MultipleObjectsReturned)
+            models.UniqueConstraint(
+                fields=["customer"], condition=Q(complete=False), name="unique_open_order_per_customer"
+            ),
+        ]
+
     def __str__(self):
         return str(self.id)
-    
+
+    def recalculate_totals(self):
+        """Tính lại tổng của order này trong DB rồi nạp lại vào instance."""
+        Order.objects.filter(pk=self.pk).recalculate_totals()
+        self.refresh_from_db(fields=["item_count", "subtotal", "version"])
+
     @property
     def get_cart_items(self):
-        orderitems = self.orderitem_set.all()
-        total = sum([item.quantity for item in orderitems])
-        return total
-    
+        return self.item_count
+
     @property
     def get_cart_total(self):
-        orderitems = self.orderitem_set.all()
-        total = sum([item.get_total for item in orderitems])
-        return total
+        return self.subtotal
+
+class OrderItemQuerySet(models.QuerySet):
+    def adjust_quantity(self, order, product, delta):
+        """
+        Cộng/trừ quantity của (order, product) mà không cần lock hay merge:
+        - UPDATE ... SET quantity = quantity + delta (atomic trong DB)
+        - chưa có row và delta > 0 -> INSERT; nếu request song song vừa INSERT trước
+          (vi phạm unique order+product) thì UPDATE lại
+        - quantity <= 0 -> xoá row
+        Không gửi signal OrderItem và không tự tính lại tổng order:
+        caller gọi Order.recalculate_totals() đúng 1 lần.
+        """
+        rows = self.filter(order=order, product=product)
+        if not rows.update(quantity=F("quantity") + delta) and delta > 0:
+            try:
+                with transaction.atomic():
+                    self.insert_rows(order, {product.pk: delta})
+            except IntegrityError:
+                rows.update(quantity=F("quantity") + delta)
+        if delta < 0:
+            rows.filter(quantity__lte=0).delete_rows()
+
+    def insert_rows(self, order, quantities):
+        """INSERT các dòng {product_id: quantity} bằng bulk_create (không có post_save)."""
+        self.bulk_create(
+            self.model(order=order, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+        )
+
+    def delete_rows(self):
+        """DELETE thẳng (không có post_delete): OrderItem không có FK trỏ tới."""
+        return self._raw_delete(self.db)
+
+    def adjust_quantities(self, order, deltas):
+        """
+        Như adjust_quantity nhưng cho nhiều product ({product_id: delta}) với số query cố định:
+        1 UPDATE ... CASE product_id, 1 bulk INSERT cho product chưa có trong order,
+        1 DELETE cho dòng về <= 0. Không gửi signal OrderItem, không tự tính lại tổng order.
+        """
+        deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        rows = self.filter(order=order, product_id__in=list(deltas))
+        existing = set(rows.values_list("product_id", flat=True))
+        if existing:
+            rows.filter(product_id__in=existing).update(
+                quantity=F("quantity") + Case(
+                    *[When(product_id=product_id, then=Value(deltas[product_id])) for product_id in existing],
+                    default=Value(0),
+                )
+            )
+
+        missing = {
+            product_id: delta
+            for product_id, delta in deltas.items()
+            if product_id not in existing and delta > 0
+        }
+        if missing:
+            try:
+                with transaction.atomic():
+                    self.insert_rows(order, missing)
+            except IntegrityError:
+                # request song song vừa INSERT cùng (order, product) -> làm từng dòng
+                for product_id, delta in missing.items():
+                    self.adjust_quantity(order, Product(pk=product_id), delta)
+
+        if any(delta < 0 for delta in deltas.values()):
+            rows.filter(quantity__lte=0).delete_rows()
+
 
 class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, blank=True,null=True)
     order = models.ForeignKey(Order, on_delete=models.SET_NULL, blank=True,null=True)
     date_added = models.DateTimeField(auto_now_add=True)
     quantity = models.IntegerField(default=0, null=True, blank=True)
+    unit_price = models.FloatField(null=True, blank=True, editable=False)  # giá lúc thanh toán
+
+    objects = OrderItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # 1 sản phẩm chỉ có 1 dòng trong mỗi order (add nhanh không tạo duplicate nữa)
+            models.UniqueConstraint(fields=["order", "product"], name="unique_orderitem_order_product"),
+        ]
+        indexes = [
+            models.Index(fields=["date_added"], name="orderitem_date_added_idx"),
+        ]
     
     # Tính tổng tiền của mỗi item
     @property
     def get_total(self):
-        total = self.product.price * self.quantity
+        price = self.unit_price if self.unit_price is not None else self.product.price
+        total = price * self.quantity
         return total
 
 
@@ -88,7 +276,147 @@ class ShippingAddress(models.Model):
     state = models.CharField(max_length=200, null=True)
     mobile = models.CharField(max_length=10, null=True)
     date_added = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_added"], name="shipping_date_added_idx"),
+        ]
     
     def __str__(self):
         return str(self.id)
 
+
+class CouponQuerySet(models.QuerySet):
+    def available(self):
+        """Coupon đang bật và còn lượt dùng."""
+        return self.filter(Q(usage_limit__isnull=True) | Q(times_used__lt=F("usage_limit")), active=True)
+
+    def redeem(self, code):
+        """
+        Tăng times_used của coupon `code` thêm 1 bằng 1 câu UPDATE có điều kiện
+        (times_used < usage_limit) -> 2 request cùng lúc không vượt limit.
+        Trả True nếu dùng được.
+        """
+        return bool(self.available().filter(code=code).update(times_used=F("times_used") + 1))
+
+
+class Coupon(models.Model):
+    """Mã giảm giá (apply_discount / payPage), rule đã compile được cache trong app/coupons.py."""
+    PERCENT = "percent"
+    FIXED = "fixed"
+    KIND_CHOICES = [
+        (PERCENT, "Percent of subtotal"),
+        (FIXED, "Fixed amount (VNĐ)"),
+    ]
+
+    code = models.CharField(max_length=30, unique=True, help_text="Viết hoa, vd SAVE10")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=PERCENT)
+    value = models.PositiveIntegerField(help_text="Phần trăm (1-100) hoặc số tiền VNĐ")
+    min_subtotal = models.PositiveIntegerField(default=0, help_text="Giỏ hàng tối thiểu (VNĐ)")
+    active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    usage_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Để trống = không giới hạn")
+    times_used = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CouponQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=~Q(kind="percent") | Q(value__lte=100), name="coupon_percent_lte_100"
+            ),
+        ]
+
+    def __str__(self):
+        return self.code
+
+    def save(self, *args, **kwargs):
+        self.code = (self.code or "").strip().upper()
+        super().save(*args, **kwargs)
+
+
+class OutboundEmail(models.Model):
+    """
+    Outbox email: request chỉ INSERT 1 dòng (cùng transaction với dữ liệu),
+    `manage.py send_queued_mail` gửi thật qua SMTP (xem app/mail.py).
+    """
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (DEAD, "Dead letter"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=200, blank=True)
+    to = models.TextField(help_text="Danh sách người nhận, mỗi dòng 1 email")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to}"
+
+    @property
+    def recipients(self):
+        return [line for line in self.to.splitlines() if line.strip()]
+
+
+class DailySales(models.Model):
+    """Doanh thu mỗi ngày (theo ngày thanh toán), ghi bởi app/rollups.py -> dashboard admin."""
+    day = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    subtotal = models.FloatField(default=0)
+    discount = models.FloatField(default=0)
+    revenue = models.FloatField(default=0)  # sau discount
+
+    class Meta:
+        verbose_name = "sales dashboard"
+        verbose_name_plural = "sales dashboard"
+
+    def __str__(self):
+        return str(self.day)
+
+
+class DailyProductSales(models.Model):
+    """Số lượng / doanh thu mỗi product mỗi ngày. name / code chụp lại để product bị xoá vẫn hiện."""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, blank=True, null=True)
+    name = models.CharField(max_length=200, blank=True, default="")
+    code = models.CharField(max_length=20, blank=True, default="")
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.FloatField(default=0)  # trước discount (discount tính trên cả order)
+
+    class Meta:
+        constraints = [
+            # index (day, product) cũng phục vụ top products theo khoảng ngày
+            models.UniqueConstraint(fields=["day", "product"], name="unique_daily_product_sales"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.name}"
+
+
+class RollupState(models.Model):
+    """High-water mark của các rollup (app/rollups.py): completed_at lớn nhất đã tổng hợp."""
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,141 @@
+"""
+Export order ra CSV cho kế toán: admin action (Order / OrderItem) và `manage.py export_orders`.
+
+- 1 dòng CSV / dòng hàng, kèm thông tin order, customer và địa chỉ giao hàng
+  (order chưa có dòng hàng vẫn ra 1 dòng, cột hàng để trống).
+- Đọc bằng iterator(chunk_size) + select_related; dòng hàng / địa chỉ prefetch theo
+  từng chunk -> số query theo số chunk, bộ nhớ cố định dù 1 triệu dòng.
+- Admin: StreamingHttpResponse ghi dần từng dòng, queryset là đúng những gì
+  changelist đang lọc (complete, date_order, ...) / đã chọn.
+"""
+import csv
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Order, OrderItem, ShippingAddress
+
+COLUMNS = [
+    "order_id", "date_order", "completed_at", "complete", "transaction_id",
+    "customer", "email",
+    "address", "city", "state", "mobile",
+    "item_id", "product_code", "product_name", "quantity", "unit_price", "line_total",
+    "order_subtotal", "discount_code", "discount_amount", "order_total",
+]
+
+CHUNK_SIZE = 2000
+
+
+def _date(value):
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S") if value else ""
+
+
+def _number(value):
+    if value is None:
+        return ""
+    return int(value) if float(value).is_integer() else value
+
+
+def _order_columns(order):
+    customer = order.customer
+    # order có nhiều địa chỉ (thanh toán lại) -> lấy địa chỉ mới nhất
+    addresses = order.shippingaddress_set.all()
+    shipping = addresses[len(addresses) - 1] if addresses else None
+    total = order.total if order.total is not None else order.subtotal - order.discount_amount
+    return {
+        "order_id": order.pk,
+        "date_order": _date(order.date_order),
+        "completed_at": _date(order.completed_at),
+        "complete": int(bool(order.complete)),
+        "transaction_id": order.transaction_id or "",
+        "customer": customer.name if customer else "",
+        "email": customer.email if customer else "",
+        "address": shipping.address if shipping else "",
+        "city": shipping.city if shipping else "",
+        "state": shipping.state if shipping else "",
+        "mobile": shipping.mobile if shipping else "",
+        "order_subtotal": _number(order.subtotal),
+        "discount_code": order.discount_code,
+        "discount_amount": _number(order.discount_amount),
+        "order_total": _number(total),
+    }
+
+
+def _item_columns(item):
+    product = item.product
+    price = item.unit_price if item.unit_price is not None else (product.price if product else None)
+    quantity = item.quantity or 0
+    return {
+        "item_id": item.pk,
+        "product_code": product.code if product else "",
+        "product_name": product.name if product else "",
+        "quantity": quantity,
+        "unit_price": _number(price),
+        "line_total": _number(price * quantity) if price is not None else "",
+    }
+
+
+def order_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield dict theo COLUMNS cho từng dòng hàng của các order trong queryset (theo id)."""
+    queryset = Order.objects.all() if queryset is None else queryset
+    orders = (
+        queryset.order_by("pk")
+        .select_related("customer")
+        .prefetch_related(
+            Prefetch("orderitem_set", queryset=OrderItem.objects.select_related("product").order_by("id")),
+            Prefetch("shippingaddress_set", queryset=ShippingAddress.objects.order_by("id")),
+        )
+    )
+    for order in orders.iterator(chunk_size=chunk_size):
+        columns = _order_columns(order)
+        items = order.orderitem_set.all()
+        if not items:
+            yield columns
+        for item in items:
+            yield {**columns, **_item_columns(item)}
+
+
+def item_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """Như order_rows nhưng đi từ queryset OrderItem (changelist OrderItem)."""
+    queryset = OrderItem.objects.all() if queryset is None else queryset
+    items = (
+        queryset.filter(order__isnull=False)
+        .order_by("order_id", "pk")
+        .select_related("order", "order__customer", "product")
+        .prefetch_related(Prefetch("order__shippingaddress_set", queryset=ShippingAddress.objects.order_by("id")))
+    )
+    for item in items.iterator(chunk_size=chunk_size):
+        yield {**_order_columns(item.order), **_item_columns(item)}
+
+
+def write_rows(stream, rows):
+    """Ghi header + rows ra stream CSV, trả số dòng."""
+    writer = csv.DictWriter(stream, fieldnames=COLUMNS, restval="", lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+class _Echo:
+    """File giả cho csv.writer: write() trả lại chuỗi để StreamingHttpResponse gửi đi ngay."""
+
+    def write(self, value):
+        return value
+
+
+def _stream(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=COLUMNS, restval="", lineterminator="\n")
+    # BOM để Excel đọc đúng UTF-8 (tên / địa chỉ tiếng Việt)
+    yield "\ufeff" + writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_response(rows, filename):
+    response = StreamingHttpResponse(_stream(rows), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
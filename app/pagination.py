@@ -0,0 +1,63 @@
+"""
+Keyset (cursor) pagination theo id tăng dần (hoặc giảm dần: mới nhất trước).
+
+Thay cho OFFSET: trang sau chỉ cần `WHERE id > <cursor> ORDER BY id LIMIT n+1`,
+chi phí không tăng theo số trang. Cursor = id của dòng cuối trang trước (?after=).
+"""
+from django.conf import settings
+
+
+def page_size(value=None):
+    """Page size từ query string (?limit=), kẹp trong [1, CATALOG_MAX_PAGE_SIZE]."""
+    default = getattr(settings, "CATALOG_PAGE_SIZE", 24)
+    maximum = getattr(settings, "CATALOG_MAX_PAGE_SIZE", 100)
+    try:
+        size = int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def parse_cursor(value):
+    """Cursor ?after= -> int, hoặc None nếu trống / không hợp lệ (= trang đầu)."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, after=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.after = after
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.after is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(queryset, after=None, size=None, descending=False):
+    """
+    Lấy 1 trang (size dòng) sau cursor `after`; đọc thêm 1 dòng để biết còn trang sau.
+    descending=True: id giảm dần, trang sau là `WHERE id < <cursor>`.
+    """
+    size = size or page_size()
+    queryset = queryset.order_by("-id" if descending else "id")
+    if after is not None:
+        queryset = queryset.filter(id__lt=after) if descending else queryset.filter(id__gt=after)
+
+    rows = list(queryset[:size + 1])
+    next_cursor = rows[size - 1].id if len(rows) > size else None
+    return KeysetPage(rows[:size], next_cursor, after)
@@ -0,0 +1,165 @@
+"""
+Số query SQL tối đa cho từng view (view_name của URL, vd "cart", "admin:app_order_changelist").
+
+- QueryBudgetMiddleware (app/middleware.py) đếm số query + tổng thời gian SQL của mỗi
+  request bằng execute_wrapper (chạy cả khi DEBUG=False), cộng dồn theo view_name -> stats().
+- Vượt BUDGETS thì xử lý theo QUERY_BUDGET_MODE: "warn" (log warning), "raise"
+  (QueryBudgetExceeded, dùng khi dev để bắt N+1 ngay), "off" (chỉ đếm).
+- Test: `with assert_query_budget(self, "cart"): self.client.get(reverse("cart"))`.
+
+Budget tính cho user đã login có giỏ hàng (trường hợp nhiều query nhất), đã gồm
+query của session / auth middleware. Số query không được tăng theo số dòng (N+1).
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+BUDGETS = {
+    # catalog (lần đầu có thêm get_or_create giỏ hàng)
+    "home": 10,
+    "product": 6,
+    "product_detail": 6,
+    "article": 8,
+    "search_page": 6,
+    "detail": 2,
+    # giỏ hàng / thanh toán (SESSION_MODE=db: mỗi request đọc session từ DB)
+    "cart": 6,
+    "checkout": 6,
+    "apply_discount": 9,  # + nạp rule coupon (cache nguội) hoặc kiểm tra usage_limit
+    "update_item": 12,  # giỏ mới (get_or_create savepoint) hoặc product mới (savepoint INSERT), xem test_cart_write_*
+    # giỏ mới (get_or_create savepoint) + product mới (savepoint INSERT), tổng tính lại 1 lần,
+    # xem test_batch_cart_write_creates_order / test_batch_cart_write_worst_case
+    "update_items": 16,
+    "pay_page": 19,  # POST có coupon giới hạn lượt: + kiểm tra / trừ lượt coupon, xem test_checkout_with_coupon
+    "payment_success": 6,
+    # tài khoản
+    "signup": 8,
+    "signin": 10,
+    "profile": 4,
+    "logout": 5,
+    # staff
+    "addProduct": 6,
+    "addArticle": 6,
+    "catalog_cache_stats": 2,
+    "query_budget_stats": 2,
+    "metrics": 2,
+    # JSON API
+    "products_api": 3,
+    "articles_api": 3,
+    "search_suggest": 2,
+    # admin changelist (list_select_related, không query theo từng dòng)
+    "admin:app_order_changelist": 8,
+    "admin:app_orderitem_changelist": 6,
+    "admin:app_shippingaddress_changelist": 6,
+    "admin:app_customer_changelist": 6,
+    "admin:app_product_changelist": 6,
+    "admin:app_outboundemail_changelist": 6,
+    "admin:app_coupon_changelist": 6,
+    "admin:app_dailysales_changelist": 6,  # dashboard: chỉ đọc bảng rollup
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """execute_wrapper đếm số query và tổng thời gian (giây)."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries():
+    """Đếm query trên mọi database alias (default + replica nếu có)."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def budget_for(view_name):
+    return BUDGETS.get(view_name)
+
+
+def mode():
+    return getattr(settings, "QUERY_BUDGET_MODE", "warn")
+
+
+def check(view_name, count):
+    """So count với budget của view_name theo QUERY_BUDGET_MODE."""
+    budget = budget_for(view_name)
+    if budget is None or count <= budget or mode() == "off":
+        return
+    message = f"{view_name}: {count} queries, budget {budget}"
+    if mode() == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning("Query budget exceeded: %s", message)
+
+
+# -----------------------------
+# Thống kê theo view
+# -----------------------------
+_stats_lock = threading.Lock()
+_stats = {}  # view_name -> [requests, queries, seconds, max queries]
+
+
+def record(view_name, count, duration):
+    with _stats_lock:
+        row = _stats.setdefault(view_name, [0, 0, 0.0, 0])
+        row[0] += 1
+        row[1] += count
+        row[2] += duration
+        row[3] = max(row[3], count)
+
+
+def stats():
+    with _stats_lock:
+        rows = {name: list(row) for name, row in _stats.items()}
+    return {
+        name: {
+            "requests": requests,
+            "queries": queries,
+            "avg_queries": round(queries / requests, 2),
+            "max_queries": max_queries,
+            "sql_ms": round(seconds * 1000, 2),
+            "budget": budget_for(name),
+        }
+        for name, (requests, queries, seconds, max_queries) in sorted(rows.items())
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# -----------------------------
+# Test helper
+# -----------------------------
+@contextmanager
+def assert_query_budget(testcase, view_name, budget=None):
+    """Fail test nếu khối code chạy nhiều query hơn budget của view_name."""
+    budget = BUDGETS[view_name] if budget is None else budget
+    with count_queries() as counter:
+        yield counter
+    testcase.assertLessEqual(
+        counter.count, budget, f"{view_name}: {counter.count} queries, budget {budget}"
+    )
@@ -0,0 +1,166 @@
+"""
+Bảng tổng hợp doanh thu cho dashboard admin (`manage.py rollup_sales`).
+
+- DailySales: 1 dòng / ngày (số order, số món, subtotal, discount, doanh thu sau discount).
+- DailyProductSales: 1 dòng / (ngày, product) (số lượng, doanh thu theo giá snapshot).
+- Ngày = ngày thanh toán (Order.completed_at theo TIME_ZONE), không phải date_order:
+  date_order là lúc tạo giỏ hàng, order mở từ hôm trước mà thanh toán hôm nay
+  sẽ bị high-water mark trên date_order bỏ sót.
+- Chạy tăng dần: chỉ tính lại những ngày có order thanh toán sau high-water mark
+  (lùi thêm OVERLAP cho transaction commit chậm). Tính lại cả ngày (DELETE + INSERT)
+  nên chạy lại bao nhiêu lần cũng ra cùng kết quả.
+- Dashboard chỉ đọc bảng rollup: số dòng theo số ngày x số product, không theo số order.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, FloatField, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .db import write_transaction
+from .models import DailyProductSales, DailySales, Order, OrderItem, RollupState
+
+STATE_NAME = "sales"
+OVERLAP = timedelta(minutes=5)
+REBUILD_WINDOW_DAYS = 31  # --rebuild: mỗi transaction tính lại tối đa N ngày
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _aggregate_days(first, last):
+    """Tính rollup cho các ngày [first, last] từ Order / OrderItem (2 câu GROUP BY)."""
+    start, end = _start_of(first), _start_of(last + timedelta(days=1))
+
+    items = OrderItem.objects.filter(
+        order__complete=True, order__completed_at__gte=start, order__completed_at__lt=end
+    )
+    # tên annotate khác tên cột: F("quantity") trong revenue phải là cột của OrderItem
+    products = [
+        DailyProductSales(
+            day=row["day"],
+            product_id=row["product_id"],
+            name=row["name"] or "-",
+            code=row["code"] or "",
+            quantity=row["sold"] or 0,
+            revenue=row["revenue"],
+        )
+        for row in items.annotate(day=TruncDate("order__completed_at")).values("day", "product_id").annotate(
+            sold=Sum("quantity"),
+            revenue=Coalesce(
+                Sum(F("quantity") * Coalesce("unit_price", "product__price"), output_field=FloatField()),
+                Value(0.0),
+            ),
+            name=Max("product__name"),
+            code=Max("product__code"),
+        ).order_by("day", "product_id")
+    ]
+
+    # số món / subtotal cộng từ dòng hàng (cột item_count / subtotal của order cũ có thể lệch)
+    lines = {}
+    for row in products:
+        items_sold, subtotal = lines.get(row.day, (0, 0.0))
+        lines[row.day] = (items_sold + row.quantity, subtotal + row.revenue)
+
+    orders = Order.objects.filter(complete=True, completed_at__gte=start, completed_at__lt=end)
+    daily = [
+        DailySales(
+            day=row["day"],
+            orders=row["orders"],
+            items=lines.get(row["day"], (0, 0.0))[0],
+            subtotal=lines.get(row["day"], (0, 0.0))[1],
+            discount=row["discounts"] or 0,
+            revenue=row["revenue"] or 0,
+        )
+        for row in orders.annotate(day=TruncDate("completed_at")).values("day").annotate(
+            orders=Count("id"),
+            discounts=Sum("discount_amount"),
+            revenue=Sum(Coalesce("total", F("subtotal") - F("discount_amount"))),
+        ).order_by("day")
+    ]
+    return daily, products
+
+
+def refresh_days(first, last):
+    """Tính lại rollup của các ngày [first, last] trong 1 transaction ngắn. Trả số ngày có doanh thu."""
+    daily, products = _aggregate_days(first, last)
+    with write_transaction():
+        DailySales.objects.filter(day__gte=first, day__lte=last).delete()
+        DailyProductSales.objects.filter(day__gte=first, day__lte=last).delete()
+        DailySales.objects.bulk_create(daily)
+        DailyProductSales.objects.bulk_create(products)
+    return len(daily)
+
+
+def refresh_dates(dates):
+    """Tính lại các ngày chứa những thời điểm `dates` (vd admin mở lại order đã thanh toán)."""
+    days = sorted({timezone.localdate(value) for value in dates if value})
+    if days:
+        refresh_days(days[0], days[-1])
+
+
+def refresh(rebuild=False, on_window=None):
+    """
+    Cập nhật rollup từ order thanh toán sau high-water mark (rebuild=True: tính lại từ đầu).
+    on_window(first, last) được gọi sau mỗi đoạn ngày (in tiến độ). Trả {"days", "high_water_mark"}.
+    """
+    state, _ = RollupState.objects.get_or_create(name=STATE_NAME)
+    completed = Order.objects.filter(complete=True, completed_at__isnull=False)
+    if rebuild or state.high_water_mark is None:
+        DailySales.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+    else:
+        completed = completed.filter(completed_at__gt=state.high_water_mark - OVERLAP)
+
+    bounds = completed.aggregate(first=Min("completed_at"), last=Max("completed_at"))
+    if bounds["first"] is None:
+        return {"days": 0, "high_water_mark": state.high_water_mark}
+
+    first, last = timezone.localdate(bounds["first"]), timezone.localdate(bounds["last"])
+    days = 0
+    while first <= last:
+        window_end = min(first + timedelta(days=REBUILD_WINDOW_DAYS - 1), last)
+        days += refresh_days(first, window_end)
+        if on_window:
+            on_window(first, window_end)
+        first = window_end + timedelta(days=1)
+
+    if state.high_water_mark is None or bounds["last"] > state.high_water_mark:
+        state.high_water_mark = bounds["last"]
+    state.save()
+    return {"days": days, "high_water_mark": state.high_water_mark}
+
+
+# -----------------------------
+# Đọc cho dashboard
+# -----------------------------
+def daily_series(days=30, today=None):
+    """Doanh thu `days` ngày gần nhất (ngày không có order = 0), cũ -> mới."""
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    rows = {row.day: row for row in DailySales.objects.filter(day__gte=first, day__lte=today)}
+    series = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = rows.get(day)
+        series.append({
+            "day": day,
+            "orders": row.orders if row else 0,
+            "items": row.items if row else 0,
+            "discount": row.discount if row else 0,
+            "revenue": row.revenue if row else 0,
+        })
+    return series
+
+
+def top_products(days=30, limit=10, today=None):
+    """Product bán chạy nhất (theo doanh thu) trong `days` ngày gần nhất."""
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    return list(
+        DailyProductSales.objects.filter(day__gte=first, day__lte=today)
+        .values("product_id")
+        .annotate(name=Max("name"), code=Max("code"), quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .order_by("-revenue")[:limit]
+    )
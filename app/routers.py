@@ -0,0 +1,69 @@
+"""
+Tách đọc / ghi: catalog (Product, Article) đọc từ replica, còn lại dùng primary.
+
+- Chỉ bật khi DATABASES có alias "replica" (DB_REPLICA_PATH, đồng bộ bằng
+  `manage.py snapshot_replica`); không có thì mọi thứ vẫn ở default như cũ.
+- Ghi luôn vào primary. Giỏ hàng / order / user không bao giờ đọc từ replica.
+- ReplicaRoutingMiddleware (app/middleware.py) bật use_primary cho request POST và
+  cho session vừa ghi catalog trong REPLICA_STICKY_SECONDS (sticky-after-write),
+  để người vừa sửa sản phẩm thấy ngay thay đổi của mình dù replica chưa sync.
+"""
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "replica"
+REPLICA_MODELS = {"app.product", "app.article"}
+
+_use_primary = contextvars.ContextVar("use_primary", default=False)
+_catalog_written = contextvars.ContextVar("catalog_written", default=False)
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def use_primary(value=True):
+    """Ép đọc catalog từ primary cho request hiện tại, trả token để reset."""
+    return _use_primary.set(value)
+
+
+def reset_primary(token):
+    _use_primary.reset(token)
+
+
+def catalog_written():
+    return _catalog_written.get()
+
+
+def start_request():
+    """Gọi đầu mỗi request: xoá cờ ghi của request trước trên cùng thread."""
+    return _catalog_written.set(False)
+
+
+def end_request(token):
+    _catalog_written.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in REPLICA_MODELS or not replica_enabled():
+            return DEFAULT_DB_ALIAS
+        # đọc trong transaction ghi -> primary (thấy dữ liệu chính transaction vừa ghi)
+        if _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower in REPLICA_MODELS:
+            _catalog_written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica là bản sao của default -> quan hệ giữa 2 alias là hợp lệ
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replica chỉ nhận dữ liệu qua snapshot, không migrate riêng
+        return db != REPLICA_ALIAS
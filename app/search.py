@@ -0,0 +1,187 @@
+"""
+Full-text search cho Product (name, code) và Article (name, content)
+bằng bảng ảo SQLite FTS5 `app_search_index`.
+
+- rowid = id * 2 (product) hoặc id * 2 + 1 (article) -> upsert / xoá theo rowid, không scan.
+- Đồng bộ qua signals (FurnitureSales/signals.py), build lại toàn bộ bằng
+  `manage.py rebuild_search_index`.
+- Kết quả xếp theo bm25(), phân trang LIMIT/OFFSET (thứ tự theo rank nên không keyset theo id được).
+- DB không phải SQLite, hoặc SQLite build không kèm FTS5 -> is_available() = False,
+  views dùng lại icontains.
+"""
+import functools
+import re
+
+from django.db import connection
+
+from .models import Article, Product
+from .pagination import KeysetPage
+
+TABLE = "app_search_index"  # tạo bởi migration 0005_search_index
+
+PRODUCT = "product"
+ARTICLE = "article"
+
+# Trọng số bm25 theo cột: kind, obj_id (UNINDEXED), title, code, body
+BM25_WEIGHTS = (0.0, 0.0, 10.0, 8.0, 1.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_available():
+    return connection.vendor == "sqlite" and _fts5_compiled()
+
+
+@functools.cache
+def _fts5_compiled():
+    # compile option của thư viện SQLite, không đổi trong suốt process -> hỏi 1 lần
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'")
+        return cursor.fetchone() is not None
+
+
+def _rowid(kind, obj_id):
+    return obj_id * 2 + (1 if kind == ARTICLE else 0)
+
+
+def _product_row(product):
+    return (_rowid(PRODUCT, product.id), PRODUCT, product.id, product.name or "", product.code or "", "")
+
+
+def _article_row(article):
+    return (_rowid(ARTICLE, article.id), ARTICLE, article.id, article.name or "", "", article.content or "")
+
+
+def build_match_query(text):
+    """
+    Chuỗi user nhập -> câu MATCH an toàn: mỗi từ được quote và match theo prefix,
+    các từ nối bằng AND. Không có từ nào -> None.
+    """
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return None
+    return " ".join('"%s"*' % token.replace('"', '""') for token in tokens)
+
+
+# -----------------------------
+# Index maintenance
+# -----------------------------
+def _insert(rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, kind, obj_id, title, code, body) VALUES (%s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def _upsert(rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+    _insert(rows)
+
+
+def index_product(product):
+    if is_available():
+        _upsert([_product_row(product)])
+
+
+def index_products(products):
+    """Upsert nhiều product 1 lần (import catalog dùng bulk_* nên không có signal)."""
+    rows = [_product_row(product) for product in products]
+    if rows and is_available():
+        _upsert(rows)
+
+
+def index_article(article):
+    if is_available():
+        _upsert([_article_row(article)])
+
+
+def remove(kind, obj_id):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [_rowid(kind, obj_id)])
+
+
+def rebuild(batch_size=1000):
+    """Xoá rồi index lại toàn bộ Product + Article theo batch. Trả về số dòng đã index."""
+    if not is_available():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+
+    total = 0
+    sources = [
+        (Product.objects.only("id", "name", "code"), _product_row),
+        (Article.objects.only("id", "name", "content"), _article_row),
+    ]
+    for queryset, to_row in sources:
+        batch = []
+        for obj in queryset.order_by("id").iterator(chunk_size=batch_size):
+            batch.append(to_row(obj))
+            if len(batch) >= batch_size:
+                _insert(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            _insert(batch)
+            total += len(batch)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return total
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def _ranked_ids(kind, match, limit, offset=0):
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT obj_id FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s AND kind = %s "
+            f"ORDER BY bm25({TABLE}, {weights}) LIMIT %s OFFSET %s",
+            [match, kind, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search(model, kind, text, offset, limit):
+    match = build_match_query(text)
+    if match is None:
+        return KeysetPage([], None, offset or None)
+
+    offset = offset or 0
+    ids = _ranked_ids(kind, match, limit + 1, offset)
+    has_next = len(ids) > limit
+    ids = ids[:limit]
+
+    objects = model.objects.in_bulk(ids)
+    items = [objects[obj_id] for obj_id in ids if obj_id in objects]
+    # cursor của kết quả search là offset (thứ tự theo rank)
+    return KeysetPage(items, offset + limit if has_next else None, offset or None)
+
+
+def search_products(text, offset=None, limit=24):
+    """Product khớp `text`, xếp theo bm25, trả về KeysetPage (cursor = offset)."""
+    return _search(Product, PRODUCT, text, offset, limit)
+
+
+def search_articles(text, offset=None, limit=24):
+    """Như search_products cho Article (name, content), dùng bởi /api/articles/?q=."""
+    return _search(Article, ARTICLE, text, offset, limit)
+
+
+def suggest(prefix, limit=8):
+    """Gợi ý product theo prefix bằng FTS5: [{id, name, code}] (autocomplete dùng khi index chưa build xong)."""
+    match = build_match_query(prefix)
+    if match is None or not is_available():
+        return []
+    ids = _ranked_ids(PRODUCT, match, limit)
+    products = Product.objects.only("id", "name", "code").in_bulk(ids)
+    return [
+        {"id": p.id, "name": p.name, "code": p.code}
+        for p in (products.get(obj_id) for obj_id in ids) if p is not None
+    ]
@@ -1,5 +1,14 @@
 var updateBtn = document.getElementsByClassName('update-cart');
 
+// ✅ Gom nhiều lần click thành 1 request: cộng dồn delta theo product,
+// chỉ gửi lên /update_items/ khi user ngừng click FLUSH_DELAY ms
+var FLUSH_DELAY = 400;
+// giới hạn của /update_items/ (MAX_ITEM_DELTA, MAX_BATCH_ITEMS trong views.py)
+var MAX_ITEM_DELTA = 99;
+var MAX_BATCH_ITEMS = 50;
+var pendingDeltas = {};
+var flushTimer = null;
+
 for (var i = 0; i < updateBtn.length; i++) {
     updateBtn[i].addEventListener('click', function (e) {
         // nếu button nằm trong form, chặn submit để tránh bắn request 2 lần
@@ -19,25 +28,26 @@ for (var i = 0; i < updateBtn.length; i++) {
 
         // ✅ lấy qty nếu có (detail page), không có thì = 1
         var qty = 1;
-        var qtyInput = document.getElementById('qty-input'); 
+        var qtyInput = document.getElementById('qty-input');
         // bạn nhớ đặt id="qty-input" cho ô quantity ở detail.html
         if (qtyInput) {
             qty = parseInt(qtyInput.value || "1");
             if (isNaN(qty) || qty < 1) qty = 1;
-            if (qty > 99) qty = 99;
-        }
-
-        // Lấy CSRF token (ưu tiên hidden input, fallback cookie)
-        var csrfToken = getCSRFToken();
-        if (!csrfToken) {
-            console.log('Cannot find CSRF token');
-            return;
+            if (qty > MAX_ITEM_DELTA) qty = MAX_ITEM_DELTA;
         }
 
-        updateUserOrder(productId, action, qty, csrfToken);
+        queueCartUpdate(productId, action === 'remove' ? -qty : qty);
     });
 }
 
+// Rời trang khi còn click chưa gửi -> gửi luôn (keepalive để request không bị huỷ)
+window.addEventListener('pagehide', function () {
+    if (flushTimer) {
+        clearTimeout(flushTimer);
+        flushCartUpdates(true);
+    }
+});
+
 
 // ✅ helper: lấy CSRF từ input hoặc cookie
 function getCSRFToken() {
@@ -58,29 +68,85 @@ function getCSRFToken() {
 }
 
 
-// ✅ Định nghĩa hàm update (có qty)
-function updateUserOrder(productId, action, qty, csrfToken) {
-    console.log('user login, updating order... qty =', qty);
+// ✅ Cộng dồn delta, reset timer mỗi lần click (debounce)
+function queueCartUpdate(productId, delta) {
+    pendingDeltas[productId] = (pendingDeltas[productId] || 0) + delta;
 
-    var url = '/update_item/';
+    if (flushTimer) clearTimeout(flushTimer);
+    flushTimer = setTimeout(function () {
+        flushCartUpdates(false);
+    }, FLUSH_DELAY);
+}
+
+
+// ✅ Lấy tối đa MAX_BATCH_ITEMS op ra khỏi pendingDeltas, mỗi op |delta| <= MAX_ITEM_DELTA
+// (server cộng các op cùng product). Phần còn lại ở lại pendingDeltas cho lần gửi sau.
+function takeCartItems() {
+    var items = [];
+    for (var productId in pendingDeltas) {
+        var delta = pendingDeltas[productId];
+        while (delta !== 0 && items.length < MAX_BATCH_ITEMS) {
+            var step = Math.max(-MAX_ITEM_DELTA, Math.min(MAX_ITEM_DELTA, delta));
+            items.push({ 'productId': productId, 'delta': step });
+            delta -= step;
+        }
+        if (delta === 0) delete pendingDeltas[productId];
+        else pendingDeltas[productId] = delta;
+    }
+    return items;
+}
+
+
+// ✅ Gửi delta đang chờ (1 request / lượt, lượt sau gửi tiếp phần còn lại nếu có)
+function flushCartUpdates(keepalive) {
+    flushTimer = null;
+
+    var items = takeCartItems();
+    if (items.length === 0) return;
+
+    // Lấy CSRF token (ưu tiên hidden input, fallback cookie)
+    var csrfToken = getCSRFToken();
+    if (!csrfToken) {
+        console.log('Cannot find CSRF token');
+        return;
+    }
+
+    console.log('user login, updating order...', items);
+
+    var url = '/update_items/';
     fetch(url, {
         method: 'POST',
+        keepalive: keepalive,
         headers: {
             'Content-Type': 'application/json',
             'X-CSRFToken': csrfToken,
         },
-        body: JSON.stringify({
-            'productId': productId,
-            'action': action,
-            'qty': qty
-        })
+        body: JSON.stringify({ 'items': items })
+    })
+    .then((response) => {
+        return response.json().catch(() => ({})).then((data) => {
+            if (!response.ok) {
+                throw new Error(data.error || ('HTTP ' + response.status));
+            }
+            return data;
+        });
     })
-    .then((response) => response.json())
     .then((data) => {
         console.log('data', data);
-        location.reload();
+        // còn phần chưa gửi (vượt giới hạn 1 request) và không có click mới đang chờ -> gửi tiếp
+        if (Object.keys(pendingDeltas).length > 0 && !flushTimer) {
+            flushCartUpdates(keepalive);
+            return;
+        }
+        if (!keepalive) location.reload();
     })
     .catch((err) => {
-        console.log('error', err);
+        // request lỗi: bỏ phần đang chờ, tải lại để giỏ hàng hiển thị đúng số trên server
+        console.error('Cart update failed:', err);
+        pendingDeltas = {};
+        if (!keepalive) {
+            alert('Không cập nhật được giỏ hàng, vui lòng thử lại.');
+            location.reload();
+        }
     });
 }
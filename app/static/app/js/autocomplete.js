@@ -0,0 +1,44 @@
+// ✅ Gợi ý sản phẩm khi gõ vào ô search (GET /api/search/suggest/?q=)
+// Server trả lời từ index trong bộ nhớ, JS chỉ gửi khi ngừng gõ SUGGEST_DELAY ms
+(function () {
+    var SUGGEST_DELAY = 150;
+    var input = document.getElementById('search-input');
+    var list = document.getElementById('search-suggestions');
+    if (!input || !list) return;
+
+    var timer = null;
+    var lastQuery = '';
+
+    function render(results) {
+        list.innerHTML = '';
+        results.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.name;
+            if (item.code) option.label = item.code;
+            list.appendChild(option);
+        });
+    }
+
+    input.addEventListener('input', function () {
+        var q = input.value.trim();
+        if (timer) clearTimeout(timer);
+        if (!q) {
+            render([]);
+            return;
+        }
+
+        timer = setTimeout(function () {
+            if (q === lastQuery) return;
+            lastQuery = q;
+            fetch('/api/search/suggest/?q=' + encodeURIComponent(q))
+                .then((response) => response.json())
+                .then((data) => {
+                    // bỏ qua kết quả cũ nếu user đã gõ tiếp
+                    if (q === input.value.trim()) render(data.results || []);
+                })
+                .catch((err) => {
+                    console.log('suggest error', err);
+                });
+        }, SUGGEST_DELAY);
+    });
+})();
@@ -1,4 +1,8 @@
 function startCountdown(endTime) {
+    // trang không có đồng hồ đếm ngược (#days) -> không làm gì
+    if (!document.getElementById("days")) return;
+    let interval = null;
+
     function updateCountdown() {
         const now = new Date().getTime();
         const distance = endTime - now;
@@ -23,8 +27,8 @@ function startCountdown(endTime) {
         document.getElementById("seconds").innerHTML = String(seconds).padStart(2, '0');
     }
 
+    interval = setInterval(updateCountdown, 1000);
     updateCountdown();
-    const interval = setInterval(updateCountdown, 1000);
 }
 
 // Set the date we're counting down to
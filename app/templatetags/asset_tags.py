@@ -0,0 +1,32 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from app import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_bundle(name):
+    """
+    {% static_bundle "base.css" %} / {% static_bundle "base.js" %}
+
+    STATIC_BUILD=1: 1 thẻ trỏ tới bundle đã build (tên có hash).
+    Dev, hoặc chưa chạy build_static: từng file nguồn (tên gốc).
+    """
+    bundle = assets.built_bundle(name) if assets.bundles_enabled() else None
+    if bundle:
+        urls = [static(bundle)]
+    elif assets.bundles_enabled():
+        # manifest chưa có bundle -> {% static %} của ManifestStorage sẽ ValueError, dùng tên gốc
+        urls = [settings.STATIC_URL + source for source in assets.bundle_sources(name)]
+    else:
+        urls = [static(source) for source in assets.bundle_sources(name)]
+
+    if name.endswith(".css"):
+        return format_html_join("\n    ", '<link rel="stylesheet" href="{}" />', ((url,) for url in urls))
+    if name.endswith(".js"):
+        return format_html_join("\n    ", '<script src="{}"></script>', ((url,) for url in urls))
+    raise template.TemplateSyntaxError(f"static_bundle: unsupported bundle type {name!r}")
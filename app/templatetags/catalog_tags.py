@@ -0,0 +1,33 @@
+from django import template
+
+from app import catalog_cache
+
+register = template.Library()
+
+
+class CatalogFragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return catalog_cache.get_fragment(self.name, vary_on, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def catalogfragment(parser, token):
+    """
+    Cache phần HTML chỉ phụ thuộc catalog, key theo catalog version:
+
+        {% catalogfragment product_grid [vary_on ...] %} ... {% endcatalogfragment %}
+
+    Không đặt dữ liệu riêng của user (csrf_token, cartItems, ...) bên trong.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError("'%s' tag requires a fragment name." % bits[0])
+    nodelist = parser.parse(("endcatalogfragment",))
+    parser.delete_first_token()
+    return CatalogFragmentNode(nodelist, bits[1], [parser.compile_filter(b) for b in bits[2:]])
@@ -1,3 +1,1898 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import shutil
+import smtplib
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail as django_mail
+from django.core.cache import caches
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template, TemplateSyntaxError
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from FurnitureSales.database import BUSY_TIMEOUT_MS, JOURNAL_MODE, pragma_statements
+
+from . import (
+    assets, autocomplete, catalog_cache, catalog_io, checks, checkout, coupons, mail, metrics, order_export, query_budget,
+    rollups, routers, search,
+)
+from .benchmarks import data, harness, journeys
+from .db import write_transaction
+from .middleware import PRIMARY_UNTIL_KEY, ReplicaRoutingMiddleware
+from .models import (
+    Article, Coupon, Customer, DailyProductSales, DailySales, Order, OrderItem, OrderItemQuerySet, OutboundEmail, Product,
+    ShippingAddress,
+)
+from .pagination import keyset_paginate, page_size, parse_cursor
+
+
+# -----------------------------
+# SQLite: WAL / pragma / BEGIN IMMEDIATE
+# -----------------------------
+def run_cart_write_stress(path, tuned, workers=8, iterations=20):
+    """
+    Mô phỏng updateItem: nhiều thread cùng đọc rồi ghi 1 dòng giỏ hàng.
+    tuned=False: như Django mặc định (journal DELETE, BEGIN DEFERRED).
+    tuned=True: WAL + PRAGMAS của FurnitureSales/database.py + BEGIN IMMEDIATE.
+    Trả (số lần "database is locked", quantity cuối cùng).
+    """
+    setup = sqlite3.connect(path, isolation_level=None)
+    if tuned:
+        setup.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")  # như `manage.py enable_wal`
+    setup.execute("CREATE TABLE cart (id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL)")
+    setup.execute("INSERT INTO cart (id, quantity) VALUES (1, 0)")
+    setup.close()
+
+    errors = []
+    start = threading.Barrier(workers)
+
+    def worker():
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        if tuned:
+            for statement in pragma_statements():
+                conn.execute(statement)
+        start.wait()
+        for _ in range(iterations):
+            try:
+                conn.execute("BEGIN IMMEDIATE" if tuned else "BEGIN")
+                conn.execute("SELECT quantity FROM cart WHERE id = 1").fetchone()
+                time.sleep(0.001)  # xử lý Python giữa đọc và ghi (get_or_create, ...)
+                conn.execute("UPDATE cart SET quantity = quantity + 1 WHERE id = 1")
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                errors.append(exc)
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    check = sqlite3.connect(path)
+    quantity = check.execute("SELECT quantity FROM cart WHERE id = 1").fetchone()[0]
+    check.close()
+    return len(errors), quantity
+
+
+class SQLiteCartWriteStressTests(SimpleTestCase):
+    workers = 8
+    iterations = 20
+
+    def run_stress(self, tuned):
+        with tempfile.TemporaryDirectory() as tmp:
+            return run_cart_write_stress(
+                os.path.join(tmp, "stress.sqlite3"), tuned, workers=self.workers, iterations=self.iterations
+            )
+
+    def test_tuned_config_has_no_lock_errors(self):
+        baseline_errors, baseline_quantity = self.run_stress(tuned=False)
+        tuned_errors, tuned_quantity = self.run_stress(tuned=True)
+
+        total = self.workers * self.iterations
+        self.assertEqual(baseline_quantity, total - baseline_errors)
+        self.assertEqual(tuned_errors, 0)
+        self.assertEqual(tuned_quantity, total)
+        self.assertGreater(baseline_errors, tuned_errors)
+
+
+class SQLiteConnectionTests(TransactionTestCase):
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], BUSY_TIMEOUT_MS)
+
+    def test_write_transaction_begins_immediate(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with write_transaction():
+                with write_transaction():  # lồng -> savepoint, không BEGIN lần 2
+                    pass
+        begins = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("BEGIN")]
+        self.assertEqual(begins, ["BEGIN IMMEDIATE"])
+        self.assertIsNone(connection.transaction_mode)
+
+    def test_cart_write_begins_immediate(self):
+        user = User.objects.create_user("wal", password="pw")
+        Customer.objects.create(user=user, name="wal")
+        product = Product.objects.create(name="Ghế", price=100)
+        client = Client()
+        client.force_login(user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(
+                reverse("update_item"), json.dumps({"productId": product.pk, "action": "add"}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        begins = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("BEGIN")]
+        self.assertEqual(begins, ["BEGIN IMMEDIATE"])
+
+    def test_connect_does_not_rewrite_journal_mode(self):
+        # init_command chạy mỗi lần connect -> không được đổi header file DB (db.sqlite3 đang được track)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plain.sqlite3")
+            conn = sqlite3.connect(path, isolation_level=None)
+            conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+            for statement in pragma_statements():
+                conn.execute(statement)
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            conn.close()
+            self.assertEqual(mode, "delete")
+
+    def test_enable_wal_refuses_in_memory_db(self):
+        # test DB là in-memory, không có WAL -> lệnh phải báo lỗi thay vì im lặng
+        with self.assertRaisesMessage(CommandError, "Could not enable WAL"):
+            call_command("enable_wal", stdout=StringIO())
+
+
+# -----------------------------
+# Query plan: hot query không được quay về full scan
+# -----------------------------
+# "SCAN app_order" (không kèm USING INDEX) = đọc cả bảng; TEMP B-TREE = sort lại trong bộ nhớ
+FULL_SCAN_RE = re.compile(r"^SCAN (app_\w+)$")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+def explain_query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTests(TestCase):
+    """
+    Chạy từng đường code nóng, lấy SQL thật (CaptureQueriesContext) rồi EXPLAIN QUERY PLAN.
+    Fail nếu có bước nào full scan bảng app_* hoặc phải sort tạm thay vì dùng index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("plan", password="x")
+        cls.customer = Customer.objects.create(user=user, name="Plan", email="plan@example.com")
+        cls.product = Product.objects.create(name="Sofa", code="SF00001", price=1000)
+        cls.order = Order.objects.create(customer=cls.customer)
+        OrderItem.objects.create(order=cls.order, product=cls.product, quantity=1)
+        ShippingAddress.objects.create(customer=cls.customer, order=cls.order, address="1 Street")
+
+    def assertIndexedQueries(self, run):
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+        plans = {}
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            plan = explain_query_plan(sql)
+            plans[sql] = plan
+            for step in plan:
+                self.assertNotRegex(step, FULL_SCAN_RE, f"full scan in:\n{sql}\n{plan}")
+                self.assertNotEqual(step, TEMP_SORT, f"sort without index in:\n{sql}\n{plan}")
+        self.assertTrue(plans, "no query captured")
+        return plans
+
+    def assertUsesIndex(self, plans, index_name):
+        self.assertTrue(
+            any(index_name in step for plan in plans.values() for step in plan),
+            f"{index_name} not used: {plans}",
+        )
+
+    def test_open_order_lookup(self):
+        plans = self.assertIndexedQueries(
+            lambda: Order.objects.get_or_create(customer=self.customer, complete=False)
+        )
+        self.assertUsesIndex(plans, "unique_open_order_per_customer")
+
+    def test_order_history_lookup(self):
+        self.assertIndexedQueries(lambda: list(Order.objects.filter(customer=self.customer, complete=True)))
+        history = Order.objects.filter(customer=self.customer, complete=True)
+        self.assertIndexedQueries(lambda: keyset_paginate(history, after=self.order.pk, size=10, descending=True))
+
+    def test_cart_item_adjust_and_totals(self):
+        def run():
+            OrderItem.objects.adjust_quantity(self.order, self.product, 2)
+            OrderItem.objects.adjust_quantity(self.order, self.product, -1)
+            Order.objects.filter(pk=self.order.pk).recalculate_totals()
+
+        plans = self.assertIndexedQueries(run)
+        self.assertUsesIndex(plans, "(order_id=? AND product_id=?)")
+
+    def test_cart_items_with_products(self):
+        self.assertIndexedQueries(lambda: list(self.order.orderitem_set.select_related("product")))
+
+    def test_product_by_code(self):
+        plans = self.assertIndexedQueries(lambda: list(Product.objects.filter(code="SF00001")))
+        self.assertUsesIndex(plans, "product_code_idx")
+
+    def test_catalog_keyset_page(self):
+        self.assertIndexedQueries(lambda: keyset_paginate(Product.objects.all(), after=self.product.pk, size=24))
+
+    def test_admin_date_ordering(self):
+        since = timezone.now() - timedelta(days=30)
+
+        def run():
+            list(Order.objects.order_by("-date_order")[:25])
+            list(Order.objects.filter(date_order__gte=since).order_by("-date_order")[:25])
+            list(OrderItem.objects.order_by("-date_added")[:25])
+            list(ShippingAddress.objects.order_by("-date_added")[:25])
+
+        plans = self.assertIndexedQueries(run)
+        for index_name in ("order_date_order_idx", "orderitem_date_added_idx", "shipping_date_added_idx"):
+            self.assertUsesIndex(plans, index_name)
+
+    def test_outbox_claim(self):
+        mail.enqueue_mail("Subject", "Body", ["plan@example.com"])
+        plans = self.assertIndexedQueries(lambda: mail._claim_batch(10))
+        self.assertUsesIndex(plans, "outbox_status_due_idx")
+
+
+# -----------------------------
+# Query budget theo view (app/query_budget.py)
+# -----------------------------
+class QueryBudgetTests(TestCase):
+    cart_size = 10
+
+    @classmethod
+    def setUpClass(cls):
+        # thumbnail của seed_catalog ghi vào thư mục tạm, tạo trước setUpTestData
+        cls.thumbnail_root = tempfile.mkdtemp(prefix="thumbs-")
+        cls.addClassCleanup(shutil.rmtree, cls.thumbnail_root, ignore_errors=True)
+        override = override_settings(THUMBNAIL_ROOT=cls.thumbnail_root)
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        harness.seed_catalog(products=30, articles=6)
+        cls.user = harness.create_customer("budget")
+        cls.staff = User.objects.create_superuser("budget_staff", "staff@example.com", "x")
+        cls.products = list(Product.objects.order_by("id"))
+        order = Order.objects.create(customer=cls.user.customer)
+        cls.paid = Order.objects.create(customer=cls.user.customer, complete=True)
+        for product in cls.products[:cls.cart_size]:
+            OrderItem.objects.create(order=order, product=product, quantity=2)
+            OrderItem.objects.create(order=cls.paid, product=product, quantity=1)
+            ShippingAddress.objects.create(customer=cls.user.customer, order=cls.paid, address="1 Street")
+
+    def setUp(self):
+        caches["catalog"].clear()
+        self.client.force_login(self.user)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def get(self, view_name, *args, client=None, query=""):
+        with query_budget.assert_query_budget(self, view_name):
+            response = (client or self.client).get(reverse(view_name, args=args) + query)
+        self.assertLess(response.status_code, 400, view_name)
+
+    def post_json(self, view_name, data):
+        with query_budget.assert_query_budget(self, view_name):
+            response = self.client.post(reverse(view_name), json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 200, view_name)
+
+    def test_every_route_has_a_budget(self):
+        from . import urls
+
+        for pattern in urls.urlpatterns:
+            self.assertIn(pattern.name, query_budget.BUDGETS)
+
+    def test_catalog_and_cart_pages(self):
+        product = self.products[0]
+        for view_name in ("home", "product", "article", "cart", "checkout", "pay_page", "profile", "detail"):
+            with self.subTest(view_name):
+                self.get(view_name)
+        self.get("product_detail", product.pk)
+        self.get("payment_success", self.paid.pk)
+        self.get("search_page", query="?searched=Sofa")
+        self.get("products_api")
+        self.get("products_api", query="?q=sofa")
+        self.get("articles_api")
+        self.get("articles_api", query="?q=sofa")
+        with self.settings(AUTOCOMPLETE_BACKGROUND_REBUILD=False):
+            self.get("search_suggest", query="?q=so")
+
+    def test_cart_writes(self):
+        product = self.products[0]
+        self.post_json("update_item", {"productId": product.pk, "action": "add"})
+        self.post_json("update_items", {"items": [{"productId": p.pk, "delta": 1} for p in self.products[:5]]})
+        self.post_json("apply_discount", {"code": "SAVE10"})
+
+    def test_checkout_with_coupon(self):
+        # đường tốn query nhất của pay_page: coupon có usage_limit -> kiểm tra + trừ lượt trong transaction
+        Coupon.objects.create(code="BUDGET", kind=Coupon.PERCENT, value=10, usage_limit=5)
+        coupons.invalidate()
+        self.post_json("apply_discount", {"code": "BUDGET"})
+        with query_budget.assert_query_budget(self, "pay_page"):
+            response = self.client.post(reverse("pay_page"), {
+                "address": "1 Street", "city": "HN", "state": "HN", "mobile": "0900000000",
+                "checkout_token": "budget-coupon",
+            })
+        self.assertEqual(response.status_code, 302)
+        order = Order.objects.get(checkout_token="budget-coupon")
+        self.assertEqual(order.discount_code, "BUDGET")
+        self.assertEqual(Coupon.objects.get(code="BUDGET").times_used, 1)
+
+    def test_cart_write_creates_order(self):
+        # customer chưa có giỏ hàng: update_item tạo order + dòng hàng đầu tiên trong cùng budget
+        self.client.force_login(harness.create_customer("budget_new"))
+        self.post_json("update_item", {"productId": self.products[0].pk, "action": "add"})
+        order = Order.objects.get(customer__user__username="budget_new", complete=False)
+        self.assertEqual(order.item_count, 1)
+        self.assertEqual(order.subtotal, self.products[0].price)
+        self.assertEqual(order.orderitem_set.get().quantity, 1)
+
+    def test_cart_write_existing_cart(self):
+        # giỏ có sẵn: product mới (savepoint INSERT) và dòng về 0 (DELETE), tổng chỉ tính lại 1 lần
+        order = Order.objects.get(customer=self.user.customer, complete=False)
+        new = self.products[self.cart_size]
+        with CaptureQueriesContext(connection) as queries:
+            self.post_json("update_item", {"productId": new.pk, "action": "add"})
+        self.assertEqual(sum('UPDATE "app_order"' in q["sql"] for q in queries.captured_queries), 1)
+        self.assertEqual(order.orderitem_set.get(product=new).quantity, 1)
+
+        line = order.orderitem_set.exclude(product=new).first()
+        line.quantity = 1
+        line.save()
+        self.post_json("update_item", {"productId": line.product_id, "action": "remove"})
+        self.assertFalse(order.orderitem_set.filter(pk=line.pk).exists())
+        order.refresh_from_db()
+        self.assertEqual(order.item_count, (self.cart_size - 1) * 2 + 1)
+
+    def test_remove_on_new_cart_creates_no_item(self):
+        self.client.force_login(harness.create_customer("budget_remove"))
+        self.post_json("update_item", {"productId": self.products[0].pk, "action": "remove"})
+        order = Order.objects.get(customer__user__username="budget_remove", complete=False)
+        self.assertFalse(order.orderitem_set.exists())
+        self.assertEqual(order.item_count, 0)
+
+    def test_batch_cart_write_worst_case(self):
+        # batch tốn query nhất: dòng có sẵn về 0 (DELETE) + product mới (INSERT) cùng lúc
+        order = Order.objects.get(customer=self.user.customer, complete=False)
+        existing = order.orderitem_set.first().product
+        new = Product.objects.exclude(orderitem__order=order).first()
+        with CaptureQueriesContext(connection) as queries:
+            self.post_json("update_items", {"items": [
+                {"productId": existing.pk, "delta": -2},
+                {"productId": new.pk, "delta": 1},
+            ]})
+        # tổng order tính lại 1 lần cho cả batch, không theo từng dòng INSERT / DELETE
+        self.assertEqual(sum('UPDATE "app_order"' in q["sql"] for q in queries.captured_queries), 1)
+        self.assertFalse(order.orderitem_set.filter(product=existing).exists())
+        self.assertTrue(order.orderitem_set.filter(product=new).exists())
+
+    def test_batch_cart_write_creates_order(self):
+        self.client.force_login(harness.create_customer("budget_batch"))
+        self.post_json("update_items", {"items": [{"productId": p.pk, "delta": 1} for p in self.products[:3]]})
+        order = Order.objects.get(customer__user__username="budget_batch", complete=False)
+        self.assertEqual(order.item_count, 3)
+
+    def test_staff_pages(self):
+        for view_name in (
+            "addProduct",
+            "addArticle",
+            "catalog_cache_stats",
+            "query_budget_stats",
+            "admin:app_order_changelist",
+            "admin:app_orderitem_changelist",
+            "admin:app_shippingaddress_changelist",
+            "admin:app_customer_changelist",
+            "admin:app_product_changelist",
+            "admin:app_dailysales_changelist",
+        ):
+            with self.subTest(view_name):
+                self.get(view_name, client=self.staff_client)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        def count(view_name, *args, client=None):
+            with query_budget.count_queries() as counter:
+                (client or self.client).get(reverse(view_name, args=args))
+            return counter.count
+
+        views = [("cart",), ("checkout",), ("payment_success", self.paid.pk)]
+        admin_views = ["admin:app_order_changelist", "admin:app_orderitem_changelist"]
+        before = [count(*v) for v in views] + [count(v, client=self.staff_client) for v in admin_views]
+
+        order = Order.objects.get(customer=self.user.customer, complete=False)
+        for product in self.products[self.cart_size:]:
+            OrderItem.objects.create(order=order, product=product, quantity=1)
+            OrderItem.objects.create(order=self.paid, product=product, quantity=1)
+            Order.objects.create(customer=None)
+
+        after = [count(*v) for v in views] + [count(v, client=self.staff_client) for v in admin_views]
+        self.assertEqual(before, after)
+
+    @override_settings(QUERY_BUDGET_MODE="raise")
+    def test_middleware_raises_over_budget_in_raise_mode(self):
+        with mock.patch.dict(query_budget.BUDGETS, cart=1):
+            with self.assertRaises(query_budget.QueryBudgetExceeded):
+                self.client.get(reverse("cart"))
+        self.assertGreaterEqual(query_budget.stats()["cart"]["requests"], 1)
+
+
+# -----------------------------
+# Load test (app/benchmarks, bench_storefront)
+# -----------------------------
+class StorefrontJourneyTests(TransactionTestCase):
+    def test_journey_runs_without_errors(self):
+        seeded = data.generate(customers=2, products=5, articles=2, orders=3)
+        product_ids = list(Product.objects.values_list("id", flat=True))
+        result = journeys.run(
+            journeys.ClientDriver, seeded["usernames"], product_ids, journeys=2, concurrency=1, warmup=0
+        )
+        self.assertEqual(result["errors"], 0, result["errors_by_step"])
+        self.assertEqual(result["requests"], 2 * len(journeys.STEPS))
+        self.assertEqual(set(result["latency_ms"]), {"all", *journeys.STEPS})
+        # mỗi lượt thanh toán xong 1 order
+        self.assertEqual(Order.objects.filter(complete=True).count(), 3 + 2)
+
+
+# -----------------------------
+# Metrics (app/metrics.py, /metrics/)
+# -----------------------------
+class HistogramTests(SimpleTestCase):
+    def test_percentiles_within_bucket_error(self):
+        histogram = metrics.Histogram()
+        values = list(range(1, 100001))
+        for value in values:
+            histogram.record(value)
+
+        for q in metrics.QUANTILES:
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(histogram.percentile(q), exact, delta=exact / metrics.SUB_BUCKETS)
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(histogram.max, values[-1])
+
+    def test_small_values_are_exact(self):
+        histogram = metrics.Histogram()
+        for value in (0, 1, 2, 3, 40):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(0.5), 2)
+        self.assertEqual(histogram.percentile(0.99), 40)
+
+
+@override_settings(METRICS_TOKEN="scrape-token")
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_requires_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+    def test_records_per_view_quantiles(self):
+        harness.seed_catalog(products=3, articles=0)
+        for _ in range(3):
+            self.client.get(reverse("product"))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["product:request_duration_seconds"]["count"], 3)
+        self.assertGreater(snapshot["product:template_render_seconds"]["sum"], 0)
+        self.assertGreater(snapshot["product:response_size_bytes"]["p50"], 0)
+
+        staff = User.objects.create_superuser("metrics_staff", "m@example.com", "x")
+        self.client.force_login(staff)
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('furniture_request_duration_seconds{view="product",quantile="0.99"}', text)
+        self.assertIn('furniture_request_duration_seconds_count{view="product"} 3', text)
+        self.assertIn('furniture_catalog_cache_requests_total{kind="data",result="hits"}', text)
+
+    def test_prometheus_values_keep_precision(self):
+        text = metrics.prometheus_text({
+            "big_total": ("counter", "Big counter.", [({}, 1234567891)]),
+            "version": ("gauge", "Version.", [({}, 1760000000123)]),
+            "ratio": ("gauge", "Ratio.", [({}, 0.123456789)]),
+        })
+        self.assertIn("furniture_big_total{} 1234567891\n", text)
+        self.assertIn("furniture_version{} 1760000000123\n", text)
+        self.assertIn("furniture_ratio{} 0.123456789\n", text)
+
+
+# -----------------------------
+# Import / export catalog (app/catalog_io.py)
+# -----------------------------
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="catalog-")
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def import_csv(self, path):
+        with open(path, encoding="utf-8", newline="") as f:
+            return catalog_io.import_rows(catalog_io.read_rows(f, "csv"))
+
+    def test_upserts_by_code_and_reports_bad_rows(self):
+        existing = Product.objects.create(name="Sofa cũ", code="SF1", price=100)
+        customer = harness.create_customer("importer").customer
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.create(order=order, product=existing, quantity=2)
+
+        path = self.write("catalog.csv", (
+            "code,name,price,digital,image\n"
+            "SF1,Sofa mới,150,0,\n"
+            "SF2,Ghế gỗ,200,yes,\n"
+            ",Không mã,1,0,\n"
+            "SF3,Bàn,abc,0,\n"
+            "SF2,Ghế gỗ sồi,210,1,\n"
+        ))
+        totals = self.import_csv(path)
+
+        self.assertEqual((totals["created"], totals["updated"]), (1, 1))
+        self.assertEqual([line for line, _ in totals["errors"]], [4, 5])
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.price), ("Sofa mới", 150))
+        self.assertEqual(Product.objects.get(code="SF2").name, "Ghế gỗ sồi")
+        # đổi giá -> giỏ hàng đang mở tính lại như khi sửa qua admin
+        order.refresh_from_db()
+        self.assertEqual(order.subtotal, 300)
+
+        again = self.import_csv(path)
+        self.assertEqual((again["created"], again["updated"], again["unchanged"]), (0, 0, 2))
+
+    def test_bad_images_are_row_errors(self):
+        media = os.path.join(self.tmpdir, "media")
+        override = override_settings(MEDIA_ROOT=media, THUMBNAIL_ROOT=os.path.join(media, "thumbs"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        images = os.path.join(self.tmpdir, "images")
+        os.makedirs(images)
+        for name in ("ghe.png", "ban.png"):
+            Image.new("RGB", (40, 30), (200, 80, 40)).save(os.path.join(images, name))
+        with open(os.path.join(images, "hong.png"), "wb") as f:
+            f.write(b"not an image")
+
+        path = self.write("catalog.csv", (
+            "code,name,price,digital,image\n"
+            "GH1,Ghế,100,0,ghe.png\n"
+            "HG1,Ảnh hỏng,100,0,hong.png\n"
+            "KC1,Không có ảnh,100,0,mat.png\n"
+            "BA1,Bàn,200,0,ban.png\n"
+        ))
+        importer = catalog_io.ImageImporter(images)
+        with open(path, encoding="utf-8", newline="") as f:
+            totals = catalog_io.import_rows(catalog_io.read_rows(f, "csv"), images=importer)
+        importer.close()
+
+        # ảnh hỏng / thiếu chỉ làm hỏng dòng của nó, dòng sau vẫn được import
+        self.assertEqual(sorted(line for line, _ in totals["errors"]), [3, 4])
+        self.assertEqual(totals["created"], 2)
+        self.assertEqual(sorted(Product.objects.values_list("code", flat=True)), ["BA1", "GH1"])
+        self.assertTrue(Product.objects.get(code="BA1").image_hash)
+
+    def test_export_round_trips(self):
+        Product.objects.create(name="Đèn", code="DN1", price=99.5, digital=True, image="products/den.png")
+        out = os.path.join(self.tmpdir, "catalog.jsonl")
+        call_command("export_catalog", out, stdout=StringIO())
+
+        with open(out, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(rows, [
+            {"code": "DN1", "name": "Đèn", "price": 99.5, "digital": True, "image": "products/den.png"}
+        ])
+        call_command("import_catalog", out, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 1)
+
+
+# -----------------------------
+# Coupon (app/coupons.py)
+# -----------------------------
+class CouponTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = harness.create_customer("coupon")
+        cls.product = Product.objects.create(name="Sofa", code="SF1", price=500000)
+
+    def setUp(self):
+        coupons.invalidate()  # on_commit của signal không chạy trong TestCase
+        self.client.force_login(self.user)
+        order = Order.objects.create(customer=self.user.customer)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2)
+
+    def apply(self, code):
+        response = self.client.post(
+            reverse("apply_discount"), json.dumps({"code": code}), content_type="application/json"
+        )
+        return response.json()
+
+    def test_rules_come_from_the_database(self):
+        Coupon.objects.create(code="big", kind=Coupon.FIXED, value=200000, min_subtotal=2000000)
+        Coupon.objects.create(code="OLD", value=20, ends_at=timezone.now() - timedelta(days=1))
+        coupons.invalidate()
+
+        self.assertEqual(self.apply("save10")["discount"], 100000)
+        self.assertEqual(self.apply("OLD")["error"], coupons.EXPIRED)
+        self.assertFalse(self.apply("BIG")["ok"])
+        self.assertEqual(self.apply("NOPE")["error"], coupons.INVALID)
+
+        Coupon.objects.filter(code="BIG").update(min_subtotal=0)
+        coupons.invalidate()
+        self.assertEqual(self.apply("BIG")["discount"], 200000)
+
+    def test_redeem_respects_usage_limit(self):
+        Coupon.objects.create(code="ONCE", value=10, usage_limit=1)
+        self.assertTrue(coupons.redeem("once"))
+        self.assertFalse(coupons.redeem("once"))
+        self.assertEqual(Coupon.objects.get(code="ONCE").times_used, 1)
+
+    def test_pay_page_counts_usage(self):
+        Coupon.objects.create(code="ONCE", value=10, usage_limit=1)
+        coupons.invalidate()
+        self.assertTrue(self.apply("ONCE")["ok"])
+
+        delivery = {"address": "1 Street", "city": "HN", "state": "HN", "mobile": "0900000000"}
+        response = self.client.post(reverse("pay_page"), delivery)
+        self.assertEqual(response.status_code, 302)
+        paid = Order.objects.get(customer=self.user.customer, complete=True)
+        self.assertEqual((paid.discount_code, paid.discount_amount, paid.total), ("ONCE", 100000, 900000))
+        self.assertEqual(Coupon.objects.get(code="ONCE").times_used, 1)
+
+        # hết lượt -> apply báo lỗi, không cần nạp lại cache
+        order = Order.objects.create(customer=self.user.customer)
+        OrderItem.objects.create(order=order, product=self.product, quantity=1)
+        self.assertEqual(self.apply("ONCE")["error"], coupons.USED_UP)
+
+
+# -----------------------------
+# Checkout (app/checkout.py)
+# -----------------------------
+class CheckoutTests(TestCase):
+    delivery = {"address": "1 Street", "city": "HN", "state": "HN", "mobile": "0900000000"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = harness.create_customer("checkout")
+        cls.product = Product.objects.create(name="Sofa", code="SF1", price=300000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.order = Order.objects.create(customer=self.user.customer)
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2)
+
+    def pay(self, token):
+        return self.client.post(reverse("pay_page"), {**self.delivery, "checkout_token": token})
+
+    def test_double_submit_completes_once(self):
+        token = self.client.get(reverse("pay_page")).context["checkout_token"]
+        completed = []
+        receiver = lambda sender, order, **kwargs: completed.append(order.pk)  # noqa: E731
+        checkout.order_completed.connect(receiver)
+        self.addCleanup(checkout.order_completed.disconnect, receiver)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.pay(token)
+        second = self.pay(token)
+
+        self.assertEqual(first["Location"], second["Location"])
+        self.assertEqual(completed, [self.order.pk])
+        self.assertEqual(ShippingAddress.objects.filter(order=self.order).count(), 1)
+        self.assertEqual(OutboundEmail.objects.filter(subject="Order confirmed successfully.").count(), 1)
+
+    def test_snapshot_survives_price_change(self):
+        self.pay("token-1")
+        Product.objects.filter(pk=self.product.pk).update(price=999999)
+        Order.objects.filter(pk=self.order.pk).recalculate_totals()
+
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.complete)
+        self.assertEqual((self.order.subtotal, self.order.total), (600000, 600000))
+        self.assertEqual(self.order.orderitem_set.get().unit_price, 300000)
+        response = self.client.get(reverse("payment_success", args=[self.order.pk]))
+        self.assertEqual(response.context["final_total"], 600000)
+
+    def test_empty_cart_redirects(self):
+        self.order.orderitem_set.all().delete()
+        response = self.pay("token-2")
+        self.assertRedirects(response, reverse("product"), fetch_redirect_response=False)
+        self.assertFalse(ShippingAddress.objects.exists())
+
+    def test_receipt_reads_snapshot_lines(self):
+        self.pay("token-3")
+        Product.objects.filter(pk=self.product.pk).update(name="Renamed", code="NEW", price=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("payment_success", args=[self.order.pk]))
+        self.assertFalse([q for q in ctx.captured_queries if "app_product" in q["sql"]])
+        line = response.context["paid_items"][0]
+        self.assertEqual((line["name"], line["code"], line["price"], line["qty"]), ("Sofa", "SF1", 300000, 2))
+        self.assertContains(response, "SKU: SF1")
+
+    def test_order_history_pages_newest_first(self):
+        paid = []
+        for i in range(3):
+            self.pay(f"history-{i}")
+            paid.append(self.order.pk)
+            self.order = Order.objects.create(customer=self.user.customer)
+            OrderItem.objects.create(order=self.order, product=self.product, quantity=1)
+
+        with mock.patch("app.views.ORDER_HISTORY_PAGE_SIZE", 2):
+            with CaptureQueriesContext(connection) as ctx:
+                first = self.client.get(reverse("profile"))
+            second = self.client.get(reverse("profile"), {"after": first.context["orders"].next_cursor})
+
+        self.assertFalse([q for q in ctx.captured_queries if "app_product" in q["sql"]])
+        self.assertEqual([o.pk for o in first.context["orders"]], paid[:0:-1])
+        self.assertEqual([o.pk for o in second.context["orders"]], paid[:1])
+        self.assertFalse(second.context["orders"].has_next)
+        self.assertContains(first, "Sofa")
+
+
+# admin action chạy theo số order đã chọn -> không bị tính vào budget của changelist
+@override_settings(QUERY_BUDGET_MODE="raise")
+class AdminMarkCompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser("complete_staff", "s@example.com", "x")
+        cls.user = harness.create_customer("admin_complete")
+        cls.sofa = Product.objects.create(name="Sofa", code="SF1", price=300000)
+        cls.lamp = Product.objects.create(name="Lamp", code="LP1", price=50000)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+        self.order = Order.objects.create(customer=self.user.customer)
+        OrderItem.objects.create(order=self.order, product=self.sofa, quantity=2)
+        OrderItem.objects.create(order=self.order, product=self.lamp, quantity=1)
+
+    def mark(self, action, order):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("admin:app_order_changelist"), {"action": action, "_selected_action": [order.pk]}
+            )
+        order.refresh_from_db()
+
+    def test_snapshots_like_checkout(self):
+        completed = []
+        receiver = lambda sender, order, **kwargs: completed.append(order.pk)  # noqa: E731
+        checkout.order_completed.connect(receiver)
+        self.addCleanup(checkout.order_completed.disconnect, receiver)
+
+        self.mark("mark_complete", self.order)
+        self.assertTrue(self.order.complete)
+        self.assertIsNotNone(self.order.completed_at)
+        self.assertEqual(self.order.total, 650000)
+        self.assertEqual(
+            [(line["name"], line["price"], line["qty"]) for line in self.order.lines],
+            [("Sofa", 300000, 2), ("Lamp", 50000, 1)],
+        )
+        self.assertEqual(
+            sorted(self.order.orderitem_set.values_list("unit_price", flat=True)), [50000, 300000]
+        )
+        self.assertEqual(completed, [self.order.pk])
+
+        # giá đổi sau khi đóng: rollup và tổng order vẫn theo snapshot
+        self.sofa.price = 999999
+        self.sofa.save()
+        rollups.refresh()
+        self.assertEqual(DailySales.objects.get().revenue, 650000)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, 650000)
+
+    def test_reopened_order_keeps_discount(self):
+        self.mark("mark_complete", self.order)
+        Order.objects.filter(pk=self.order.pk).update(discount_code="SAVE10", discount_amount=65000)
+
+        self.mark("mark_incomplete", self.order)
+        self.assertFalse(self.order.complete)
+        self.mark("mark_complete", self.order)
+        self.assertEqual((self.order.discount_code, self.order.discount_amount), ("SAVE10", 65000))
+        self.assertEqual(self.order.total, 650000 - 65000)
+
+
+# -----------------------------
+# Rollup doanh thu (app/rollups.py)
+# -----------------------------
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = harness.create_customer("rollup").customer
+        cls.sofa = Product.objects.create(name="Sofa", code="SF1", price=300000)
+        cls.lamp = Product.objects.create(name="Lamp", code="LP1", price=50000)
+
+    def complete(self, when, lines, discount=0):
+        order = Order.objects.create(customer=None)
+        for product, quantity in lines:
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.price)
+        order.refresh_from_db()
+        Order.objects.filter(pk=order.pk).update(
+            complete=True, completed_at=when, discount_amount=discount, total=order.subtotal - discount
+        )
+        return order
+
+    def test_incremental_refresh(self):
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+        self.complete(yesterday, [(self.sofa, 1)])
+        # giỏ hàng tạo hôm trước, thanh toán hôm nay -> tính vào hôm nay
+        opened_earlier = self.complete(now, [(self.sofa, 2), (self.lamp, 1)], discount=10000)
+        Order.objects.filter(pk=opened_earlier.pk).update(date_order=now - timedelta(days=3))
+
+        self.assertEqual(rollups.refresh()["days"], 2)
+        today = DailySales.objects.get(day=timezone.localdate(now))
+        self.assertEqual((today.orders, today.items, today.revenue), (1, 3, 640000))
+        self.assertEqual(DailyProductSales.objects.get(day=today.day, product=self.sofa).quantity, 2)
+
+        self.complete(now, [(self.lamp, 4)])
+        rollups.refresh()
+        rollups.refresh()  # chạy lại không nhân đôi
+        today = DailySales.objects.get(day=today.day)
+        self.assertEqual((today.orders, today.revenue), (2, 840000))
+        self.assertEqual(DailySales.objects.get(day=timezone.localdate(yesterday)).revenue, 300000)
+        self.assertEqual(DailyProductSales.objects.get(day=today.day, product=self.lamp).quantity, 5)
+
+    def test_dashboard_reads_rollups_only(self):
+        now = timezone.now()
+        for _ in range(5):
+            self.complete(now, [(self.sofa, 1), (self.lamp, 2)])
+        rollups.refresh()
+        self.client.force_login(User.objects.create_superuser("rollup_staff", "s@example.com", "x"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("admin:app_dailysales_changelist"), {"days": 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if '"app_order' in q["sql"]])
+        self.assertEqual(response.context["revenue"], "2,000,000")
+        self.assertEqual([row["name"] for row in response.context["top_products"]], ["Sofa", "Lamp"])
+
+
+# -----------------------------
+# Export order CSV (app/order_export.py)
+# -----------------------------
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = harness.create_customer("export").customer
+        cls.sofa = Product.objects.create(name="Sofa", code="SF1", price=300000)
+        cls.lamp = Product.objects.create(name="Đèn", code="LP1", price=50000)
+        cls.orders = []
+        for i in range(6):
+            order = Order.objects.create(customer=None if i % 2 else cls.customer, complete=i < 4)
+            OrderItem.objects.create(order=order, product=cls.sofa, quantity=1)
+            OrderItem.objects.create(order=order, product=cls.lamp, quantity=2)
+            ShippingAddress.objects.create(order=order, address="Old", city="HN")
+            ShippingAddress.objects.create(order=order, address=f"{i} Street", city="HN")
+            cls.orders.append(order)
+
+    def parse(self, text):
+        return list(csv.DictReader(StringIO(text.lstrip("\ufeff"))))
+
+    def test_query_count_follows_chunks(self):
+        with CaptureQueriesContext(connection) as ctx:
+            rows = list(order_export.order_rows(Order.objects.all(), chunk_size=2))
+        # 1 SELECT order + (dòng hàng + địa chỉ) cho mỗi chunk 2 order
+        self.assertEqual(len(ctx.captured_queries), 1 + 2 * 3)
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]["address"], "0 Street")
+        self.assertEqual((rows[1]["product_name"], rows[1]["line_total"]), ("Đèn", 100000))
+
+    def test_admin_action_streams_filtered_changelist(self):
+        self.client.force_login(User.objects.create_superuser("export_staff", "s@example.com", "x"))
+        response = self.client.post(
+            reverse("admin:app_order_changelist") + "?complete__exact=1",
+            {"action": "export_orders_csv", "select_across": "1", "index": "0", "_selected_action": [self.orders[0].pk]},
+        )
+        self.assertTrue(response.streaming)
+        rows = self.parse(b"".join(response.streaming_content).decode("utf-8"))
+        self.assertEqual(sorted({int(row["order_id"]) for row in rows}), [o.pk for o in self.orders[:4]])
+        self.assertEqual(rows[0]["email"], "export@example.com")
+
+    def test_command_filters(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "orders.csv")
+            call_command("export_orders", path, "--status", "open", stdout=StringIO())
+            with open(path, encoding="utf-8-sig") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual({int(row["order_id"]) for row in rows}, {o.pk for o in self.orders[4:]})
+        self.assertEqual(len(rows[0]), len(order_export.COLUMNS))
+
+
+# -----------------------------
+# Thumbnail (app/thumbnails.py)
+# -----------------------------
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp(prefix="media-")
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=media, THUMBNAIL_ROOT=os.path.join(media, "thumbs"), THUMBNAIL_URL="/images/thumbs/"
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        caches["catalog"].clear()
+
+        os.makedirs(os.path.join(media, "products"))
+        Image.new("RGB", (300, 200), (200, 80, 40)).save(os.path.join(media, "products", "sofa.png"))
+        self.product = Product.objects.create(name="Sofa", code="SF1", price=1000, image="products/sofa.png")
+
+    def updates(self, path):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+
+    def test_save_generates_thumbnails(self):
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image_hash)
+        self.assertTrue(self.product.SmallImageURL.startswith("/images/thumbs/"))
+
+    def test_render_without_hash_does_not_write(self):
+        # dòng cũ chưa backfill: render dùng ảnh gốc, không hash file / UPDATE trong GET
+        Product.objects.filter(pk=self.product.pk).update(image_hash="")
+        path = reverse("product_detail", args=[self.product.pk])
+        first, first_updates = self.updates(path)
+        second, second_updates = self.updates(path)
+
+        self.assertEqual(first_updates, [])
+        self.assertEqual(second_updates, [])
+        self.assertContains(second, "/images/products/sofa.png")
+        self.assertEqual(Product.objects.get(pk=self.product.pk).image_hash, "")
+
+
+# -----------------------------
+# System check (app/checks.py)
+# -----------------------------
+class SystemCheckTests(SimpleTestCase):
+    LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    SHARED = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tempfile.gettempdir()}
+
+    def ids(self, check):
+        return [message.id for message in check(None)]
+
+    def test_cached_db_sessions_need_shared_cache(self):
+        engine = "django.contrib.sessions.backends.cached_db"
+        with override_settings(SESSION_ENGINE=engine, CACHES={**settings.CACHES, "default": self.LOCMEM}):
+            self.assertEqual(self.ids(checks.check_session_cache), ["app.E001"])
+        with override_settings(SESSION_ENGINE=engine, CACHES={**settings.CACHES, "default": self.SHARED}):
+            self.assertEqual(self.ids(checks.check_session_cache), [])
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db"):
+            self.assertEqual(self.ids(checks.check_session_cache), [])
+
+    def test_locmem_catalog_cache_warns(self):
+        with override_settings(CACHES={**settings.CACHES, "catalog": self.LOCMEM}):
+            self.assertEqual(self.ids(checks.check_catalog_cache), ["app.W001"])
+        with override_settings(CACHES={**settings.CACHES, "catalog": self.SHARED}):
+            self.assertEqual(self.ids(checks.check_catalog_cache), [])
+
+
+# -----------------------------
+# Catalog cache (app/catalog_cache.py): xoá khi Product / Article đổi
+# -----------------------------
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        caches["catalog"].clear()
+        self.product = Product.objects.create(name="Sofa", code="SF1", price=1000)
+
+    def test_product_save_and_delete_invalidate(self):
+        version = catalog_cache.catalog_version()
+        self.assertEqual(catalog_cache.get_product(self.product.pk).name, "Sofa")
+        self.assertEqual([p.name for p in catalog_cache.get_product_page()], ["Sofa"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Sofa 2"
+            self.product.save()
+        self.assertEqual(catalog_cache.get_product(self.product.pk).name, "Sofa 2")
+        self.assertEqual([p.name for p in catalog_cache.get_product_page()], ["Sofa 2"])
+        self.assertNotEqual(catalog_cache.catalog_version(), version)
+
+        pk = self.product.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertIsNone(catalog_cache.get_product(pk))
+        self.assertEqual(list(catalog_cache.get_product_page()), [])
+
+    def test_article_save_and_delete_invalidate(self):
+        self.assertEqual(list(catalog_cache.get_article_page()), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(name="Tips", date_up="01/01/2026", content="...")
+        self.assertEqual([a.name for a in catalog_cache.get_article_page()], ["Tips"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertEqual(list(catalog_cache.get_article_page()), [])
+
+    def test_product_detail_key_follows_version(self):
+        # detail đọc từ replica cũ không được sống qua lần tăng version (snapshot_replica)
+        self.assertEqual(catalog_cache.get_product(self.product.pk).name, "Sofa")
+        Product.objects.filter(pk=self.product.pk).update(name="Sofa 2")  # không qua signal
+        self.assertEqual(catalog_cache.get_product(self.product.pk).name, "Sofa")
+
+        catalog_cache.bump_version()
+        self.assertEqual(catalog_cache.get_product(self.product.pk).name, "Sofa 2")
+
+
+
+class CatalogFragmentTagTests(TestCase):
+    TEMPLATE = Template(
+        "{% load catalog_tags %}"
+        "{% catalogfragment grid after limit %}"
+        "{% for p in products %}{{ p.name }},{% endfor %}"
+        "{% endcatalogfragment %}"
+    )
+
+    def setUp(self):
+        caches["catalog"].clear()
+        for i in range(3):
+            Product.objects.create(name=f"P{i}", code=f"F{i}", price=100)
+
+    def render(self, after=0, limit=2):
+        # QuerySet lười: chỉ chạy query khi fragment thật sự render (miss)
+        products = Product.objects.filter(pk__gt=after).order_by("pk")[:limit]
+        return self.TEMPLATE.render(Context({"products": products, "after": after, "limit": limit}))
+
+    def test_miss_then_hit(self):
+        with self.assertNumQueries(1):
+            first = self.render()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(), first)
+        self.assertEqual(first, "P0,P1,")
+
+    def test_bump_version_renders_again(self):
+        self.render()
+        Product.objects.filter(name="P0").update(name="P0 new")
+        self.assertEqual(self.render(), "P0,P1,")
+
+        catalog_cache.bump_version()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.render(), "P0 new,P1,")
+
+    def test_vary_on_keys_do_not_collide(self):
+        first = Product.objects.order_by("pk").first()
+        self.assertEqual(self.render(after=0, limit=2), "P0,P1,")
+        self.assertEqual(self.render(after=first.pk, limit=2), "P1,P2,")
+        self.assertEqual(self.render(after=0, limit=1), "P0,")
+        # giá trị có dấu ":" không được ghép thành cùng key
+        self.assertEqual(catalog_cache.get_fragment("grid", ["1:2", "3"], lambda: "a"), "a")
+        self.assertEqual(catalog_cache.get_fragment("grid", ["1", "2:3"], lambda: "b"), "b")
+
+    def test_requires_fragment_name(self):
+        with self.assertRaises(TemplateSyntaxError):
+            Template("{% load catalog_tags %}{% catalogfragment %}{% endcatalogfragment %}")
+
+# -----------------------------
+# Read replica (app/routers.py, ReplicaRoutingMiddleware, snapshot_replica)
+# -----------------------------
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(routers, "replica_enabled", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_db(self, model=Product):
+        return self.router.db_for_read(model)
+
+    def run_request(self, method="get", session=None, write=False):
+        """1 request qua middleware; trả về db mà view đọc Product."""
+        seen = {}
+
+        def view(request):
+            seen["db"] = self.read_db()
+            if write:
+                self.router.db_for_write(Product)
+            return None
+
+        request = getattr(self.factory, method)("/")
+        request.session = {} if session is None else session
+        ReplicaRoutingMiddleware(view)(request)
+        return seen["db"]
+
+    def test_catalog_reads_go_to_replica(self):
+        self.assertEqual(self.read_db(Product), routers.REPLICA_ALIAS)
+        self.assertEqual(self.read_db(Article), routers.REPLICA_ALIAS)
+        # order / customer luôn đọc primary
+        self.assertEqual(self.read_db(Order), "default")
+
+    def test_reads_in_atomic_block_use_primary(self):
+        with mock.patch.object(connection, "in_atomic_block", True):
+            self.assertEqual(self.read_db(), "default")
+
+    def test_write_methods_read_primary(self):
+        self.assertEqual(self.run_request("post"), "default")
+        self.assertEqual(self.run_request("get"), routers.REPLICA_ALIAS)
+
+    def test_sticky_after_catalog_write(self):
+        session = {}
+        self.run_request("post", session, write=True)
+        self.assertIn(PRIMARY_UNTIL_KEY, session)
+        # GET tiếp theo của cùng session vẫn đọc primary
+        self.assertEqual(self.run_request("get", session), "default")
+        # session khác không bị ảnh hưởng
+        self.assertEqual(self.run_request("get", {}), routers.REPLICA_ALIAS)
+
+    def test_sticky_window_expires(self):
+        session = {}
+        self.run_request("post", session, write=True)
+        later = time.time() + settings.REPLICA_STICKY_SECONDS + 1
+        with mock.patch("app.middleware.time.time", return_value=later):
+            self.assertEqual(self.run_request("get", session), routers.REPLICA_ALIAS)
+
+    def test_request_without_catalog_write_leaves_session(self):
+        session = {}
+        self.run_request("post", session)
+        self.assertEqual(session, {})
+
+    def test_state_reset_after_request(self):
+        before = routers.catalog_written()
+        self.run_request("post", {}, write=True)
+        self.assertEqual(routers.catalog_written(), before)
+        self.assertEqual(self.read_db(), routers.REPLICA_ALIAS)
+
+
+class SnapshotReplicaTests(TestCase):
+    def setUp(self):
+        caches["catalog"].clear()
+        tmpdir = tempfile.mkdtemp(prefix="replica-")
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        self.primary = os.path.join(tmpdir, "primary.sqlite3")
+        self.replica = os.path.join(tmpdir, "replica.sqlite3")
+        with sqlite3.connect(self.primary) as db:
+            db.execute("CREATE TABLE t (x INTEGER)")
+            db.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+        db.close()
+
+    def configure(self, replica=True):
+        databases = {"default": {**settings.DATABASES["default"], "NAME": self.primary}}
+        if replica:
+            databases[routers.REPLICA_ALIAS] = {"NAME": self.replica}
+        return mock.patch.dict(settings.DATABASES, databases, clear=True)
+
+    def test_snapshot_copies_primary_and_bumps_version(self):
+        product = Product.objects.create(name="Sofa", code="SF1", price=1000)
+        self.assertEqual(catalog_cache.get_product(product.pk).name, "Sofa")
+        Product.objects.filter(pk=product.pk).update(name="Sofa 2")
+        version = catalog_cache.catalog_version()
+
+        with self.configure():
+            call_command("snapshot_replica", stdout=StringIO())
+
+        db = sqlite3.connect(self.replica)
+        try:
+            self.assertEqual(db.execute("SELECT COUNT(*) FROM t").fetchone()[0], 2)
+        finally:
+            db.close()
+        self.assertGreater(catalog_cache.catalog_version(), version)
+        # detail đã cache trước snapshot bị bỏ qua
+        self.assertEqual(catalog_cache.get_product(product.pk).name, "Sofa 2")
+
+    def test_requires_separate_replica(self):
+        with self.configure(replica=False), self.assertRaises(CommandError):
+            call_command("snapshot_replica", stdout=StringIO())
+        self.replica = self.primary
+        with self.configure(), self.assertRaises(CommandError):
+            call_command("snapshot_replica", stdout=StringIO())
+
+# -----------------------------
+# Outbox email (app/mail.py, send_queued_mail)
+# -----------------------------
+class FailingEmailBackend(locmem.EmailBackend):
+    def send_messages(self, messages):
+        raise smtplib.SMTPException("connection dropped")
+
+
+class StopLoop(Exception):
+    pass
+
+
+class MailOutboxTests(TestCase):
+    def enqueue(self, subject="Hello"):
+        return mail.enqueue_mail(subject, "Body", ["a@example.com", "", "b@example.com"], "shop@example.com")
+
+    def test_enqueue_follows_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.enqueue("Rolled back")
+                raise RuntimeError()
+        self.assertFalse(OutboundEmail.objects.filter(subject="Rolled back").exists())
+
+        email = self.enqueue()
+        self.assertEqual(email.recipients, ["a@example.com", "b@example.com"])
+        self.assertIsNone(mail.enqueue_mail("Nobody", "Body", [""]))
+        self.assertEqual(len(django_mail.outbox), 0)  # request không gọi SMTP
+
+    def test_send_batch(self):
+        emails = [self.enqueue(f"Mail {i}") for i in range(3)]
+        self.assertEqual(mail.process_outbox(batch_size=2), (2, 0))
+        self.assertEqual(mail.process_outbox(batch_size=2), (1, 0))
+        self.assertEqual([m.subject for m in django_mail.outbox], ["Mail 0", "Mail 1", "Mail 2"])
+        for email in emails:
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.SENT, 1))
+            self.assertIsNotNone(email.sent_at)
+
+    @override_settings(MAIL_OUTBOX_MAX_ATTEMPTS=3, MAIL_OUTBOX_BACKOFF_SECONDS=60)
+    def test_retry_backoff_then_dead_letter(self):
+        email = self.enqueue()
+        failing = FailingEmailBackend()
+        with self.assertLogs("app.mail", "WARNING") as logs:
+            for attempt, backoff in enumerate([timedelta(seconds=60), timedelta(seconds=120)], 1):
+                before = timezone.now()
+                self.assertEqual(mail.process_outbox(connection=failing), (0, 1))
+                email.refresh_from_db()
+                self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, attempt))
+                self.assertGreaterEqual(email.next_attempt_at, before + backoff)
+                self.assertIn("connection dropped", email.last_error)
+                # chưa đến hạn -> không lấy lại
+                self.assertEqual(mail.process_outbox(connection=failing), (0, 0))
+                OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(mail.process_outbox(connection=failing), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.DEAD, 3))
+        self.assertIn("dead-lettered", logs.output[-1])
+        self.assertEqual(mail.process_outbox(), (0, 0))
+
+    def test_requeue_stale(self):
+        stale, fresh = self.enqueue("Stale"), self.enqueue("Fresh")
+        OutboundEmail.objects.filter(pk=stale.pk).update(
+            status=OutboundEmail.SENDING, next_attempt_at=timezone.now() - timedelta(minutes=30)
+        )
+        OutboundEmail.objects.filter(pk=fresh.pk).update(status=OutboundEmail.SENDING, next_attempt_at=timezone.now())
+        self.assertEqual(mail.requeue_stale(), 1)
+        self.assertEqual(OutboundEmail.objects.get(pk=stale.pk).status, OutboundEmail.PENDING)
+        self.assertEqual(OutboundEmail.objects.get(pk=fresh.pk).status, OutboundEmail.SENDING)
+
+    def test_loop_requeues_every_iteration(self):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise StopLoop()
+
+        with mock.patch("app.mail.requeue_stale", return_value=0) as requeue, mock.patch("time.sleep", sleep):
+            with self.assertRaises(StopLoop):
+                call_command("send_queued_mail", "--loop", stdout=StringIO())
+        self.assertEqual(requeue.call_count, len(sleeps))
+
+
+# -----------------------------
+# Full-text search (app/search.py, FTS5)
+# -----------------------------
+class SearchTests(TestCase):
+    def ids(self, page):
+        return [obj.pk for obj in page.items]
+
+    def test_title_match_ranks_above_body_match(self):
+        body = Article.objects.create(name="Mẹo trang trí", content="Chọn sofa hợp phòng khách")
+        title = Article.objects.create(name="Sofa da cho phòng khách", content="Bài viết về nội thất")
+        self.assertEqual(self.ids(search.search_articles("sofa")), [title.pk, body.pk])
+
+    def test_name_and_code_prefix_without_diacritics(self):
+        chair = Product.objects.create(name="Ghế gỗ sồi", code="GHE-01", price=100)
+        Product.objects.create(name="Bàn trà", code="BAN-01", price=100)
+        self.assertEqual(self.ids(search.search_products("ghe go")), [chair.pk])
+        self.assertEqual(self.ids(search.search_products("ghe-0")), [chair.pk])
+        self.assertEqual(self.ids(search.search_products("!!!")), [])
+
+    def test_signals_keep_index_in_sync(self):
+        product = Product.objects.create(name="Tủ quần áo", price=100)
+        self.assertEqual(self.ids(search.search_products("tu")), [product.pk])
+
+        product.name = "Kệ sách"
+        product.save()
+        self.assertEqual(self.ids(search.search_products("tu")), [])
+        self.assertEqual(self.ids(search.search_products("ke sach")), [product.pk])
+
+        product.delete()
+        self.assertEqual(self.ids(search.search_products("ke")), [])
+
+    def test_rebuild_command_restores_index(self):
+        product = Product.objects.create(name="Giường ngủ", price=100)
+        article = Article.objects.create(name="Chọn giường cho phòng ngủ", content="")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.TABLE}")
+        self.assertEqual(self.ids(search.search_products("giuong")), [])
+
+        out = StringIO()
+        call_command("rebuild_search_index", "--batch-size", "1", stdout=out)
+        self.assertIn("Indexed 2 rows", out.getvalue())
+        self.assertEqual(self.ids(search.search_products("giuong")), [product.pk])
+        self.assertEqual(self.ids(search.search_articles("giuong")), [article.pk])
+
+    def test_paginates_by_offset(self):
+        products = [Product.objects.create(name=f"Sofa {i}", price=100) for i in range(3)]
+        first = search.search_products("sofa", limit=2)
+        second = search.search_products("sofa", first.next_cursor, limit=2)
+        self.assertEqual(first.next_cursor, 2)
+        self.assertIsNone(second.next_cursor)
+        self.assertCountEqual(self.ids(first) + self.ids(second), [p.pk for p in products])
+
+    def test_articles_api_searches(self):
+        article = Article.objects.create(name="Bố trí phòng ngủ", content="")
+        Article.objects.create(name="Bàn làm việc", content="")
+        response = self.client.get(reverse("articles_api"), {"q": "phong ngu"})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [article.pk])
+
+    def test_unavailable_without_fts5(self):
+        # SQLite build không có FTS5 -> views dùng lại icontains
+        article = Article.objects.create(name="Bố trí phòng ngủ", content="")
+        with mock.patch.object(search, "_fts5_compiled", return_value=False):
+            self.assertFalse(search.is_available())
+            response = self.client.get(reverse("articles_api"), {"q": "phòng"})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [article.pk])
+
+
+# -----------------------------
+# Autocomplete (app/autocomplete.py)
+# -----------------------------
+@override_settings(AUTOCOMPLETE_BACKGROUND_REBUILD=False, AUTOCOMPLETE_CHECK_INTERVAL=0)
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chair = Product.objects.create(name="Ghế sofa gỗ", code="SF-01", price=100)
+        cls.sofa = Product.objects.create(name="Sofa đơn", code="SF-02", price=100)
+        cls.lamp = Product.objects.create(name="Đèn bàn", code="DB-01", price=100)
+
+    def names(self, index, prefix):
+        return [row["name"] for row in index.suggest(prefix)]
+
+    def test_prefix_match_ignores_diacritics_and_case(self):
+        index = autocomplete.PrefixIndex()
+        self.assertEqual(self.names(index, "ghe"), ["Ghế sofa gỗ"])
+        self.assertEqual(self.names(index, "GHẾ SO"), ["Ghế sofa gỗ"])
+        self.assertEqual(self.names(index, "den"), ["Đèn bàn"])
+        self.assertEqual(self.names(index, "sf-0"), ["Ghế sofa gỗ", "Sofa đơn"])
+        self.assertEqual(self.names(index, "xyz"), [])
+
+    def test_leading_match_ranks_before_inner_word(self):
+        index = autocomplete.PrefixIndex()
+        self.assertEqual(self.names(index, "sofa"), ["Sofa đơn", "Ghế sofa gỗ"])
+
+    def test_built_index_answers_without_queries(self):
+        index = autocomplete.PrefixIndex()
+        index.rebuild()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(index, "tu"), [])
+            self.assertEqual(self.names(index, "đèn b"), ["Đèn bàn"])
+
+    def stale_index(self):
+        """Index đã build, để quá AUTOCOMPLETE_CHECK_INTERVAL -> lần suggest sau xem lại cache."""
+        index = autocomplete.PrefixIndex()
+        index.rebuild()
+        index._checked_at = None
+        return index
+
+    def test_changes_from_other_process_apply_without_rebuild(self):
+        index = autocomplete.PrefixIndex()
+        index.rebuild()
+        # process khác lưu / xoá product: process này chỉ thấy change log trong cache
+        with mock.patch.object(autocomplete, "index", autocomplete.PrefixIndex()):
+            autocomplete.product_changed(Product(pk=999, name="Ghế đẩu", code="GD-01"))
+            autocomplete.product_removed(self.lamp.pk)
+            Product.objects.filter(pk=self.sofa.pk).update(name="Sofa góc")
+            autocomplete.product_changed(Product(pk=self.sofa.pk, name="Sofa góc", code="SF-02"))
+        catalog_cache.bump_version()  # catalog version đổi không làm build lại
+
+        index._checked_at = None
+        with mock.patch.object(index, "rebuild") as rebuild, self.assertNumQueries(0):
+            self.assertEqual(self.names(index, "ghe dau"), ["Ghế đẩu"])
+            self.assertEqual(self.names(index, "den"), [])
+            self.assertEqual(self.names(index, "sofa"), ["Sofa góc", "Ghế sofa gỗ"])
+        rebuild.assert_not_called()
+
+    def test_missing_change_log_rebuilds(self):
+        index = self.stale_index()
+        autocomplete.product_changed(Product(pk=999, name="Ghế đẩu", code="GD-01"))
+        caches["catalog"].delete(autocomplete.CHANGE_KEY.format(seq=index._seq + 1))
+        with override_settings(AUTOCOMPLETE_BACKGROUND_REBUILD=False), \
+                mock.patch.object(index, "rebuild") as rebuild:
+            index.suggest("ghe")
+        rebuild.assert_called_once_with()
+
+    @override_settings(AUTOCOMPLETE_BACKGROUND_REBUILD=True)
+    def test_stale_index_keeps_serving_while_rebuilding(self):
+        index = self.stale_index()
+        # ghi hàng loạt không qua signal (import catalog) -> generation đổi
+        Product.objects.bulk_create([Product(name="Ghế đẩu", price=100)])
+        autocomplete.invalidate()
+
+        with mock.patch.object(index, "_start_rebuild") as start:
+            self.assertEqual(self.names(index, "ghe"), ["Ghế sofa gỗ"])
+        start.assert_called_once_with()
+
+        index.rebuild()
+        self.assertCountEqual(self.names(index, "ghe"), ["Ghế sofa gỗ", "Ghế đẩu"])
+
+    @override_settings(AUTOCOMPLETE_BACKGROUND_REBUILD=True)
+    def test_cold_index_answers_from_full_text_search(self):
+        index = autocomplete.PrefixIndex()
+        with mock.patch.object(index, "_start_rebuild") as start:
+            self.assertEqual(self.names(index, "ghe"), ["Ghế sofa gỗ"])
+        start.assert_called_once_with()
+        self.assertFalse(index.is_built)
+
+    def test_signals_update_built_index(self):
+        index = autocomplete.index
+        index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            stool = Product.objects.create(name="Ghế đẩu", price=100)
+        self.assertIn("Ghế đẩu", self.names(index, "ghe dau"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stool.delete()
+        self.assertEqual(self.names(index, "ghe dau"), [])
+
+
+# -----------------------------
+# Giỏ hàng: OrderItem.adjust_quantity / unique (order, product)
+# -----------------------------
+class AdjustQuantityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.order = Order.objects.create()
+        cls.chair, cls.table, cls.lamp = (
+            Product.objects.create(name=name, price=100) for name in ("Ghế", "Bàn", "Đèn")
+        )
+
+    def quantities(self):
+        return dict(self.order.orderitem_set.values_list("product__name", "quantity"))
+
+    def test_increment_and_decrement_keep_one_row(self):
+        OrderItem.objects.adjust_quantity(self.order, self.chair, 1)
+        OrderItem.objects.adjust_quantity(self.order, self.chair, 2)
+        OrderItem.objects.adjust_quantity(self.order, self.chair, -1)
+        self.assertEqual(self.quantities(), {"Ghế": 2})
+
+    def test_row_removed_at_zero(self):
+        OrderItem.objects.adjust_quantity(self.order, self.chair, 2)
+        OrderItem.objects.adjust_quantity(self.order, self.chair, -1)
+        OrderItem.objects.adjust_quantity(self.order, self.chair, -1)
+        self.assertEqual(self.quantities(), {})
+
+        OrderItem.objects.adjust_quantity(self.order, self.table, 1)
+        OrderItem.objects.adjust_quantity(self.order, self.table, -5)
+        self.assertEqual(self.quantities(), {})
+
+    def test_decrement_missing_row_creates_nothing(self):
+        OrderItem.objects.adjust_quantity(self.order, self.chair, -1)
+        self.assertEqual(self.quantities(), {})
+
+    def race_after_first_update(self, product):
+        """
+        Patch UPDATE: lần đầu chạy thật rồi giả lập request song song INSERT (order, product)
+        ngay sau đó, tức là giữa UPDATE và INSERT của request đang test.
+        """
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            count = update(queryset, **kwargs)
+            if not calls:
+                calls.append(product)
+                OrderItem.objects.bulk_create([OrderItem(order=self.order, product=product, quantity=1)])
+            return count
+
+        return mock.patch.object(OrderItemQuerySet, "update", autospec=True, side_effect=racing_update)
+
+    def test_concurrent_insert_falls_back_to_update(self):
+        with self.race_after_first_update(self.chair):
+            OrderItem.objects.adjust_quantity(self.order, self.chair, 1)
+        self.assertEqual(self.quantities(), {"Ghế": 2})
+
+    def test_concurrent_batch_insert_falls_back_per_row(self):
+        OrderItem.objects.create(order=self.order, product=self.chair, quantity=3)
+        with self.race_after_first_update(self.table):
+            OrderItem.objects.adjust_quantities(
+                self.order, {self.chair.pk: -3, self.table.pk: 2, self.lamp.pk: 1}
+            )
+        self.assertEqual(self.quantities(), {"Bàn": 3, "Đèn": 1})
+
+    def test_batch_adjust(self):
+        OrderItem.objects.create(order=self.order, product=self.chair, quantity=1)
+        OrderItem.objects.create(order=self.order, product=self.table, quantity=4)
+        OrderItem.objects.adjust_quantities(
+            self.order, {self.chair.pk: -1, self.table.pk: 2, self.lamp.pk: 3, self.chair.pk + 1000: -1}
+        )
+        self.assertEqual(self.quantities(), {"Bàn": 6, "Đèn": 3})
+
+    def test_unique_order_product(self):
+        OrderItem.objects.create(order=self.order, product=self.chair, quantity=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OrderItem.objects.create(order=self.order, product=self.chair, quantity=1)
+
+
+class MergeDuplicateOrderItemsMigrationTests(TransactionTestCase):
+    before = [("app", "0003_order_totals")]
+    after = [("app", "0004_orderitem_unique_order_product")]
+
+    def tearDown(self):
+        # trả DB test về migration mới nhất cho các test sau
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_merged_before_constraint(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old_apps = executor.loader.project_state(self.before).apps
+        OldOrder = old_apps.get_model("app", "Order")
+        OldProduct = old_apps.get_model("app", "Product")
+        OldOrderItem = old_apps.get_model("app", "OrderItem")
+
+        order = OldOrder.objects.create()
+        chair = OldProduct.objects.create(name="Ghế", price=100)
+        table = OldProduct.objects.create(name="Bàn", price=100)
+        first = OldOrderItem.objects.create(order=order, product=chair, quantity=1)
+        OldOrderItem.objects.create(order=order, product=chair, quantity=2)
+        OldOrderItem.objects.create(order=order, product=chair, quantity=None)
+        OldOrderItem.objects.create(order=order, product=table, quantity=5)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        NewOrderItem = executor.loader.project_state(self.after).apps.get_model("app", "OrderItem")
+
+        rows = NewOrderItem.objects.filter(order_id=order.pk).order_by("id")
+        self.assertEqual(
+            [(row.pk, row.product_id, row.quantity) for row in rows],
+            [(first.pk, chair.pk, 3), (rows[1].pk, table.pk, 5)],
+        )
+
+
+# -----------------------------
+# Batch update giỏ hàng (updateItems, /update_items/)
+# -----------------------------
+class UpdateItemsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = harness.create_customer("batch")
+        cls.products = [Product.objects.create(name=f"Ghế {i}", price=100 * (i + 1)) for i in range(12)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        payload = body if isinstance(body, str) else json.dumps(body)
+        return self.client.post(reverse("update_items"), payload, content_type="application/json")
+
+    def cart(self):
+        order = Order.objects.get(customer=self.user.customer, complete=False)
+        return dict(order.orderitem_set.values_list("product_id", "quantity"))
+
+    def test_response_has_new_cart_totals(self):
+        first, second = self.products[:2]
+        response = self.post({"items": [
+            {"productId": first.pk, "delta": 2},
+            {"productId": second.pk, "delta": 1},
+            {"productId": first.pk, "delta": 1},  # cùng product -> cộng dồn
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ok": True, "cartItems": 4, "total": 3 * 100 + 200})
+        self.assertEqual(self.cart(), {first.pk: 3, second.pk: 1})
+
+        response = self.post({"items": [{"productId": first.pk, "delta": -3}]})
+        self.assertEqual(response.json(), {"ok": True, "cartItems": 1, "total": 200})
+        self.assertEqual(self.cart(), {second.pk: 1})
+
+    def test_invalid_batches_rejected(self):
+        product = self.products[0]
+        cases = [
+            ("not json", 400, "Invalid items."),
+            ({"items": []}, 400, "Invalid items."),
+            ({"items": "1"}, 400, "Invalid items."),
+            ([{"productId": product.pk, "delta": 1}], 400, "Invalid items."),
+            ({"items": [{"productId": product.pk, "delta": "two"}]}, 400, "Invalid items."),
+            ({"items": [{"productId": "abc", "delta": 1}]}, 400, "Invalid items."),
+            ({"items": [{"delta": 1}]}, 400, "Invalid items."),
+            ({"items": [{"productId": product.pk, "delta": 1}] * 51}, 400, "Invalid items."),
+            ({"items": [{"productId": product.pk, "delta": 100}]}, 400, "Invalid quantity."),
+            ({"items": [{"productId": product.pk, "delta": 1}, {"productId": 99999, "delta": 1}]},
+             404, "Product not found."),
+        ]
+        for body, status, error in cases:
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response.json(), {"ok": False, "error": error})
+        # lỗi ở bất kỳ item nào -> không ghi gì
+        self.assertFalse(OrderItem.objects.filter(order__customer=self.user.customer).exists())
+
+    def test_requires_customer_login(self):
+        self.client.logout()
+        response = self.post({"items": [{"productId": self.products[0].pk, "delta": 1}]})
+        self.assertEqual(response.status_code, 401)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def count(products):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.post({"items": [{"productId": p.pk, "delta": 1} for p in products]})
+            self.assertEqual(response.status_code, 200)
+            return len(ctx)
+
+        self.post({"items": [{"productId": self.products[0].pk, "delta": 1}]})  # tạo order trước
+        # cùng dạng batch: 1 product có sẵn + product mới, khác nhau số lượng
+        small = count([self.products[0], self.products[1]])
+        large = count([self.products[0], *self.products[2:]])
+        self.assertEqual(small, large)
+
+
+# -----------------------------
+# Tổng order đã denormalize (Order.item_count / subtotal, FurnitureSales/signals.py)
+# -----------------------------
+class OrderTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = harness.create_customer("totals")
+        cls.chair = Product.objects.create(name="Ghế", price=100)
+        cls.table = Product.objects.create(name="Bàn", price=250)
+
+    def setUp(self):
+        self.order = Order.objects.create(customer=self.user.customer)
+        OrderItem.objects.create(order=self.order, product=self.chair, quantity=2)
+        OrderItem.objects.create(order=self.order, product=self.table, quantity=1)
+
+    def totals(self, order):
+        order.refresh_from_db()
+        return order.item_count, order.subtotal
+
+    def test_item_signals_keep_totals(self):
+        self.assertEqual(self.totals(self.order), (3, 450))
+        version = self.order.version
+
+        item = self.order.orderitem_set.get(product=self.chair)
+        item.quantity = 5
+        item.save()
+        self.assertEqual(self.totals(self.order), (6, 750))
+        self.assertGreater(self.order.version, version)
+
+        item.delete()
+        self.assertEqual(self.totals(self.order), (1, 250))
+
+    def test_recalculate_totals_fixes_drift(self):
+        other = Order.objects.create()
+        Order.objects.filter(pk__in=[self.order.pk, other.pk]).update(item_count=99, subtotal=1)
+
+        self.assertEqual(Order.objects.filter(pk__in=[self.order.pk, other.pk]).recalculate_totals(), 2)
+        self.assertEqual(self.totals(self.order), (3, 450))
+        self.assertEqual(self.totals(other), (0, 0))
+
+        # snapshot unit_price được ưu tiên hơn giá hiện tại của product
+        OrderItem.objects.filter(order=self.order, product=self.chair).update(unit_price=80)
+        self.order.recalculate_totals()
+        self.assertEqual((self.order.item_count, self.order.subtotal), (3, 410))
+
+    def test_price_change_updates_open_carts_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = checkout.complete_order(
+                self.user.customer, ShippingAddress(address="1 Street", city="HN", state="HN", mobile="0900000000")
+            )
+        paid = result.order
+        cart = Order.objects.create(customer=self.user.customer)
+        OrderItem.objects.create(order=cart, product=self.chair, quantity=1)
+
+        self.chair.price = 150
+        self.chair.save()
+
+        self.assertEqual(self.totals(cart), (1, 150))
+        self.assertEqual(self.totals(paid), (3, 450))
+        self.assertEqual(paid.total, 450)
+
+        # xoá product: order đã thanh toán vẫn giữ tổng + tên theo snapshot
+        self.table.delete()
+        self.assertEqual(self.totals(paid), (3, 450))
+        self.assertEqual(paid.lines[1]["name"], "Bàn")
+
+    def test_check_and_rebuild_commands(self):
+        other = Order.objects.create()
+        OrderItem.objects.create(order=other, product=self.chair, quantity=1)
+        Order.objects.filter(pk=self.order.pk).update(item_count=7)
+        Order.objects.filter(pk=other.pk).update(subtotal=5)
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "2 order(s) drifted"):
+            call_command("check_order_totals", stdout=out)
+        self.assertIn(f"Order #{self.order.pk}: item_count=7 (actual 3)", out.getvalue())
+
+        out = StringIO()
+        call_command("rebuild_order_totals", "--only-drift", "--batch-size", "1", stdout=out)
+        self.assertIn("Done: 2 orders rebuilt.", out.getvalue())
+        self.assertEqual(self.totals(self.order), (3, 450))
+        self.assertEqual(self.totals(other), (1, 100))
+
+        out = StringIO()
+        call_command("check_order_totals", stdout=out)
+        self.assertIn("All order totals are consistent.", out.getvalue())
+
+
+# -----------------------------
+# Keyset pagination (app/pagination.py, lịch sử order ở profile)
+# -----------------------------
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = harness.create_customer("keyset")
+        # cùng 1 thời điểm: thứ tự chỉ còn dựa vào id
+        same_time = timezone.now()
+        cls.orders = [
+            Order.objects.create(customer=cls.user.customer, complete=True, completed_at=same_time)
+            for _ in range(25)
+        ]
+        Order.objects.filter(pk__in=[o.pk for o in cls.orders]).update(date_order=same_time)
+
+    def walk(self, queryset, size, descending=False):
+        ids, after = [], None
+        while True:
+            page = keyset_paginate(queryset, after, size, descending=descending)
+            ids.extend(obj.pk for obj in page)
+            if not page.has_next:
+                return ids
+            after = page.next_cursor
+
+    def test_equal_timestamps_page_without_gaps_or_duplicates(self):
+        all_ids = [o.pk for o in self.orders]
+        self.assertEqual(self.walk(Order.objects.all(), 10), all_ids)
+        self.assertEqual(self.walk(Order.objects.all(), 7, descending=True), all_ids[::-1])
+
+    def test_descending_pages(self):
+        first = keyset_paginate(Order.objects.all(), None, 10, descending=True)
+        self.assertTrue(first.is_first)
+        self.assertEqual([o.pk for o in first], [o.pk for o in self.orders[::-1][:10]])
+        self.assertEqual(first.next_cursor, self.orders[15].pk)
+
+        last = keyset_paginate(Order.objects.all(), self.orders[5].pk, 10, descending=True)
+        self.assertFalse(last.is_first)
+        self.assertFalse(last.has_next)
+        self.assertEqual([o.pk for o in last], [o.pk for o in self.orders[4::-1]])
+
+    def test_cursor_stable_when_rows_are_added(self):
+        first = keyset_paginate(Order.objects.all(), None, 10, descending=True)
+        Order.objects.create(customer=self.user.customer, complete=True)  # order mới lên đầu
+        second = keyset_paginate(Order.objects.all(), first.next_cursor, 10, descending=True)
+        self.assertEqual([o.pk for o in second], [o.pk for o in self.orders[14:4:-1]])
+
+    def test_malformed_cursor_means_first_page(self):
+        for value in (None, "", "abc", "1.5", "0", "-3", "1e3", "[]"):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_cursor(value))
+        self.assertEqual(parse_cursor(" 12 "), 12)
+        self.assertEqual(page_size("abc"), settings.CATALOG_PAGE_SIZE)
+        self.assertEqual(page_size("0"), 1)
+        self.assertEqual(page_size("1000"), settings.CATALOG_MAX_PAGE_SIZE)
+
+    def test_profile_history_pages(self):
+        self.client.force_login(self.user)
+        url = reverse("profile")
+
+        first = self.client.get(url).context["orders"]
+        self.assertEqual([o.pk for o in first], [o.pk for o in self.orders[:-11:-1]])
+        second = self.client.get(url, {"after": first.next_cursor}).context["orders"]
+        self.assertEqual([o.pk for o in second], [o.pk for o in self.orders[14:4:-1]])
+
+        broken = self.client.get(url, {"after": "not-a-cursor"})
+        self.assertEqual(broken.status_code, 200)
+        self.assertEqual([o.pk for o in broken.context["orders"]], [o.pk for o in first])
+
+
+# -----------------------------
+# Static build (app/assets.py, build_static, {% static_bundle %})
+# -----------------------------
+def render_bundle(name):
+    return Template('{% load asset_tags %}{% static_bundle name %}').render(Context({"name": name}))
+
+
+def bundle_settings(static_root):
+    return override_settings(
+        DEBUG=False,
+        STATIC_USE_BUNDLES=True,
+        STATIC_ROOT=static_root,
+        STORAGES={**settings.STORAGES, "staticfiles": {"BACKEND": "app.assets.ManifestStorage"}},
+    )
+
+
+class StaticBundleTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp(prefix="static-build-")
+        cls.addClassCleanup(shutil.rmtree, cls.static_root, ignore_errors=True)
+        with bundle_settings(cls.static_root):
+            call_command("build_static", stdout=StringIO())
+
+    def test_tags_resolve_hashed_bundles(self):
+        with bundle_settings(self.static_root):
+            css, js = render_bundle("base.css"), render_bundle("base.js")
+        self.assertRegex(css, r'^<link rel="stylesheet" href="/static/app/bundles/base\.[0-9a-f]{12}\.css" />$')
+        self.assertRegex(js, r'^<script src="/static/app/bundles/base\.[0-9a-f]{12}\.js"></script>$')
+
+        path = re.search(r'href="/static/([^"]+)"', css).group(1)
+        self.assertTrue(os.path.isfile(os.path.join(self.static_root, path)))
+        with bundle_settings(self.static_root):
+            request = RequestFactory().get("/static/" + path, HTTP_ACCEPT_ENCODING="gzip, deflate")
+            response = assets.serve_static(request, path)
+        self.assertEqual(response["Cache-Control"], assets.IMMUTABLE_CACHE)
+        self.assertIn(response["Content-Encoding"], ("br", "gzip"))
+        response.close()
+
+    def test_missing_manifest_falls_back_to_sources(self):
+        with tempfile.TemporaryDirectory() as empty_root, bundle_settings(empty_root):
+            css = render_bundle("base.css")
+            request = RequestFactory().get("/static/app/css/main.css")
+            response = assets.serve_static(request, "app/css/main.css")
+        self.assertEqual(
+            re.findall(r'href="([^"]+)"', css),
+            ["/static/" + source for source in settings.STATIC_BUNDLES["base.css"]],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], assets.DEFAULT_CACHE)
+        response.close()
+
+    def test_minify_js_keeps_literals(self):
+        source = (
+            "// đầu file\n"
+            "var url = 'http://example.com'; // comment\n"
+            "var html = `<ul>\n"
+            "    // không phải comment\n"
+            "  ${items.map((i) => `<li>${i}</li>`).join('')}</ul>`;\n"
+            "\n"
+            "/* block\n   comment */\n"
+            "var re = /\\/\\/+/g, half = total / 2;\n"
+        )
+        self.assertEqual(assets.minify_js(source), (
+            "var url = 'http://example.com';\n"
+            "var html = `<ul>\n"
+            "    // không phải comment\n"
+            "  ${items.map((i) => `<li>${i}</li>`).join('')}</ul>`;\n"
+            "var re = /\\/\\/+/g, half = total / 2;"
+        ))
+
+    def test_js_bundle_does_not_swallow_errors(self):
+        content, _ = assets.build_bundle("base.js")
+        self.assertNotIn("catch (e)", content)
+        for source in settings.STATIC_BUNDLES["base.js"]:
+            self.assertIn(f"/* {source} */", content)
+
+    def test_dev_loads_sources(self):
+        scripts = re.findall(r'src="([^"]+)"', render_bundle("base.js"))
+        self.assertEqual(scripts, ["/static/" + source for source in settings.STATIC_BUNDLES["base.js"]])
@@ -0,0 +1,144 @@
+"""
+Ảnh thumbnail (WebP + JPEG) cho Product / Article.
+
+- Kích thước cố định SIZES, file lưu ở THUMBNAIL_ROOT (mặc định MEDIA_ROOT/thumbs)
+  với tên theo hash nội dung ảnh gốc -> URL không đổi khi ảnh không đổi (cache lâu được).
+- Hash lưu ở cột image_hash: post_save (ProductForm / ArticleForm / admin) tạo thumbnail,
+  dòng cũ chưa có hash thì backfill bằng `manage.py generate_thumbnails` (process pool).
+- Render template không hash file / ghi DB: chưa có hash thì dùng URL ảnh gốc.
+"""
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# tên -> cạnh lớn nhất (px): small cho cart / checkout / admin (56-100px),
+# medium cho product grid (tối đa 480px), large cho trang detail
+SIZES = {"small": 128, "medium": 480, "large": 960}
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def thumbnail_root():
+    return getattr(settings, "THUMBNAIL_ROOT", os.path.join(settings.MEDIA_ROOT, "thumbs"))
+
+
+def thumbnail_url_prefix():
+    return getattr(settings, "THUMBNAIL_URL", settings.MEDIA_URL + "thumbs/")
+
+
+def thumbnail_name(digest, size, fmt="webp"):
+    return f"{digest[:2]}/{digest}_{SIZES[size]}.{fmt}"
+
+
+def file_digest(path, chunk_size=65536):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:20]
+
+
+def _save_atomic(image, path, fmt):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pil_format, options = FORMATS[fmt]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, pil_format, **options)
+    os.replace(tmp_path, path)
+
+
+def generate_from_path(path, force=False):
+    """
+    Tạo đủ các size / format cho ảnh gốc `path`, trả về digest.
+    Chỉ dùng file system (không đụng DB) để chạy được trong process pool.
+    """
+    digest = file_digest(path)
+    root = thumbnail_root()
+    targets = [
+        (size, fmt, os.path.join(root, thumbnail_name(digest, size, fmt)))
+        for size in SIZES for fmt in FORMATS
+    ]
+    if not force and all(os.path.exists(target) for _, _, target in targets):
+        return digest
+
+    with Image.open(path) as source:
+        source = ImageOps.exif_transpose(source)
+        for size, fmt, target in targets:
+            if not force and os.path.exists(target):
+                continue
+            image = source.copy()
+            image.thumbnail((SIZES[size], SIZES[size]), Image.LANCZOS)
+            if fmt == "jpeg":
+                image = _flatten(image)
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            _save_atomic(image, target, fmt)
+    return digest
+
+
+def _flatten(image):
+    """JPEG không có alpha -> đặt lên nền trắng."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def source_path(instance):
+    try:
+        return instance.image.path if instance.image else None
+    except (ValueError, NotImplementedError):
+        return None
+
+
+def ensure_thumbnails(instance, force=False):
+    """
+    Tạo thumbnail cho instance nếu ảnh gốc đổi (hash khác image_hash), cập nhật
+    image_hash bằng queryset.update (không bắn lại post_save). Trả về digest hoặc "".
+    """
+    path = source_path(instance)
+    if not path or not os.path.exists(path):
+        return ""
+    try:
+        digest = generate_from_path(path, force=force)
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning("Thumbnail generation failed for %s: %s", path, e)
+        return ""
+
+    if digest != instance.image_hash:
+        type(instance).objects.filter(pk=instance.pk).update(image_hash=digest)
+        instance.image_hash = digest
+    return digest
+
+
+class ThumbnailMixin:
+    """URL thumbnail theo size cho model có `image` + `image_hash` (Product, Article)."""
+
+    def thumbnail_url(self, size, fmt="webp"):
+        if not self.image:
+            return ""
+        # chưa có hash (dòng cũ, tạo thumbnail lỗi) -> ảnh gốc; backfill bằng generate_thumbnails
+        if not self.image_hash:
+            return self.ImageURL
+        return thumbnail_url_prefix() + thumbnail_name(self.image_hash, size, fmt)
+
+    @property
+    def SmallImageURL(self):
+        return self.thumbnail_url("small")
+
+    @property
+    def MediumImageURL(self):
+        return self.thumbnail_url("medium")
+
+    @property
+    def LargeImageURL(self):
+        return self.thumbnail_url("large")
@@ -28,6 +28,7 @@ urlpatterns = [
     path("product/<int:pk>/", views.product_detail, name="product_detail"),
     path('apply-discount/', views.apply_discount, name='apply_discount'),
     path('update_item/', views.updateItem, name = 'update_item'),
+    path('update_items/', views.updateItems, name='update_items'),
     path('cart/',views.cart, name="cart"),
     path('detail/',views.detail, name="detail"),
     path("article/", views.article, name="article"),
@@ -39,4 +40,10 @@ urlpatterns = [
     path('pay_page/', views.payPage, name='pay_page'),
     path('addProduct/', views.addProduct, name='addProduct'),
     path('addArticle/', views.addArticle, name='addArticle'),
+    path('api/products/', views.products_api, name='products_api'),
+    path('api/articles/', views.articles_api, name='articles_api'),
+    path('api/search/suggest/', views.search_suggest, name='search_suggest'),
+    path('catalog-cache/stats/', views.catalog_cache_stats, name='catalog_cache_stats'),
+    path('query-budget/stats/', views.query_budget_stats, name='query_budget_stats'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
@@ -1,22 +1,37 @@
 from django.shortcuts import redirect, render, get_object_or_404
-from django.http import JsonResponse, HttpResponseRedirect
+from django.urls import reverse
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseRedirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
-from django.db.models import Q, Count, Sum, Min
-from django.views.decorators.http import require_POST
-from django.db import transaction
-from django.core.mail import send_mail
+from django.db.models import Q
+from django.views.decorators.http import require_GET, require_POST
 from django.conf import settings
+import hmac
 import json
 import logging
 
+from . import autocomplete, catalog_cache, coupons, mail, metrics, query_budget, search
+from .checkout import EmptyCart, complete_order, new_token, order_lines
+from .db import write_transaction
 from .models import *
 from .forms import ProductForm, ArticleForm, DeliveryForm
+from .pagination import keyset_paginate, page_size, parse_cursor
 
 logger = logging.getLogger(__name__)
 
+# Giới hạn cho batch update giỏ hàng (update_items)
+MAX_BATCH_ITEMS = 50
+MAX_ITEM_DELTA = 99
+
+# Số product / article ở mỗi section trang home
+HOME_SECTION_SIZE = 3
+
+# Số order mỗi trang lịch sử order (profileUser, ?after=)
+ORDER_HISTORY_PAGE_SIZE = 10
+
 
 # -----------------------------
 # Helpers
@@ -25,6 +40,32 @@ def _is_admin(request) -> bool:
     return bool(request.session.get("admin", False))
 
 
+def _update_session(request, **values):
+    """
+    Chỉ gán những key thực sự đổi giá trị, để session không bị đánh dấu modified
+    (SESSION_SAVE_EVERY_REQUEST = False -> không ghi lại session nếu không đổi).
+    """
+    for key, value in values.items():
+        if key not in request.session or request.session[key] != value:
+            request.session[key] = value
+
+
+def _cart_write_error(request):
+    """
+    Kiểm tra quyền sửa giỏ hàng (AJAX). Trả về JsonResponse lỗi, hoặc None nếu hợp lệ.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"ok": False, "error": "Please login first."}, status=401)
+
+    if _is_admin(request):
+        return JsonResponse({"ok": False, "error": "Admin account cannot add to cart here."}, status=403)
+
+    if not hasattr(request.user, "customer"):
+        return JsonResponse({"ok": False, "error": "Customer profile not found."}, status=400)
+
+    return None
+
+
 def _get_order_context(request):
     """
     Return: (customer, order, items, cartItems)
@@ -33,7 +74,7 @@ def _get_order_context(request):
     if request.user.is_authenticated and not _is_admin(request) and hasattr(request.user, "customer"):
         customer = request.user.customer
         order, _ = Order.objects.get_or_create(customer=customer, complete=False)
-        items = order.orderitem_set.all()
+        items = order.orderitem_set.select_related("product")
         cartItems = order.get_cart_items
         return customer, order, items, cartItems
 
@@ -45,33 +86,6 @@ def _get_order_context(request):
     return customer, order, items, cartItems
 
 
-def _merge_duplicate_orderitems(order):
-    """
-    Fix lỗi bị duplicate OrderItem (cùng order + cùng product) do add nhiều request nhanh.
-    Gộp chúng lại thành 1 row: quantity = tổng quantity, xoá các row dư.
-    """
-    if not order or isinstance(order, dict):
-        return
-
-    dup_groups = (
-        OrderItem.objects
-        .filter(order=order)
-        .values("product_id")
-        .annotate(cnt=Count("id"), total_qty=Sum("quantity"), keep_id=Min("id"))
-        .filter(cnt__gt=1)
-    )
-
-    for g in dup_groups:
-        keep_id = g["keep_id"]
-        total_qty = g["total_qty"] or 0
-
-        # update row giữ lại
-        OrderItem.objects.filter(id=keep_id).update(quantity=total_qty)
-
-        # xoá các row còn lại
-        OrderItem.objects.filter(order=order, product_id=g["product_id"]).exclude(id=keep_id).delete()
-
-
 # -----------------------------
 # Views
 # -----------------------------
@@ -79,8 +93,10 @@ def home(request):
     is_admin = _is_admin(request)
     customer, order, items, cartItems = _get_order_context(request)
 
-    articles = Article.objects.all()
-    products = Product.objects.all()
+    # truyền hàm (không gọi): template chỉ query khi fragment cache bị miss,
+    # và chỉ lấy đúng số dòng hiển thị
+    articles = lambda: catalog_cache.get_article_page(limit=HOME_SECTION_SIZE).items
+    products = lambda: catalog_cache.get_product_page(limit=HOME_SECTION_SIZE).items
 
     context = {
         "items": items,
@@ -97,9 +113,14 @@ def product(request):
     is_admin = _is_admin(request)
     customer, order, items, cartItems = _get_order_context(request)
 
-    products = Product.objects.all()
+    after = parse_cursor(request.GET.get("after"))
+    limit = page_size(request.GET.get("limit"))
+
     context = {
-        "products": products,
+        "after": after,
+        "limit": limit,
+        # load khi fragment product_grid bị miss
+        "load_page": lambda: catalog_cache.get_product_page(after, limit),
         "cartItems": cartItems,
         "is_admin": is_admin,
     }
@@ -107,7 +128,9 @@ def product(request):
 
 
 def product_detail(request, pk):
-    product = get_object_or_404(Product, id=pk)
+    product = catalog_cache.get_product(pk)
+    if product is None:
+        raise Http404("Product not found.")
 
     is_admin = _is_admin(request)
     customer, order, items, cartItems = _get_order_context(request)
@@ -124,9 +147,11 @@ def article(request):
     is_admin = _is_admin(request)
     customer, order, items, cartItems = _get_order_context(request)
 
-    articles = Article.objects.all()
+    after = parse_cursor(request.GET.get("after"))
+    page = catalog_cache.get_article_page(after, page_size(request.GET.get("limit")))
     context = {
-        "articles": articles,
+        "articles": page.items,
+        "page": page,
         "cartItems": cartItems,
         "is_admin": is_admin,
     }
@@ -137,12 +162,6 @@ def cart(request):
     is_admin = _is_admin(request)
     customer, order, items, cartItems = _get_order_context(request)
 
-    # ✅ Gộp duplicate để cart hiển thị đúng
-    if request.user.is_authenticated and not is_admin and not isinstance(order, dict):
-        _merge_duplicate_orderitems(order)
-        items = order.orderitem_set.all()
-        cartItems = order.get_cart_items
-
     context = {
         "items": items,
         "order": order,
@@ -156,18 +175,12 @@ def cart(request):
 def updateItem(request):
     """
     AJAX add/remove item.
-    ✅ Fix duplicate OrderItem khi user add nhiều lần nhanh bằng:
-      - transaction.atomic
-      - merge duplicates sau mỗi lần update
+    Unique (order, product) + UPDATE quantity = quantity ± 1 nên add nhiều lần nhanh
+    không còn tạo duplicate OrderItem, không cần merge.
     """
-    if not request.user.is_authenticated:
-        return JsonResponse({"ok": False, "error": "Please login first."}, status=401)
-
-    if _is_admin(request):
-        return JsonResponse({"ok": False, "error": "Admin account cannot add to cart here."}, status=403)
-
-    if not hasattr(request.user, "customer"):
-        return JsonResponse({"ok": False, "error": "Customer profile not found."}, status=400)
+    error = _cart_write_error(request)
+    if error:
+        return error
 
     try:
         data = json.loads(request.body.decode("utf-8"))
@@ -180,35 +193,78 @@ def updateItem(request):
     if not productId:
         return JsonResponse({"ok": False, "error": "Missing productId."}, status=400)
 
+    deltas = {"add": 1, "remove": -1}
+    if action not in deltas:
+        return JsonResponse({"ok": False, "error": "Invalid action."}, status=400)
+
     customer = request.user.customer
     product = get_object_or_404(Product, id=productId)
 
-    with transaction.atomic():
-        order, _ = Order.objects.get_or_create(customer=customer, complete=False)
+    # ✅ BEGIN IMMEDIATE: lấy lock ghi ngay, request song song chờ thay vì "database is locked"
+    with write_transaction():
+        order, created = Order.objects.get_or_create(customer=customer, complete=False)
+        if created:
+            # order vừa tạo trong transaction này, chưa request nào thấy -> INSERT thẳng,
+            # bỏ UPDATE + savepoint của adjust_quantity; "remove" trên giỏ rỗng không đổi gì
+            if deltas[action] < 0:
+                return JsonResponse({"ok": True})
+            OrderItem.objects.insert_rows(order, {product.pk: deltas[action]})
+        else:
+            OrderItem.objects.adjust_quantity(order, product, deltas[action])
+        # adjust_quantity / insert_rows không gửi signal -> tính lại tổng đúng 1 lần
+        Order.objects.filter(pk=order.pk).recalculate_totals()
 
-        # merge trước (phòng trường hợp đã bị duplicate từ trước)
-        _merge_duplicate_orderitems(order)
+    return JsonResponse({"ok": True})
 
-        orderItem, created = OrderItem.objects.get_or_create(order=order, product=product)
 
-        if action == "add":
-            orderItem.quantity += 1
-            orderItem.save()
+@require_POST
+def updateItems(request):
+    """
+    AJAX batch update giỏ hàng: {"items": [{"productId": 1, "delta": 2}, ...]}
+    addCart.js gom nhiều lần click thành 1 request. Tất cả chạy trong 1 transaction,
+    kiểm tra Product bằng 1 query, số query không tăng theo số item (adjust_quantities),
+    trả về cartItems + total mới.
+    """
+    error = _cart_write_error(request)
+    if error:
+        return error
 
-        elif action == "remove":
-            orderItem.quantity -= 1
-            if orderItem.quantity <= 0:
-                orderItem.delete()
-            else:
-                orderItem.save()
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except Exception:
+        data = {}
 
-        else:
-            return JsonResponse({"ok": False, "error": "Invalid action."}, status=400)
+    ops = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(ops, list) or not ops or len(ops) > MAX_BATCH_ITEMS:
+        return JsonResponse({"ok": False, "error": "Invalid items."}, status=400)
+
+    # gộp delta theo product (cùng 1 product có thể xuất hiện nhiều lần)
+    deltas = {}
+    for op in ops:
+        try:
+            product_id = int(op["productId"])
+            delta = int(op.get("delta", 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return JsonResponse({"ok": False, "error": "Invalid items."}, status=400)
+        if abs(delta) > MAX_ITEM_DELTA:
+            return JsonResponse({"ok": False, "error": "Invalid quantity."}, status=400)
+        deltas[product_id] = deltas.get(product_id, 0) + delta
+
+    if Product.objects.filter(pk__in=list(deltas)).count() != len(deltas):
+        return JsonResponse({"ok": False, "error": "Product not found."}, status=404)
 
-        # merge lại lần nữa để chắc chắn không còn duplicate
-        _merge_duplicate_orderitems(order)
+    customer = request.user.customer
 
-    return JsonResponse({"ok": True})
+    with write_transaction():
+        order, _ = Order.objects.get_or_create(customer=customer, complete=False)
+        OrderItem.objects.adjust_quantities(order, deltas)
+        order.recalculate_totals()
+
+    return JsonResponse({
+        "ok": True,
+        "cartItems": order.get_cart_items,
+        "total": int(order.get_cart_total),
+    })
 
 
 def checkout(request):
@@ -218,10 +274,7 @@ def checkout(request):
         customer = request.user.customer
         order, _ = Order.objects.get_or_create(customer=customer, complete=False)
 
-        # ✅ gộp duplicate để tổng tiền đúng
-        _merge_duplicate_orderitems(order)
-
-        items = order.orderitem_set.all()
+        items = order.orderitem_set.select_related("product")
         cartItems = order.get_cart_items
 
         discount_amount = int(request.session.get("discount_amount", 0) or 0)
@@ -230,7 +283,7 @@ def checkout(request):
         subtotal = int(order.get_cart_total)
         if discount_amount > subtotal:
             discount_amount = subtotal
-            request.session["discount_amount"] = discount_amount
+            _update_session(request, discount_amount=discount_amount)
 
         final_total = subtotal - discount_amount
 
@@ -274,43 +327,28 @@ def apply_discount(request):
     except Exception:
         data = {}
 
-    code = (data.get("code") or "").strip().upper()
+    code = coupons.normalize(data.get("code"))
 
     customer = request.user.customer
     order, _ = Order.objects.get_or_create(customer=customer, complete=False)
 
-    _merge_duplicate_orderitems(order)
-
     subtotal = int(order.get_cart_total)
 
-    # ✅ Bạn sửa danh sách mã tại đây (file chứa mã giảm giá chính là views.py)
-    COUPONS = {
-        "SAVE10": {"type": "percent", "value": 10},      # giảm 10%
-        "SAVE5": {"type": "percent", "value": 5},        # giảm 5%
-        "LESS100K": {"type": "fixed", "value": 100000},  # giảm 100k
-    }
-
-    if not code or code not in COUPONS:
-        request.session["discount_code"] = ""
-        request.session["discount_amount"] = 0
+    # ✅ Mã giảm giá quản lý trong admin (model Coupon), rule cache trong app/coupons.py
+    discount, error = coupons.evaluate(code, subtotal)
+    if error:
+        _update_session(request, discount_code="", discount_amount=0)
         return JsonResponse({
             "ok": False,
-            "error": "Invalid discount code.",
+            "error": error,
             "subtotal": subtotal,
             "discount": 0,
             "total": subtotal,
         })
 
-    rule = COUPONS[code]
-    if rule["type"] == "percent":
-        discount = round(subtotal * rule["value"] / 100)
-    else:
-        discount = min(int(rule["value"]), subtotal)
-
     total = subtotal - int(discount)
 
-    request.session["discount_code"] = code
-    request.session["discount_amount"] = int(discount)
+    _update_session(request, discount_code=code, discount_amount=int(discount))
 
     return JsonResponse({
         "ok": True,
@@ -323,89 +361,65 @@ def apply_discount(request):
 
 def payPage(request):
     """
-    ✅ Sau khi thanh toán xong:
-    - Không crash vì lỗi SSL gửi mail
-    - Redirect sang trang success đẹp hơn
+    ✅ Thanh toán (xem app/checkout.py):
+    - Hoàn tất order trong 1 transaction, snapshot giá + tổng vào order
+    - Submit lại cùng checkout_token (double click / F5) -> về trang success của order cũ
+    - Email vào outbox, không crash vì lỗi SSL
     """
     submitted = False
+    checkout_token = new_token()
 
     if request.user.is_authenticated and not _is_admin(request) and hasattr(request.user, "customer"):
         customer = request.user.customer
-        order, _ = Order.objects.get_or_create(customer=customer, complete=False)
-
-        _merge_duplicate_orderitems(order)
-
-        # giỏ trống thì quay về product
-        if order.get_cart_items == 0:
-            messages.info(request, "Your cart is empty.")
-            return redirect("product")
-
-        form = DeliveryForm(initial={'customer': customer, 'order': order})
 
         if request.method == 'POST':
             form = DeliveryForm(request.POST)
+            token = request.POST.get("checkout_token", "")[:64]
             if form.is_valid():
-                delivery = form.save(commit=False)
-                delivery.customer = customer
-                delivery.order = order
-                delivery.save()
-
-                # Tính tổng + discount (để show ở success page / email)
-                subtotal = int(order.get_cart_total)
-                discount_amount = int(request.session.get("discount_amount", 0) or 0)
-                if discount_amount > subtotal:
-                    discount_amount = subtotal
-                final_total = subtotal - discount_amount
-                discount_code = request.session.get("discount_code", "")
-
-                # Complete order
-                order.complete = True
-                order.save()
-
-                # Lưu summary vào session để trang success hiển thị
-                request.session["last_order_id"] = order.id
-                request.session["last_subtotal"] = subtotal
-                request.session["last_discount_amount"] = discount_amount
-                request.session["last_discount_code"] = discount_code
-                request.session["last_final_total"] = final_total
-
-                # ✅ Clear discount sau khi thanh toán (cho order tiếp theo)
-                request.session["discount_code"] = ""
-                request.session["discount_amount"] = 0
-
-                # Email nội dung (bọc try/except để không crash vì SSL)
                 try:
-                    order_items = order.orderitem_set.all()
-                    order_details = "\n".join([
-                        f"{item.product.name}: {item.quantity} x {item.product.price} VNĐ"
-                        for item in order_items
-                    ])
-
-                    message = f"""
-Hi {customer.name}, You have successfully placed an order at HomeClick!
-
-Order Details:
-{order_details}
+                    result = complete_order(
+                        customer,
+                        form.save(commit=False),
+                        token=token,
+                        discount_code=request.session.get("discount_code", ""),
+                    )
+                except EmptyCart:
+                    messages.info(request, "Your cart is empty.")
+                    return redirect("product")
+
+                if result.discount_error:
+                    messages.warning(
+                        request,
+                        f"Discount code {request.session.get('discount_code')} was not applied: "
+                        f"{result.discount_error}",
+                    )
+                # ✅ Clear discount sau khi thanh toán (cho order tiếp theo)
+                _update_session(request, discount_code="", discount_amount=0)
 
-Subtotal: {subtotal} VNĐ
-Discount ({discount_code if discount_code else "N/A"}): -{discount_amount} VNĐ
-Total after discount: {final_total} VNĐ
+                # ✅ Redirect sang trang success đẹp hơn
+                return redirect("payment_success", order_id=result.order.id)
+            checkout_token = token or checkout_token
+        else:
+            order, _ = Order.objects.get_or_create(customer=customer, complete=False)
 
-We hope you enjoy our service!
-"""
-                    sendMail("Order confirmed successfully.", message, customer.email)
-                except Exception as e:
-                    logger.warning("Send mail failed (ignored): %s", e)
+            # giỏ trống thì quay về product
+            if order.get_cart_items == 0:
+                messages.info(request, "Your cart is empty.")
+                return redirect("product")
 
-                # ✅ Redirect sang trang success đẹp hơn
-                return redirect("payment_success", order_id=order.id)
+            form = DeliveryForm(initial={'customer': customer, 'order': order})
 
     else:
         form = DeliveryForm()
         if 'submitted' in request.GET:
             submitted = True
 
-    context = {'form': form, 'submitted': submitted, "is_admin": _is_admin(request)}
+    context = {
+        'form': form,
+        'submitted': submitted,
+        "is_admin": _is_admin(request),
+        "checkout_token": checkout_token,
+    }
     return render(request, "app/paypage.html", context)
 
 
@@ -420,28 +434,15 @@ def payment_success(request, order_id):
     customer = request.user.customer
     paid_order = get_object_or_404(Order, id=order_id, customer=customer)
 
-    paid_items = paid_order.orderitem_set.select_related("product").all()
-
-    # lấy summary từ session (nếu có)
-    last_order_id = request.session.get("last_order_id")
-    subtotal = request.session.get("last_subtotal", None)
-    discount_amount = request.session.get("last_discount_amount", 0)
-    discount_code = request.session.get("last_discount_code", "")
-    final_total = request.session.get("last_final_total", None)
-
-    # chỉ dùng session nếu đúng order vừa thanh toán
-    if last_order_id != paid_order.id:
-        subtotal = int(paid_order.get_cart_total)
-        discount_amount = 0
-        discount_code = ""
-        final_total = subtotal
+    # bản chụp lúc thanh toán (Order.lines) -> giá đổi sau đó không làm đổi hoá đơn, không join Product.
+    # order tạo trước khi có snapshot / chưa thanh toán thì đọc từ OrderItem
+    paid_items = paid_order.lines or order_lines(paid_order)
 
-    # (tuỳ bạn) clear session summary sau khi hiển thị 1 lần
-    request.session.pop("last_order_id", None)
-    request.session.pop("last_subtotal", None)
-    request.session.pop("last_discount_amount", None)
-    request.session.pop("last_discount_code", None)
-    request.session.pop("last_final_total", None)
+    # tổng / discount đã snapshot lúc thanh toán (app/checkout.py), không đọc từ session
+    subtotal = int(paid_order.subtotal)
+    discount_amount = int(paid_order.discount_amount)
+    discount_code = paid_order.discount_code
+    final_total = int(paid_order.total if paid_order.total is not None else subtotal - discount_amount)
 
     context = {
         "is_admin": _is_admin(request),
@@ -472,11 +473,22 @@ def profileUser(request):
 
         return JsonResponse({'status': 'success'})
 
+    # lịch sử order: chỉ đọc cột snapshot của Order (lines, tổng tiền), mới nhất trước
+    orders = keyset_paginate(
+        Order.objects.filter(customer=customer, complete=True).only(
+            "id", "date_order", "completed_at", "subtotal", "discount_code", "discount_amount", "total", "lines"
+        ),
+        parse_cursor(request.GET.get("after")),
+        ORDER_HISTORY_PAGE_SIZE,
+        descending=True,
+    )
+
     context = {
         'user': user,
         'phone_number': customer.phone_number,
         'address': customer.address,
         "is_admin": _is_admin(request),
+        "orders": orders,
     }
     return render(request, 'app/profile.html', context)
 
@@ -578,18 +590,26 @@ def addProduct(request):
             submitted = True
 
     context = {'form': form, 'submitted': submitted, "is_admin": _is_admin(request)}
-    return render(request, 'app/addproduct.html', context)
+    return render(request, 'app/addProduct.html', context)
 
 
 def searchpage(request):
     customer, order, items, cartItems = _get_order_context(request)
 
-    if request.method == "POST":
-        searched = request.POST.get('searched', '').strip()
-        product = Product.objects.filter(Q(name__icontains=searched) | Q(code__icontains=searched))
+    # POST từ ô search ở header; GET (?searched=&after=) cho các trang tiếp theo
+    params = request.POST if request.method == "POST" else request.GET
+    searched = params.get('searched', '').strip()
+
+    if searched:
+        page = _search_products(
+            searched,
+            parse_cursor(request.GET.get('after')),
+            page_size(request.GET.get('limit')),
+        )
         return render(request, "app/searchpage.html", {
             'searched': searched,
-            'product': product,
+            'product': page.items,
+            'page': page,
             'cartItems': cartItems,
             'is_admin': _is_admin(request),
         })
@@ -600,21 +620,145 @@ def searchpage(request):
     })
 
 
+def _search_products(searched, after, limit):
+    """
+    FTS5 + bm25 (app/search.py) nếu có, ngược lại icontains + keyset theo id.
+    """
+    if search.is_available():
+        return search.search_products(searched, after, limit)
+    queryset = Product.objects.filter(Q(name__icontains=searched) | Q(code__icontains=searched))
+    return keyset_paginate(queryset, after, limit)
+
+
+def _search_articles(searched, after, limit):
+    """Như _search_products cho Article (name, content)."""
+    if search.is_available():
+        return search.search_articles(searched, after, limit)
+    queryset = Article.objects.filter(Q(name__icontains=searched) | Q(content__icontains=searched))
+    return keyset_paginate(queryset, after, limit)
+
+
+def _product_json(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "code": product.code,
+        "price": product.price,
+        "image": product.ImageURL,
+        "url": reverse("product_detail", args=[product.id]),
+    }
+
+
+def _article_json(article):
+    return {
+        "id": article.id,
+        "name": article.name,
+        "date_up": article.date_up,
+        "image": article.ImageURL,
+        "content": article.content,
+    }
+
+
+def _page_json(request, page, serialize):
+    next_url = None
+    if page.has_next:
+        query = request.GET.copy()
+        query["after"] = page.next_cursor
+        next_url = f"{request.path}?{query.urlencode()}"
+    return JsonResponse({
+        "results": [serialize(obj) for obj in page.items],
+        "next": page.next_cursor,
+        "next_url": next_url,
+    })
+
+
+@require_GET
+def products_api(request):
+    """
+    JSON listing cho infinite scroll: /api/products/?after=<cursor>&limit=<n>[&q=<từ khoá>]
+    """
+    after = parse_cursor(request.GET.get("after"))
+    limit = page_size(request.GET.get("limit"))
+    q = request.GET.get("q", "").strip()
+
+    if q:
+        page = _search_products(q, after, limit)
+    else:
+        page = catalog_cache.get_product_page(after, limit)
+    return _page_json(request, page, _product_json)
+
+
+@require_GET
+def articles_api(request):
+    """JSON listing cho infinite scroll: /api/articles/?after=<cursor>&limit=<n>[&q=<từ khoá>]"""
+    after = parse_cursor(request.GET.get("after"))
+    limit = page_size(request.GET.get("limit"))
+    q = request.GET.get("q", "").strip()
+
+    if q:
+        page = _search_articles(q, after, limit)
+    else:
+        page = catalog_cache.get_article_page(after, limit)
+    return _page_json(request, page, _article_json)
+
+
+@require_GET
+def search_suggest(request):
+    """
+    Gợi ý product khi gõ: /api/search/suggest/?q=<prefix>
+    Trả lời từ index trong bộ nhớ (app/autocomplete.py), không query DB.
+    """
+    q = request.GET.get("q", "").strip()
+    return JsonResponse({"results": autocomplete.index.suggest(q) if q else []})
+
+
+@staff_member_required
+def catalog_cache_stats(request):
+    """Hit / miss của catalog cache (staff only)."""
+    return JsonResponse(catalog_cache.stats())
+
+
+@staff_member_required
+def query_budget_stats(request):
+    """Số query / thời gian SQL theo view, kèm budget (staff only)."""
+    return JsonResponse(query_budget.stats())
+
+
+@require_GET
+def metrics_view(request):
+    """
+    p50 / p95 / p99 theo view + catalog cache, dạng Prometheus text.
+    Staff, hoặc header "Authorization: Bearer <METRICS_TOKEN>" cho Prometheus scrape.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    bearer = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    allowed = (token and hmac.compare_digest(bearer, token)) or (
+        request.user.is_active and request.user.is_staff
+    )
+    if not allowed:
+        return HttpResponseForbidden("Forbidden")
+
+    cache_stats = catalog_cache.stats()
+    extra = {
+        "catalog_cache_requests_total": (
+            "counter",
+            "Catalog cache lookups by kind and result",
+            [
+                ({"kind": kind, "result": result}, cache_stats[kind][result])
+                for kind in ("data", "fragment")
+                for result in ("hits", "misses")
+            ],
+        ),
+        "catalog_cache_version": ("gauge", "Current catalog cache version", [({}, cache_stats["version"])]),
+    }
+    return HttpResponse(metrics.prometheus_text(extra), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def sendMail(subject, message, receiver):
     """
-    ✅ Fix lỗi SSL CERTIFICATE_VERIFY_FAILED:
-    nếu gửi mail lỗi thì không làm crash thanh toán.
+    Đưa email vào outbox (app/mail.py), không gọi SMTP trong request.
+    Worker `manage.py send_queued_mail` gửi + retry, lỗi SSL không ảnh hưởng thanh toán.
     """
-    try:
-        sender = settings.EMAIL_HOST_USER
-        send_mail(
-            subject,
-            message,
-            sender,
-            [receiver],
-            fail_silently=False,
-        )
-    except Exception as e:
-        logger.warning("sendMail failed (ignored): %s", e)
+    mail.enqueue_mail(subject, message, [receiver], settings.EMAIL_HOST_USER)
 
 